@@ -5,7 +5,7 @@ from django.test import TestCase, Client
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework import status
-from api.models import Contact, User, OTP
+from api.models import Contact, OTP
 
 
 class AdminPanelIntegrationTestCase(TestCase):
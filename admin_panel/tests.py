@@ -1,12 +1,14 @@
 """
 Unit Tests for Admin Panel
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import Contact, User
+from api.models import Contact
+from api.query_budget import budget_tests
+from admin_panel import urls
 
 
 class AdminLeadsStatsTestCase(TestCase):
@@ -117,3 +119,49 @@ class MarkLeadReadTestCase(TestCase):
         """Test marking non-existent lead as read"""
         response = self.client.post('/api/admin/leads/99999/read/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AdminQueryBudgetTestCase(TestCase):
+    """Every admin panel URL stays within the query budget declared on its view"""
+    
+    REQUESTS = {
+        'admin_login': ('post', {'username': 'admin', 'password': 'secret'}),
+        'mark_lead_read': ('post', None),
+    }
+    
+    def setUp(self):
+        from django.contrib.auth.models import User
+        User.objects.create_user(username='admin', password='secret', is_staff=True)
+        for n in (1, 2, 3):
+            Contact.objects.create(id=n, name=f'Lead {n}', phone='9876543210', subject='Visit', message='x')
+    
+    def budget_client(self, view):
+        return APIClient()
+
+
+budget_tests(AdminQueryBudgetTestCase, urls, '/api/admin/', {'lead_id': 1}, AdminQueryBudgetTestCase.REQUESTS)
+
+
+@override_settings(SQL_STATS_ENABLED=True)
+class AdminSQLStatsTestCase(TestCase):
+    """SQL statistics report (admin only)"""
+    
+    def setUp(self):
+        # Totals are per process; drop what earlier tests recorded
+        from api import sql_stats
+        sql_stats.reset()
+    
+    def test_report_requires_admin(self):
+        from django.contrib.auth.models import User
+        from rest_framework_simplejwt.tokens import AccessToken
+        client = APIClient()
+        self.assertEqual(client.get('/api/admin/sql-stats/').status_code, status.HTTP_403_FORBIDDEN)
+        
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        client.get('/api/admin/leads/')
+        response = client.get('/api/admin/sql-stats/', {'sort': 'count', 'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('GET /api/admin/leads/', [row['view'] for row in response.data['views']])
+        self.assertEqual(client.get('/api/admin/sql-stats/', {'sort': 'bogus'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(client.delete('/api/admin/sql-stats/').status_code, status.HTTP_204_NO_CONTENT)
@@ -6,7 +6,8 @@ from .views import (
     admin_login,
     admin_leads_stats,
     admin_leads_list,
-    mark_lead_read
+    mark_lead_read,
+    sql_stats_report
 )
 
 urlpatterns = [
@@ -16,5 +17,7 @@ urlpatterns = [
     path('leads/stats/', admin_leads_stats, name='admin_leads_stats'),
     path('leads/', admin_leads_list, name='admin_leads_list'),
     path('leads/<int:lead_id>/read/', mark_lead_read, name='mark_lead_read'),
+    # Diagnostics
+    path('sql-stats/', sql_stats_report, name='sql_stats_report'),
 ]
 
@@ -15,6 +15,9 @@ from api.models import (
     Tower, Flat, TowerAmenity, City, Client,
     Review, BlogPost, Achievement
 )
+from api import sql_stats
+from api.query_budget import query_budget
+from api.views import IsCustomAdminUser
 from api.serializers import (
     ProjectSerializer, ContactSerializer, ProjectImageSerializer,
     ProjectAmenitySerializer, TowerSerializer, FlatSerializer,
@@ -25,6 +28,7 @@ from api.serializers import (
 
 
 # Admin Login
+@query_budget(post=1)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def admin_login(request):
@@ -82,6 +86,7 @@ def admin_login(request):
 
 
 # Admin Dashboard Views
+@query_budget(get=6)
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Frontend checks admin status
 def admin_leads_stats(request):
@@ -124,13 +129,14 @@ def admin_leads_stats(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(get=1)
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Frontend checks admin status
 def admin_leads_list(request):
     """Get list of leads with filtering"""
     try:
         period = request.query_params.get('period', 'all')
-        queryset = Contact.objects.all()
+        queryset = Contact.objects.select_related('project')
         
         today = timezone.now().date()
         
@@ -157,6 +163,7 @@ def admin_leads_list(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(post=3)
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Frontend checks admin status
 def mark_lead_read(request, lead_id):
@@ -172,3 +179,29 @@ def mark_lead_read(request, lead_id):
         return Response({
             'error': f'Failed to mark lead as read: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@query_budget(get=1)
+@api_view(['GET', 'DELETE'])
+@permission_classes([AllowAny])
+def sql_stats_report(request):
+    """
+    Top SQL fingerprints and views by total time (Admin only).
+    GET: ?limit=20&sort=total_ms|count|p95_ms|max_ms|slow&view=GET /api/projects/
+    DELETE: Reset the statistics in every process
+    """
+    if not IsCustomAdminUser().has_permission(request, None):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.method == 'DELETE':
+        sql_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 200))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    sort = request.query_params.get('sort', 'total_ms')
+    if sort not in sql_stats.SORT_KEYS:
+        return Response({'error': f'sort must be one of {", ".join(sql_stats.SORT_KEYS)}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(sql_stats.report(limit=limit, sort=sort, view=request.query_params.get('view')), status=status.HTTP_200_OK)
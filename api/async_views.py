@@ -0,0 +1,106 @@
+"""
+Async read endpoints for the public catalog
+
+DRF 3.14 views are sync only, so under ASGI every APIView runs in a thread
+pool. These are native ``async def`` Django views for the hot read paths,
+mounted under /api/async/ and returning the same payloads as their sync
+counterparts. Querysets are built with the sync views' own filter code
+(which does no I/O) and evaluated with the async ORM; the child relations
+of a serialized tree are independent queries awaited together with
+asyncio.gather() (see CompiledSerializer.aserialize).
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from . import trending
+from .models import BlogPost, Project, Review
+from .query_budget import query_budget
+from .renderers import FastJSONRenderer
+from .serializers import (
+    CompiledBlogPostSerializer, CompiledCitySerializer, CompiledProjectSerializer, CompiledReviewSerializer
+)
+from .views import BlogPostViewSet, CityViewSet, ProjectViewSet
+
+
+def render(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def async_read_view(func):
+    """GET/HEAD only; renders the returned data and maps errors like DRF does"""
+    @functools.wraps(func)
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            data = await func(Request(request), *args, **kwargs)
+        except Http404:
+            return render({'detail': 'Not found.'}, 404)
+        except APIException as error:
+            return render({'detail': error.detail}, error.status_code)
+        return render(data)
+    return view
+
+
+def sync_view(view_class, request):
+    """A sync list view, used only for its queryset and helpers"""
+    view = view_class(action='list')
+    view.request = request  # unauthenticated: public rows only
+    return view
+
+
+def list_queryset(view):
+    return view.filter_queryset(view.get_queryset())
+
+
+@query_budget(get=6)
+@async_read_view
+async def project_list(request):
+    view = sync_view(ProjectViewSet, request)
+    data = await CompiledProjectSerializer(context={'request': request}).aserialize(list_queryset(view))
+    return view.finish_list(data)
+
+
+@query_budget(get=8)
+@async_read_view
+async def project_detail(request, pk):
+    # Counted before loading, so the payload shows this view like the sync view
+    if not await Project.objects.filter(pk=pk).aupdate(views=F('views') + 1):
+        raise Http404
+    await sync_to_async(trending.record_view)(pk)
+    data = await CompiledProjectSerializer(context={'request': request}).aserialize(Project.objects.filter(pk=pk))
+    return data[0]
+
+
+@query_budget(get=1)
+@async_read_view
+async def city_list(request):
+    view = sync_view(CityViewSet, request)
+    return await CompiledCitySerializer().aserialize(list_queryset(view))
+
+
+@query_budget(get=1)
+@async_read_view
+async def featured_reviews(request):
+    return await CompiledReviewSerializer().aserialize(Review.objects.filter(featured=True))
+
+
+@query_budget(get=1)
+@async_read_view
+async def blog_list(request):
+    view = sync_view(BlogPostViewSet, request)
+    return await CompiledBlogPostSerializer(context={'request': request}).aserialize(list_queryset(view))
+
+
+@query_budget(get=2)
+@async_read_view
+async def blog_detail(request, slug):
+    if not await BlogPost.objects.filter(slug=slug).aupdate(views=F('views') + 1):
+        raise Http404
+    data = await CompiledBlogPostSerializer(context={'request': request}).aserialize(BlogPost.objects.filter(slug=slug))
+    return data[0]
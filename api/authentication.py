@@ -0,0 +1,48 @@
+"""
+JWT authentication for staff and client users
+
+Staff (Django's User, admin_panel login) and ClientUser (OTP login) tokens
+are signed with the same key and both carry the primary key in user_id, so
+client tokens also carry user_type='client' and each authentication class
+accepts only its own kind: a client's user_id never resolves to a staff User.
+"""
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import ClientUser
+
+CLIENT_USER_TYPE = 'client'
+
+
+def client_access_token(user):
+    """Access token for a ClientUser"""
+    token = AccessToken.for_user(user)
+    token['user_type'] = CLIENT_USER_TYPE
+    return token
+
+
+class StaffJWTAuthentication(JWTAuthentication):
+    """JWT authentication for Django users; client tokens are rejected"""
+    
+    def get_user(self, validated_token):
+        if validated_token.get('user_type') == CLIENT_USER_TYPE:
+            raise InvalidToken('Client tokens cannot be used here')
+        return super().get_user(validated_token)
+
+
+class ClientJWTAuthentication(JWTAuthentication):
+    """JWT authentication resolving client tokens to an active ClientUser"""
+    
+    def get_user(self, validated_token):
+        if validated_token.get('user_type') != CLIENT_USER_TYPE:
+            raise InvalidToken('Token is not a client token')
+        try:
+            user = ClientUser.objects.get(pk=validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ClientUser.DoesNotExist):
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
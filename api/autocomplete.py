@@ -0,0 +1,231 @@
+"""
+In-process typeahead index
+
+Project titles, locations, developers and city names are kept in a sorted
+list of (term, type, key) tuples, where every word of a label starts a term
+("baner heights", "heights"). A prefix lookup is a bisect plus a short
+scan, so the search box never touches the database.
+
+The index is built on first use in each process and updated incrementally
+from Project/City signals (api/signals.py). Each change bumps a version
+number in the shared cache and records which project or city changed under
+that version, so other processes reload just those rows on their next
+lookup. They only rebuild from scratch when a change record has expired,
+they fell more than MAX_CATCH_UP changes behind, or invalidate() was called.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+
+from django.core.cache import cache
+
+VERSION_KEY = 'autocomplete-version'
+CHANGE_KEY = 'autocomplete-change:{}'
+CHANGE_TTL = 60 * 60
+MAX_CATCH_UP = 200
+TYPE_ORDER = {'project': 0, 'location': 1, 'city': 2, 'developer': 3}
+MAX_SCAN = 500  # terms examined per lookup; one-letter prefixes rank the first ones only
+
+
+def normalize(text):
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+
+def project_entries(project):
+    """(type, key, label) tuples a project contributes to the index"""
+    entries = [('project', project.pk, project.title)]
+    if project.location:
+        entries.append(('location', normalize(project.location), project.location.strip()))
+    if project.developer_name:
+        entries.append(('developer', normalize(project.developer_name), project.developer_name.strip()))
+    if not project.city_id and project.city_name:
+        entries.append(('city', normalize(project.city_name), project.city_name.strip()))
+    return entries
+
+
+def city_entries(city):
+    return [('city', normalize(city.name), city.name)] if city.is_active else []
+
+
+class PrefixIndex:
+    """Sorted-prefix index with reference-counted entries"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.terms = []       # sorted (term, type, key)
+        self.labels = {}      # (type, key) -> (label, normalized label)
+        self.refcounts = {}   # (type, key) -> number of sources contributing it
+        self.sources = {}     # source -> [(type, key, label)]
+    
+    def _add(self, kind, key, label):
+        """Count an entry in; returns the terms to insert when it is new"""
+        entry = (kind, key)
+        self.refcounts[entry] = self.refcounts.get(entry, 0) + 1
+        if self.refcounts[entry] > 1:
+            return []
+        self.labels[entry] = (label, normalize(label))
+        words = self.labels[entry][1].split()
+        return [(' '.join(words[start:]), kind, key) for start in range(len(words))]
+    
+    def _remove(self, kind, key, label):
+        entry = (kind, key)
+        self.refcounts[entry] -= 1
+        if self.refcounts[entry]:
+            return
+        del self.refcounts[entry]
+        words = self.labels.pop(entry)[1].split()
+        for start in range(len(words)):
+            item = (' '.join(words[start:]), kind, key)
+            position = bisect_left(self.terms, item)
+            if position < len(self.terms) and self.terms[position] == item:
+                del self.terms[position]
+    
+    def replace(self, source, entries):
+        """Swap the entries contributed by ``source`` (e.g. ('project', 3))"""
+        entries = [entry for entry in entries if entry[1] and normalize(entry[2])]
+        with self.lock:
+            for entry in self.sources.pop(source, []):
+                self._remove(*entry)
+            for entry in entries:
+                for term in self._add(*entry):
+                    insort(self.terms, term)
+            if entries:
+                self.sources[source] = entries
+    
+    def load(self, sources):
+        """Bulk-add (source, entries) pairs, sorting the terms once"""
+        with self.lock:
+            for source, entries in sources:
+                entries = [entry for entry in entries if entry[1] and normalize(entry[2])]
+                for entry in entries:
+                    self.terms.extend(self._add(*entry))
+                if entries:
+                    self.sources[source] = entries
+            self.terms.sort()
+    
+    def search(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        matches = {}
+        with self.lock:
+            position = bisect_left(self.terms, (prefix,))
+            for term, kind, key in islice(self.terms, position, position + MAX_SCAN):
+                if not term.startswith(prefix):
+                    break
+                entry = (kind, key)
+                if entry not in matches:
+                    label, normalized = self.labels[entry]
+                    matches[entry] = ((not normalized.startswith(prefix), TYPE_ORDER[kind], len(label), normalized), label)
+        results = []
+        for (kind, key), (rank, label) in heapq.nsmallest(limit, matches.items(), key=lambda item: item[1][0]):
+            result = {'type': kind, 'label': label}
+            if kind == 'project':
+                result['id'] = key
+            results.append(result)
+        return results
+
+
+_index = None
+_version = None
+_build_lock = threading.Lock()
+
+
+def _build():
+    from .models import City, Project
+    
+    index = PrefixIndex()
+    projects = Project.objects.only('id', 'title', 'location', 'developer_name', 'city_id', 'city_name').order_by()
+    index.load((('project', project.pk), project_entries(project)) for project in projects.iterator())
+    index.load((('city', city.pk), city_entries(city)) for city in City.objects.only('id', 'name', 'is_active').order_by())
+    return index
+
+
+def _reload(index, sources):
+    """Re-read the given (kind, pk) sources from the database into ``index``"""
+    from .models import City, Project
+    
+    ids = {'project': set(), 'city': set()}
+    for kind, pk in sources:
+        ids[kind].add(pk)
+    entries = {}
+    if ids['project']:
+        projects = Project.objects.filter(pk__in=ids['project']).only('id', 'title', 'location', 'developer_name', 'city_id', 'city_name').order_by()
+        entries.update((('project', project.pk), project_entries(project)) for project in projects)
+    if ids['city']:
+        cities = City.objects.filter(pk__in=ids['city']).only('id', 'name', 'is_active').order_by()
+        entries.update((('city', city.pk), city_entries(city)) for city in cities)
+    # Deleted rows are missing and drop out of the index
+    for source in sources:
+        index.replace(source, entries.get(source, []))
+
+
+def _catch_up(index, since, version):
+    """Apply the changes recorded after ``since``; False when a full rebuild is needed"""
+    if not since < version <= since + MAX_CATCH_UP:
+        return False
+    keys = [CHANGE_KEY.format(number) for number in range(since + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        return False
+    _reload(index, list(dict.fromkeys(changes[key] for key in keys)))
+    return True
+
+
+def get_index():
+    """The process-wide index, caught up with changes made by other processes"""
+    global _index, _version
+    version = cache.get(VERSION_KEY, 0)
+    if _index is None or version != _version:
+        with _build_lock:
+            if _index is None or version != _version:
+                if _index is None or not _catch_up(_index, _version, version):
+                    _index = _build()
+                _version = version
+    return _index
+
+
+def _publish(source):
+    """Bump the shared version for a change to ``source``; returns the new version or None"""
+    cache.add(VERSION_KEY, 0, None)
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        return None
+    cache.set(CHANGE_KEY.format(version), source, CHANGE_TTL)
+    return version
+
+
+def update(source, entries):
+    """Apply a Project/City change to this process's index and tell the others"""
+    global _version
+    version = _publish(source)
+    if version is None:
+        return
+    # Only patch in place if no other process changed the data meanwhile;
+    # otherwise the next lookup catches up with all the changes
+    if _index is not None and version == _version + 1:
+        _index.replace(source, entries)
+        _version = version
+
+
+def invalidate():
+    """Make every process rebuild, e.g. after bulk writes that bypass the signals"""
+    # No change record for the new version, so catching up is impossible
+    cache.add(VERSION_KEY, 0, None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def reset():
+    """Drop this process's index; the next lookup rebuilds it"""
+    global _index, _version
+    _index = _version = None
+
+
+def search(query, limit=8):
+    return get_index().search(query, limit)
@@ -0,0 +1,98 @@
+"""
+In-process batch GET
+
+POST /api/batch/ runs several read-only API requests in one round trip.
+Detail lookups of projects, towers and flats are coalesced: all the
+requested ids of one kind are loaded with a single compiled-serializer
+query plan instead of one view call each. Anything else is resolved and
+dispatched to its view in-process with the caller's headers; async views
+(/api/async/) cannot be called from here and are answered 404 like unknown
+paths.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+from . import trending
+from .models import Flat, Project, Tower
+from .serializers import CompiledFlatSerializer, CompiledProjectSerializer, CompiledTowerSerializer
+
+MAX_BATCH_SIZE = 25
+
+
+def _load_projects(ids, context):
+    # Same view counting as the project detail view, in one UPDATE and one upsert
+    Project.objects.filter(pk__in=ids).update(views=F('views') + 1)
+    projects = CompiledProjectSerializer(context=context).serialize(Project.objects.filter(pk__in=ids))
+    trending.record_views([project['id'] for project in projects])
+    return projects
+
+
+def _load_towers(ids, context):
+    return CompiledTowerSerializer(context=context).serialize(Tower.objects.filter(pk__in=ids))
+
+
+def _load_flats(ids, context):
+    return CompiledFlatSerializer(context=context).serialize(Flat.objects.filter(pk__in=ids))
+
+
+# url name of a detail route -> loader for many ids at once
+COALESCED_DETAILS = {
+    'project-detail': _load_projects,
+    'tower-detail': _load_towers,
+    'flat-detail': _load_flats,
+}
+
+
+def _sub_request(request, path, query_string):
+    """A GET HttpRequest for ``path`` carrying the caller's headers"""
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = dict(request.META, REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query_string)
+    sub.META.pop('CONTENT_LENGTH', None)
+    sub.META.pop('CONTENT_TYPE', None)
+    sub.GET = QueryDict(query_string)
+    return sub
+
+
+def _dispatch(request, match, path, query_string):
+    response = match.func(_sub_request(request, path, query_string), *match.args, **match.kwargs)
+    return response.status_code, getattr(response, 'data', None)
+
+
+def run_batch(request, paths):
+    """
+    Execute read-only API paths (e.g. "/api/projects/3/?x=1") and return
+    one {"path", "status", "body"} entry per path, in order.
+    """
+    results = [None] * len(paths)
+    coalesced = {}
+    for index, full_path in enumerate(paths):
+        path, _, query_string = full_path.partition('?')
+        try:
+            if not path.startswith('/api/') or path.startswith('/api/batch/'):
+                raise Resolver404
+            match = resolve(path)
+            if iscoroutinefunction(match.func):
+                raise Resolver404
+        except Resolver404:
+            results[index] = {'path': full_path, 'status': 404, 'body': {'detail': 'Not found.'}}
+            continue
+        if match.url_name in COALESCED_DETAILS and not query_string:
+            coalesced.setdefault(match.url_name, []).append((index, int(match.kwargs['pk'])))
+            continue
+        status_code, body = _dispatch(request._request, match, path, query_string)
+        results[index] = {'path': full_path, 'status': status_code, 'body': body}
+    
+    context = {'request': request}
+    for url_name, wanted in coalesced.items():
+        loaded = {item['id']: item for item in COALESCED_DETAILS[url_name]({pk for index, pk in wanted}, context)}
+        for index, pk in wanted:
+            item = loaded.get(pk)
+            if item is None:
+                results[index] = {'path': paths[index], 'status': 404, 'body': {'detail': 'Not found.'}}
+            else:
+                results[index] = {'path': paths[index], 'status': 200, 'body': item}
+    return results
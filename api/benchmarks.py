@@ -0,0 +1,172 @@
+"""
+Benchmark helpers for the public API
+
+profile_endpoints() requests each endpoint in-process and records latency,
+query count and payload size; run_load() drives a running server from a
+thread pool with plain urllib. Both return JSON-ready dicts, and
+write_results() stores them with the git commit so runs can be compared.
+"""
+import json
+import math
+import os
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import Client
+
+from .models import BlogPost, City, Project, Tower
+
+# name -> path template; {project}, {tower}, {city} and {slug} come from sample_ids()
+ENDPOINTS = {
+    'project-list': '/api/projects/',
+    'project-list-filtered': '/api/projects/?city_id={city}&budget=9000000&limit=20',
+    'project-detail': '/api/projects/{project}/',
+    'project-bundle': '/api/projects/{project}/bundle/',
+    'project-facets': '/api/projects/{project}/flat-facets/',
+    'project-compare': '/api/projects/compare/?ids={project},{project2}',
+    'tower-list': '/api/towers/?project={project}',
+    'tower-inventory': '/api/towers/{tower}/inventory/',
+    'flat-list': '/api/flats/?tower={tower}',
+    'city-list': '/api/cities/',
+    'review-featured': '/api/reviews/featured/',
+    'blog-list': '/api/blog/',
+    'blog-detail': '/api/blog/{slug}/',
+    'autocomplete': '/api/autocomplete/?q=ba',
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def latency_summary(latencies):
+    """Milliseconds: mean, p50, p95, p99, max"""
+    if not latencies:
+        return {}
+    return {
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+    }
+
+
+def sample_ids():
+    """Ids to fill the endpoint templates, from the current database"""
+    projects = list(Project.objects.order_by('pk').values_list('pk', flat=True)[:2])
+    return {
+        'project': projects[0] if projects else 0,
+        'project2': projects[-1] if projects else 0,
+        'tower': Tower.objects.order_by('pk').values_list('pk', flat=True).first() or 0,
+        'city': City.objects.order_by('pk').values_list('pk', flat=True).first() or 0,
+        'slug': BlogPost.objects.order_by('pk').values_list('slug', flat=True).first() or 'missing',
+    }
+
+
+def endpoint_paths(ids, names=None):
+    return {name: path.format(**ids) for name, path in ENDPOINTS.items() if not names or name in names}
+
+
+def profile_endpoints(paths, repeat=5):
+    """In-process latency, query count and payload size of each path"""
+    client = Client()
+    results = {}
+    for name, path in paths.items():
+        latencies = []
+        # A wrapper rather than CaptureQueriesContext: request_started resets queries_log
+        queries = []
+        
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        
+        with connection.execute_wrapper(count):
+            response = client.get(path)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.get(path)
+            latencies.append(time.perf_counter() - started)
+        results[name] = {
+            'path': path,
+            'status': response.status_code,
+            # first request: cold caches, as a client would see after a write
+            'queries': len(queries),
+            'bytes': len(response.content),
+            **latency_summary(latencies),
+        }
+    return results
+
+
+def run_load(base_url, paths, concurrency=16, duration=10.0, timeout=30.0):
+    """
+    Request every path round-robin from ``concurrency`` threads for
+    ``duration`` seconds against a running server. Per path and in total:
+    requests, errors, req/s and latency percentiles.
+    """
+    latencies = {name: [] for name in paths}
+    errors = {name: 0 for name in paths}
+    lock = threading.Lock()
+    names = list(paths)
+    deadline = time.perf_counter() + duration
+    
+    def worker(offset):
+        count = offset
+        while time.perf_counter() < deadline:
+            name = names[count % len(names)]
+            count += 1
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url.rstrip('/') + paths[name], timeout=timeout) as response:
+                    response.read()
+                failed = False
+            except (urllib.error.URLError, OSError):
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[name].append(elapsed)
+                errors[name] += failed
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    results = {
+        name: {'path': paths[name], 'requests': len(latencies[name]), 'errors': errors[name],
+               'rps': round(len(latencies[name]) / elapsed, 1), **latency_summary(latencies[name])}
+        for name in paths
+    }
+    everything = [latency for values in latencies.values() for latency in values]
+    results['_total'] = {
+        'requests': len(everything), 'errors': sum(errors.values()),
+        'rps': round(len(everything) / elapsed, 1), **latency_summary(everything),
+    }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, mode, results, settings):
+    """Save a run as JSON; ``path`` may be a directory (one file per commit)"""
+    commit = git_commit()
+    if os.path.isdir(path) or path.endswith(os.sep):
+        os.makedirs(path, exist_ok=True)
+        path = os.path.join(path, f'{mode}-{commit or "nogit"}-{time.strftime("%Y%m%d-%H%M%S")}.json')
+    with open(path, 'w') as handle:
+        json.dump({
+            'mode': mode, 'commit': commit, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'settings': settings, 'results': results,
+        }, handle, indent=2, sort_keys=True)
+    return path
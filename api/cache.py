@@ -0,0 +1,54 @@
+"""
+Per-project cache versioning
+
+Payloads derived from a project and its children (facets, bundles,
+comparisons) embed the project's current version in their cache key.
+invalidate_projects() gives the project a new version, which orphans every
+cached entry built from the old data without having to know their keys.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'project-version:{}'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def project_versions(project_ids):
+    """Current version of each project, creating missing ones"""
+    keys = {VERSION_KEY.format(pk): pk for pk in project_ids}
+    found = cache.get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {pk: found[key] for key, pk in keys.items()}
+
+
+def project_cache_key(prefix, project_ids, *extra):
+    """Cache key for a payload built from the given projects"""
+    versions = project_versions(project_ids)
+    key = ':'.join([prefix] + [f'{pk}.{versions[pk]}' for pk in sorted(versions)] + [str(part) for part in extra])
+    if len(key) > 200:
+        # memcached keys are limited to 250 characters
+        key = f'{prefix}:{hashlib.md5(key.encode()).hexdigest()}'
+    return key
+
+
+def invalidate_projects(project_ids):
+    """Drop every cached payload built from the given projects"""
+    project_ids = {pk for pk in project_ids if pk is not None}
+    if project_ids:
+        cache.set_many({VERSION_KEY.format(pk): _new_version() for pk in project_ids}, None)
+
+
+def invalidate_projects_on_commit(project_ids):
+    """Invalidate once the current transaction commits, so readers never re-cache old rows"""
+    project_ids = set(project_ids)
+    transaction.on_commit(lambda: invalidate_projects(project_ids))
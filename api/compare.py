@@ -0,0 +1,97 @@
+"""
+Side-by-side project comparison
+
+Built from the denormalized project columns plus three GROUP BY queries
+(flat types, tower dates, amenities), so comparing projects never loads
+their flats.
+"""
+from django.db.models import Count, Max, Min, Q
+
+from .models import Flat, Project, ProjectAmenity, Tower
+
+MIN_COMPARE = 2
+MAX_COMPARE = 4
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def compare_projects(ids):
+    """
+    Comparison matrix for the given project ids, in request order.
+    
+    Returns None if any project does not exist.
+    """
+    projects = {
+        row['id']: row for row in Project.objects.filter(pk__in=ids).values(
+            'id', 'title', 'location', 'city__name', 'city_name', 'project_status',
+            'price_min', 'price_max', 'carpet_area_min', 'carpet_area_max',
+            'towers_count', 'flats_count', 'available_flats_count',
+        )
+    }
+    if len(projects) != len(set(ids)):
+        return None
+    
+    flat_types = {pk: {} for pk in projects}
+    rows = (
+        Flat.objects.filter(tower__project_id__in=ids).order_by()
+        .values_list('tower__project_id', 'flat_type')
+        .annotate(
+            total=Count('id'), available=Count('id', filter=Q(status='available')),
+            min_price=Min('price'), max_price=Max('price'),
+            min_area=Min('carpet_area'), max_area=Max('carpet_area'),
+        )
+    )
+    for project_id, flat_type, total, available, min_price, max_price, min_area, max_area in rows:
+        flat_types[project_id][flat_type] = {
+            'total': total, 'available': available,
+            'price': {'min': _number(min_price), 'max': _number(max_price)},
+            'carpet_area': {'min': _number(min_area), 'max': _number(max_area)},
+        }
+    
+    possession = {
+        row.pop('project_id'): row for row in Tower.objects.filter(project_id__in=ids).order_by().values('project_id').annotate(
+            earliest=Min('completion_date'), latest=Max('completion_date'),
+            rera_latest=Max('rera_completion_date'),
+        )
+    }
+    
+    amenities = {pk: set() for pk in projects}
+    names = {}
+    for project_id, name in ProjectAmenity.objects.filter(project_id__in=ids).values_list('project_id', 'name'):
+        key = name.strip().lower()
+        names.setdefault(key, name.strip())
+        amenities[project_id].add(key)
+    common = set.intersection(*amenities.values()) if amenities else set()
+    
+    columns = []
+    for pk in dict.fromkeys(ids):
+        project = projects[pk]
+        dates = possession.get(pk, {})
+        columns.append({
+            'id': pk,
+            'title': project['title'],
+            'location': project['location'],
+            'city': project['city__name'] or project['city_name'],
+            'project_status': project['project_status'],
+            'price': {'min': _number(project['price_min']), 'max': _number(project['price_max'])},
+            'carpet_area': {'min': _number(project['carpet_area_min']), 'max': _number(project['carpet_area_max'])},
+            'towers_count': project['towers_count'],
+            'flats_count': project['flats_count'],
+            'available_flats_count': project['available_flats_count'],
+            'flat_types': flat_types[pk],
+            'possession': {
+                'earliest': dates.get('earliest'),
+                'latest': dates.get('latest'),
+                'rera_latest': dates.get('rera_latest'),
+            },
+            'unique_amenities': sorted(names[key] for key in amenities[pk] - common),
+        })
+    
+    all_types = sorted({flat_type for types in flat_types.values() for flat_type in types})
+    return {
+        'projects': columns,
+        'flat_types': all_types,
+        'common_amenities': sorted(names[key] for key in common),
+    }
@@ -0,0 +1,315 @@
+"""
+Declarative list filters and ordering
+
+A FilterSet maps query parameters to ORM lookups with type coercion, and
+?ordering= to a whitelist of public names backed by indexed columns:
+
+    class FlatFilterSet(FilterSet):
+        tower = Filter('tower_id', integer, multiple=True)          # ?tower=3 or ?tower__in=3,4
+        status = Filter('status', choices=Flat.STATUS_CHOICES, multiple=True)
+        search = SearchFilter('flat_number', 'flat_type')
+        ordering = Ordering({'price': ('price',), ...}, default=('floor_number', 'flat_number'))
+
+Malformed values, unknown choices and orderings outside the whitelist raise
+api.exceptions.ValidationError (400) naming the parameter; strict=False
+filters ignore malformed values instead. Parameters a FilterSet does not
+declare are ignored. FilterSet(params).filter(queryset) needs no request,
+so the SQL for a set of parameters can be checked directly:
+
+    str(FlatFilterSet({'status__in': 'sold,hold'}).filter(Flat.objects.all()).query)
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from .exceptions import ValidationError
+from .geo import filter_near, parse_point
+from .models import Flat, Project
+
+MAX_VALUES = 100
+MAX_ORDERING_FIELDS = 3
+DEFAULT_NEAR_RADIUS_KM = 10
+MAX_NEAR_RADIUS_KM = 200
+
+
+def integer(value):
+    return int(value)
+
+
+def decimal(value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    if not number.is_finite():
+        raise ValueError(value)
+    return number
+
+
+def boolean(value):
+    lowered = value.lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(value)
+
+
+def point(value):
+    """(lat, lng) from "lat,lng" """
+    parsed = parse_point(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Filter:
+    """
+    One query parameter.
+    
+    The value is converted with ``type`` and checked against ``choices``;
+    with multiple=True, ?<name>__in=a,b filters on any of the values.
+    ``method`` names a FilterSet method(queryset, value) used instead of
+    the lookup.
+    """
+    
+    def __init__(self, lookup=None, type=str, choices=None, multiple=False, method=None, strict=True):
+        self.lookup = lookup
+        self.type = type
+        self.choices = [value for value, label in choices] if choices else None
+        self.multiple = multiple
+        self.method = method
+        self.strict = strict
+        self.name = None
+    
+    def coerce(self, value):
+        try:
+            value = self.type(value.strip())
+        except (TypeError, ValueError):
+            raise ValidationError(f'{self.name}: invalid value "{value}"')
+        if self.choices is not None and value not in self.choices:
+            raise ValidationError(f'{self.name} must be one of: {", ".join(self.choices)}')
+        return value
+    
+    def split(self, name, value):
+        parts = [part for part in value.split(',') if part.strip()]
+        if len(parts) > MAX_VALUES:
+            raise ValidationError(f'At most {MAX_VALUES} values for {name}')
+        return [self.coerce(part) for part in parts]
+    
+    def requested(self, params):
+        """(lookup suffix, value) for this filter in ``params``, or None"""
+        if params.get(self.name):
+            return '', self.coerce(params[self.name])
+        if self.multiple and params.get(f'{self.name}__in'):
+            return '__in', self.split(f'{self.name}__in', params[f'{self.name}__in'])
+        return None
+    
+    def apply(self, filterset, queryset):
+        try:
+            requested = self.requested(filterset.params)
+        except ValidationError:
+            if self.strict:
+                raise
+            return queryset
+        if requested is None:
+            return queryset
+        suffix, value = requested
+        if self.method:
+            return getattr(filterset, self.method)(queryset, value)
+        return queryset.filter(**{self.lookup + suffix: value})
+
+
+class ListFilter(Filter):
+    """Comma-separated values in the parameter itself, e.g. ?ids=3,1,2"""
+    
+    def requested(self, params):
+        if params.get(self.name):
+            return '__in', self.split(self.name, params[self.name])
+        return None
+
+
+class SearchFilter(Filter):
+    """Case-insensitive substring match on any of ``fields``"""
+    
+    def __init__(self, *fields):
+        super().__init__()
+        self.fields = fields
+    
+    def apply(self, filterset, queryset):
+        value = filterset.params.get(self.name)
+        if not value:
+            return queryset
+        query = Q()
+        for field in self.fields:
+            query |= Q(**{f'{field}__icontains': value})
+        return queryset.filter(query)
+
+
+class Ordering:
+    """
+    ?ordering=name,-other over ``fields`` (public name -> order_by columns).
+    
+    Only names in the whitelist are accepted, so a request cannot order by
+    an unindexed or joined column.
+    """
+    
+    def __init__(self, fields, default):
+        self.fields = fields
+        self.default = default
+    
+    def columns(self, value, fields):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        if len(names) > MAX_ORDERING_FIELDS:
+            raise ValidationError(f'At most {MAX_ORDERING_FIELDS} ordering fields')
+        columns = []
+        for name in names:
+            descending = name.startswith('-')
+            if name.lstrip('-') not in fields:
+                raise ValidationError(f'Cannot order by "{name.lstrip("-")}"; use one of: {", ".join(fields)}')
+            for column in fields[name.lstrip('-')]:
+                if descending:
+                    column = column[1:] if column.startswith('-') else '-' + column
+                columns.append(column)
+        return columns
+
+
+class FilterSet:
+    """Filters declared as class attributes, applied in declaration order"""
+    ordering = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.filters = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Filter):
+                    value.name = name
+                    cls.filters[name] = value
+    
+    def __init__(self, params):
+        self.params = params
+    
+    def filter(self, queryset):
+        for item in self.filters.values():
+            queryset = item.apply(self, queryset)
+        if self.ordering is not None:
+            value = self.params.get('ordering')
+            queryset = queryset.order_by(*(self.ordering.columns(value, self.ordering_fields()) if value else self.default_ordering()))
+        return queryset
+    
+    def ordering_fields(self):
+        return self.ordering.fields
+    
+    def default_ordering(self):
+        return self.ordering.default
+
+
+class ProjectFilterSet(FilterSet):
+    ids = ListFilter('pk', integer)
+    property_type = Filter('property_type', choices=Project.PROPERTY_TYPE_CHOICES, multiple=True)
+    transaction_type = Filter('transaction_type', multiple=True)
+    featured = Filter('featured', boolean)
+    is_hot = Filter('is_hot', boolean)
+    city_id = Filter('city_id', integer, multiple=True)
+    city = Filter(method='filter_city')
+    project_status = Filter('project_status', choices=Project.PROJECT_STATUS_CHOICES, multiple=True)
+    flat_type = Filter(choices=Project.FLAT_TYPE_CHOICES, method='filter_flat_type')
+    search = SearchFilter('title', 'location', 'city__name', 'city_name')
+    # Price/area ranges overlap the requested ones (indexed range columns);
+    # malformed numbers are ignored, as they always have been
+    min_price = Filter('price_max__gte', decimal, strict=False)
+    max_price = Filter('price_min__lte', decimal, strict=False)
+    # Something in the project is affordable
+    budget = Filter('price_min__lte', decimal, strict=False)
+    min_area = Filter('carpet_area_max__gte', decimal, strict=False)
+    max_area = Filter('carpet_area_min__lte', decimal, strict=False)
+    near = Filter(type=point, method='filter_near', strict=False)
+    ordering = Ordering({
+        'created_at': ('created_at',),
+        'views': ('views',),
+        'title': ('title',),
+        'price': ('price_min',),
+        'price_min': ('price_min',),
+        'price_max': ('price_max',),
+        'carpet_area': ('carpet_area_min',),
+        'carpet_area_min': ('carpet_area_min',),
+        'carpet_area_max': ('carpet_area_max',),
+        'distance_km': ('distance_km',),
+        # Most trending first (decayed recent views, see api/trending.py)
+        'trending': ('-trending_score',),
+    }, default=('-created_at',))
+    
+    def filter_city(self, queryset, value):
+        if self.params.get('city_id') or self.params.get('city_id__in'):
+            return queryset
+        return queryset.filter(Q(city__name__icontains=value) | Q(city_name__icontains=value))
+    
+    def filter_flat_type(self, queryset, value):
+        return queryset.filter(
+            Q(available_flat_types__icontains=value) |
+            Q(towers__flats__flat_type=value)
+        ).distinct()
+    
+    def filter_near(self, queryset, value):
+        # Indexed bounding box first, then the exact haversine distance
+        try:
+            radius = float(decimal(self.params.get('radius_km', '')))
+        except ValueError:
+            radius = 0
+        radius = radius if radius > 0 else DEFAULT_NEAR_RADIUS_KM
+        return filter_near(queryset, value[0], value[1], min(radius, MAX_NEAR_RADIUS_KM))
+    
+    def is_near(self):
+        return parse_point(self.params.get('near')) is not None
+    
+    def ordering_fields(self):
+        # distance_km is only annotated by ?near=
+        fields = dict(self.ordering.fields)
+        if not self.is_near():
+            del fields['distance_km']
+        return fields
+    
+    def default_ordering(self):
+        return ('distance_km',) if self.is_near() else self.ordering.default
+
+
+class BlogPostFilterSet(FilterSet):
+    project = Filter('project_id', integer)
+    search = SearchFilter('title', 'content', 'category')
+    ordering = Ordering({
+        'created_at': ('created_at',),
+        'views': ('views',),
+        'title': ('title',),
+    }, default=('-created_at',))
+
+
+class TowerFilterSet(FilterSet):
+    ids = ListFilter('pk', integer)
+    project = Filter('project_id', integer, multiple=True)
+
+
+class ProjectChildFilterSet(FilterSet):
+    """Project images and amenities"""
+    project = Filter('project_id', integer, multiple=True)
+
+
+class TowerAmenityFilterSet(FilterSet):
+    tower = Filter('tower_id', integer, multiple=True)
+
+
+class FlatFilterSet(FilterSet):
+    ids = ListFilter('pk', integer)
+    tower = Filter('tower_id', integer, multiple=True)
+    flat_type = Filter('flat_type', choices=Flat.FLAT_TYPE_CHOICES, multiple=True)
+    status = Filter('status', choices=Flat.STATUS_CHOICES, multiple=True)
+    floor = Filter('floor_number', integer, multiple=True)
+    search = SearchFilter('flat_number', 'flat_type')
+    # floor_number/flat_number use the (tower, floor_number, flat_number)
+    # index when the list is filtered to one tower
+    ordering = Ordering({
+        'floor_number': ('floor_number', 'flat_number'),
+        'flat_number': ('flat_number',),
+        'price': ('price',),
+        'carpet_area': ('carpet_area',),
+    }, default=('floor_number', 'flat_number'))
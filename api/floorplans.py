@@ -0,0 +1,121 @@
+"""
+Floor-plan generator
+
+Expands a per-floor layout template into every Flat row of a tower. Parking
+floors (the bottom ``parking_floors``) and refuge floors are skipped, prices
+follow a price-per-sqft slope by floor, and rows are upserted on
+(tower, flat_number) so re-running a template is idempotent. Flat status is
+never overwritten, so sold/reserved flats survive a regeneration.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import saved_searches
+from .cache import invalidate_projects_on_commit
+from .inventory import recount_towers
+from .models import Flat
+
+# Columns refreshed when a generated flat already exists (status is kept)
+UPSERT_FIELDS = [
+    'flat_type', 'floor_number', 'carpet_area', 'built_up_area', 'super_area',
+    'price', 'price_per_sqft', 'facing', 'balcony', 'parking', 'updated_at',
+]
+
+
+class FloorPlanError(ValueError):
+    """The template does not fit the tower"""
+
+
+def default_refuge_floors(tower):
+    """Spread ``tower.refugee_floors`` evenly over the residential floors"""
+    first = tower.parking_floors + 1
+    span = tower.total_floors - tower.parking_floors
+    count = tower.refugee_floors
+    if count <= 0 or span <= 0:
+        return []
+    return sorted({first - 1 + round(k * span / (count + 1)) for k in range(1, count + 1)})
+
+
+def residential_floors(tower, refuge_floors=None):
+    """Floor numbers that get flats: above parking, excluding refuge floors"""
+    if tower.total_floors <= tower.parking_floors:
+        raise FloorPlanError('Tower has no floors above parking; set total_floors first')
+    refuge = set(default_refuge_floors(tower) if refuge_floors is None else refuge_floors)
+    floors = [floor for floor in range(tower.parking_floors + 1, tower.total_floors + 1) if floor not in refuge]
+    if tower.residential_floors:
+        floors = floors[:tower.residential_floors]
+    return floors
+
+
+def build_flats(tower, template):
+    """Unsaved Flat instances for a validated FloorPlanTemplateSerializer payload"""
+    layout = sorted(template['layout'], key=lambda unit: unit['unit'])
+    if tower.per_floor_flats and len(layout) != tower.per_floor_flats:
+        raise FloorPlanError(f'Layout has {len(layout)} units but the tower has {tower.per_floor_flats} flats per floor')
+    
+    floors = residential_floors(tower, template.get('refuge_floors'))
+    base_rate = template.get('base_price_per_sqft')
+    step = template.get('price_per_sqft_step') or Decimal('0')
+    tower_label = tower.tower_number or tower.name
+    cents = Decimal('0.01')
+    
+    flats = []
+    for level, floor in enumerate(floors):
+        for unit in layout:
+            rate = unit.get('base_price_per_sqft') or base_rate
+            price_per_sqft = price = None
+            if rate is not None:
+                price_per_sqft = (rate + step * level).quantize(cents)
+                price = (price_per_sqft * unit['carpet_area']).quantize(cents)
+            flats.append(Flat(
+                tower=tower,
+                flat_number=template['flat_number_format'].format(tower=tower_label, floor=floor, unit=unit['unit']),
+                flat_type=unit['flat_type'],
+                floor_number=floor,
+                carpet_area=unit['carpet_area'],
+                built_up_area=unit.get('built_up_area'),
+                super_area=unit.get('super_area'),
+                price=price,
+                price_per_sqft=price_per_sqft,
+                facing=unit.get('facing'),
+                balcony=unit.get('balcony', False),
+                parking=unit.get('parking', False),
+            ))
+    numbers = [flat.flat_number for flat in flats]
+    if len(numbers) != len(set(numbers)):
+        raise FloorPlanError('flat_number_format produces duplicate flat numbers; include {floor} and {unit}')
+    return floors, flats
+
+
+def generate_flats(tower, template, dry_run=False, batch_size=500):
+    """Upsert the flats described by ``template``; returns a summary dict"""
+    floors, flats = build_flats(tower, template)
+    existing = set(Flat.objects.filter(tower=tower).values_list('flat_number', flat=True))
+    existing.intersection_update(flat.flat_number for flat in flats)
+    summary = {
+        'tower': tower.id,
+        'floors': floors,
+        'flats': len(flats),
+        'created': len(flats) - len(existing),
+        'updated': len(existing),
+        'dry_run': dry_run,
+    }
+    if dry_run:
+        return summary
+    
+    now = timezone.now()
+    for flat in flats:
+        flat.updated_at = now
+    with transaction.atomic():
+        Flat.objects.bulk_create(
+            flats, batch_size=batch_size,
+            update_conflicts=True, unique_fields=['tower', 'flat_number'], update_fields=UPSERT_FIELDS,
+        )
+        # bulk writes bypass the model signals
+        recount_towers([tower.id])
+        invalidate_projects_on_commit([tower.project_id])
+        new_numbers = [flat.flat_number for flat in flats if flat.flat_number not in existing]
+        saved_searches.match_on_commit(flat_ids=Flat.objects.filter(tower=tower, flat_number__in=new_numbers).values_list('id', flat=True))
+    return summary
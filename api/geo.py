@@ -0,0 +1,118 @@
+"""
+Distance search over Project.latitude/longitude
+
+"Near me" queries first cut the table down with a bounding box on the
+indexed (latitude, longitude) columns, then compute the haversine distance
+in SQL for the remaining rows only. Coordinates are backfilled offline from
+a local gazetteer file (see the geocode_projects management command).
+"""
+import csv
+import math
+import re
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def parse_point(value):
+    """(lat, lng) from a "lat,lng" string, or None when malformed or out of range"""
+    try:
+        lat, lng = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    (min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km.
+    
+    The longitude bounds are None when the box reaches a pole or wraps
+    around the antimeridian; only latitude is prefiltered then.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), None, None
+    dlng = radius_km / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km"""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng):
+    """SQL haversine distance (km) from (lat, lng) to the row's coordinates"""
+    lat_rad = Radians(F('latitude'), output_field=FloatField())
+    dlat = Radians(F('latitude') - Value(lat), output_field=FloatField())
+    dlng = Radians(F('longitude') - Value(lng), output_field=FloatField())
+    a = (
+        Power(Sin(dlat / 2), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(lat_rad) * Power(Sin(dlng / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filter_near(queryset, lat, lng, radius_km):
+    """Projects within radius_km of (lat, lng), annotated with distance_km"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lng is not None:
+        queryset = queryset.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    return queryset.annotate(distance_km=distance_expression(lat, lng)).filter(distance_km__lte=radius_km)
+
+
+def normalize_place(name):
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+
+def load_gazetteer(path):
+    """
+    Place name -> (lat, lng) from a local gazetteer file.
+    
+    Accepts a CSV with name/latitude/longitude columns, or a GeoNames dump
+    (tab-separated, no header), whose alternate names are indexed too.
+    """
+    places = {}
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.endswith('.csv'):
+            rows = ((row['name'], row['latitude'], row['longitude'], '') for row in csv.DictReader(handle))
+        else:
+            rows = ((row[1], row[4], row[5], row[3]) for row in csv.reader(handle, delimiter='\t', quoting=csv.QUOTE_NONE) if len(row) > 5)
+        for name, lat, lng, alternates in rows:
+            point = (float(lat), float(lng))
+            for place in [name] + alternates.split(','):
+                key = normalize_place(place)
+                if key:
+                    places.setdefault(key, point)
+    return places
+
+
+def geocode(project, places):
+    """
+    Best gazetteer match for a project, trying the map address, the
+    locality and then the city; each comma-separated part of an address is
+    tried on its own, most specific first. Returns (lat, lng) or None.
+    """
+    candidates = [project.map_location, project.location, project.get_city_name()]
+    for text in candidates:
+        if not text:
+            continue
+        for part in [text] + text.split(','):
+            point = places.get(normalize_place(part))
+            if point:
+                return point
+    return None
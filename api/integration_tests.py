@@ -4,7 +4,7 @@ Integration Tests for API
 from django.test import TestCase, Client
 from django.utils import timezone
 from rest_framework import status
-from api.models import User, OTP, Contact, Project, City
+from api.models import ClientUser, OTP, Contact, Project, City
 
 
 class AuthenticationIntegrationTestCase(TestCase):
@@ -23,25 +23,36 @@ class AuthenticationIntegrationTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         otp_code = response.json()['otp']
         
-        # 2. Verify OTP and create user
+        # 2. Verify OTP; a new mobile has to complete its profile
         response = self.client.post('/api/auth/verify-otp/', {
             'mobile': '1234567890',
             'otp_code': otp_code,
-            'purpose': 'signup',
+            'purpose': 'signup'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['needs_registration'])
+        
+        # 3. Complete registration
+        response = self.client.post('/api/auth/complete-registration/', {
+            'mobile': '1234567890',
             'first_name': 'Test',
             'last_name': 'User',
             'email': 'test@example.com'
         })
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('user', response.json())
+        self.assertIn('access_token', response.json())
         
-        # 3. Verify user was created
-        user = User.objects.get(mobile='1234567890')
+        # 4. Verify user was created
+        user = ClientUser.objects.get(mobile='1234567890')
         self.assertEqual(user.first_name, 'Test')
         self.assertEqual(user.last_name, 'User')
+        self.assertTrue(user.is_registered)
     
     def test_complete_login_flow(self):
         """Test complete login flow"""
+        ClientUser.objects.create(mobile='1234567890', first_name='Test', last_name='User', is_registered=True)
+        
         # 1. Send OTP
         response = self.client.post('/api/auth/send-otp/', {
             'mobile': '1234567890',
@@ -58,6 +69,7 @@ class AuthenticationIntegrationTestCase(TestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('user', response.json())
+        self.assertFalse(response.json()['needs_registration'])
 
 
 class ProjectIntegrationTestCase(TestCase):
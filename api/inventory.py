@@ -0,0 +1,358 @@
+"""
+Flat inventory: denormalized counters, price/area ranges and facets
+
+Flat writes adjust the Tower/Project counters with F() expressions (see
+api/signals.py), so reads never aggregate. Project price/area ranges are
+recomputed per project when a flat's price or area changes, and once per
+project after the commit when flats are deleted. Bulk writes that bypass model
+signals (bulk_create, queryset.update) call recount_towers() afterwards, and
+the recount_inventory management command repairs any drift. They also queue
+saved-search matching for flats they create or make available.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+
+from . import saved_searches
+from .cache import invalidate_projects_on_commit
+from .models import Flat, Project, Tower
+
+# Flat status -> counter column on Tower and Project
+STATUS_COUNTERS = {status: f'{status}_flats_count' for status, label in Flat.STATUS_CHOICES}
+COUNTER_FIELDS = ['flats_count'] + list(STATUS_COUNTERS.values())
+RANGE_FIELDS = ['price_min', 'price_max', 'carpet_area_min', 'carpet_area_max']
+
+
+def _update_counters(tower_id, changes):
+    Tower.objects.filter(pk=tower_id).update(**changes)
+    Project.objects.filter(towers__id=tower_id).update(**changes)
+
+
+def add_flat(tower_id, status, delta=1):
+    """Count a flat in (delta=1) or out of (delta=-1) a tower and its project"""
+    _update_counters(tower_id, {
+        'flats_count': F('flats_count') + delta,
+        STATUS_COUNTERS[status]: F(STATUS_COUNTERS[status]) + delta,
+    })
+
+
+def move_flat_status(tower_id, old_status, new_status):
+    """Move one flat between status counters"""
+    if old_status == new_status:
+        return
+    _update_counters(tower_id, {
+        STATUS_COUNTERS[old_status]: F(STATUS_COUNTERS[old_status]) - 1,
+        STATUS_COUNTERS[new_status]: F(STATUS_COUNTERS[new_status]) + 1,
+    })
+
+
+def flat_count_annotations(prefix=''):
+    """Count() annotations for every counter column over a Flat relation"""
+    annotations = {'flats_count': Count(f'{prefix}id')}
+    for status, field in STATUS_COUNTERS.items():
+        annotations[field] = Count(f'{prefix}id', filter=Q(**{f'{prefix}status': status}))
+    return annotations
+
+
+def flat_range_annotations(prefix=''):
+    """Min()/Max() annotations for the project price/area range columns"""
+    return {
+        'price_min': Min(f'{prefix}price'), 'price_max': Max(f'{prefix}price'),
+        'carpet_area_min': Min(f'{prefix}carpet_area'), 'carpet_area_max': Max(f'{prefix}carpet_area'),
+    }
+
+
+def project_ranges(project, row):
+    """Range column values for a project from its flats' aggregate row; Project.price counts as a price too"""
+    prices = [value for value in (row.get('price_min'), row.get('price_max'), project.price) if value is not None]
+    return {
+        'price_min': min(prices) if prices else None,
+        'price_max': max(prices) if prices else None,
+        'carpet_area_min': row.get('carpet_area_min'),
+        'carpet_area_max': row.get('carpet_area_max'),
+    }
+
+
+def refresh_project_ranges(project_ids):
+    """Recompute the price/area range columns of the given projects"""
+    project_ids = {pk for pk in project_ids if pk is not None}
+    if not project_ids:
+        return 0
+    rows = {
+        row.pop('tower__project_id'): row
+        for row in Flat.objects.filter(tower__project_id__in=project_ids).order_by().values('tower__project_id').annotate(**flat_range_annotations())
+    }
+    changed = []
+    for project in Project.objects.filter(pk__in=project_ids).only('id', 'price', *RANGE_FIELDS):
+        ranges = project_ranges(project, rows.get(project.id, {}))
+        if any(getattr(project, field) != value for field, value in ranges.items()):
+            for field, value in ranges.items():
+                setattr(project, field, value)
+            changed.append(project)
+    Project.objects.bulk_update(changed, RANGE_FIELDS)
+    return len(changed)
+
+
+def refresh_project_ranges_on_commit(project_ids):
+    """
+    Refresh the ranges once the current transaction commits, once per project
+    however many flats asked for it (e.g. a tower delete cascading to its flats)
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_pending_range_projects', None)
+    # Still queued in this transaction (not run, not rolled back): join it
+    if pending is not None and any(entry[1] is pending[1] for entry in connection.run_on_commit):
+        pending[0].update(project_ids)
+        return
+    project_ids = set(project_ids)
+    
+    def run():
+        refresh_project_ranges(project_ids)
+    
+    connection._pending_range_projects = (project_ids, run)
+    transaction.on_commit(run)
+
+
+def recount_towers(tower_ids):
+    """Recompute counters of the given towers (and their projects) from the flats table"""
+    tower_ids = set(tower_ids)
+    if not tower_ids:
+        return 0
+    counts = {
+        row.pop('tower_id'): row
+        for row in Flat.objects.filter(tower_id__in=tower_ids).order_by().values('tower_id').annotate(**flat_count_annotations())
+    }
+    changed = []
+    towers = Tower.objects.filter(pk__in=tower_ids).only('id', 'project_id', *COUNTER_FIELDS)
+    for tower in towers:
+        row = counts.get(tower.id, {})
+        if any(getattr(tower, field) != row.get(field, 0) for field in COUNTER_FIELDS):
+            for field in COUNTER_FIELDS:
+                setattr(tower, field, row.get(field, 0))
+            changed.append(tower)
+    Tower.objects.bulk_update(changed, COUNTER_FIELDS)
+    project_ids = {tower.project_id for tower in towers}
+    return len(changed) + recount_projects(project_ids)
+
+
+def recount_projects(project_ids):
+    """Recompute tower and flat counters and price/area ranges of the given projects"""
+    project_ids = set(project_ids)
+    if not project_ids:
+        return 0
+    fields = ['towers_count'] + COUNTER_FIELDS + RANGE_FIELDS
+    flat_counts = {
+        row.pop('tower__project_id'): row
+        for row in Flat.objects.filter(tower__project_id__in=project_ids).order_by().values('tower__project_id').annotate(
+            **flat_count_annotations(), **flat_range_annotations()
+        )
+    }
+    tower_counts = dict(
+        Tower.objects.filter(project_id__in=project_ids).order_by().values('project_id').annotate(n=Count('id')).values_list('project_id', 'n')
+    )
+    changed = []
+    for project in Project.objects.filter(pk__in=project_ids).only('id', 'price', *fields):
+        row = flat_counts.get(project.id, {})
+        row = dict(row, towers_count=tower_counts.get(project.id, 0), **project_ranges(project, row))
+        if any(getattr(project, field) != row.get(field, 0) for field in fields):
+            for field in fields:
+                setattr(project, field, row.get(field, 0))
+            changed.append(project)
+    Project.objects.bulk_update(changed, fields)
+    return len(changed)
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def _merge_range(summary, key, low, high):
+    current = summary.setdefault(key, {'min': None, 'max': None})
+    if low is not None and (current['min'] is None or low < current['min']):
+        current['min'] = low
+    if high is not None and (current['max'] is None or high > current['max']):
+        current['max'] = high
+
+
+def flat_facets(project_id):
+    """
+    Inventory facets for a project from a single GROUP BY query.
+    
+    ``cells`` holds one row per (flat_type, status, floor) with its count
+    and price/area ranges, so clients (and select_facets) can answer
+    "2BHK available on floors 5-10" without fetching flats.
+    """
+    rows = (
+        Flat.objects.filter(tower__project_id=project_id)
+        .order_by()
+        .values_list('flat_type', 'status', 'floor_number')
+        .annotate(
+            count=Count('id'),
+            min_price=Min('price'), max_price=Max('price'),
+            min_area=Min('carpet_area'), max_area=Max('carpet_area'),
+        )
+        .order_by('flat_type', 'status', 'floor_number')
+    )
+    cells = [
+        [flat_type, status, floor, count, _number(min_price), _number(max_price), _number(min_area), _number(max_area)]
+        for flat_type, status, floor, count, min_price, max_price, min_area, max_area in rows
+    ]
+    facets = summarize_cells(cells)
+    facets['project'] = project_id
+    facets['cells'] = cells
+    return facets
+
+
+def summarize_cells(cells):
+    summary = {'total': 0, 'status_counts': {status: 0 for status in STATUS_COUNTERS}, 'flat_types': {}, 'floors': {}}
+    for flat_type, status, floor, count, min_price, max_price, min_area, max_area in cells:
+        summary['total'] += count
+        summary['status_counts'][status] += count
+        _merge_range(summary, 'price', min_price, max_price)
+        _merge_range(summary, 'carpet_area', min_area, max_area)
+        
+        by_type = summary['flat_types'].setdefault(flat_type, {'total': 0, 'status': {}})
+        by_type['total'] += count
+        by_type['status'][status] = by_type['status'].get(status, 0) + count
+        _merge_range(by_type, 'price', min_price, max_price)
+        _merge_range(by_type, 'carpet_area', min_area, max_area)
+        
+        by_floor = summary['floors'].setdefault(floor, {'total': 0, 'available': 0})
+        by_floor['total'] += count
+        if status == 'available':
+            by_floor['available'] += count
+    for key in ('price', 'carpet_area'):
+        summary.setdefault(key, {'min': None, 'max': None})
+    return summary
+
+
+def select_facets(cells, flat_type=None, status=None, floor_min=None, floor_max=None):
+    """Count and price/area ranges for a subset of facet cells"""
+    selected = [
+        cell for cell in cells
+        if (flat_type is None or cell[0] == flat_type)
+        and (status is None or cell[1] == status)
+        and (floor_min is None or cell[2] >= floor_min)
+        and (floor_max is None or cell[2] <= floor_max)
+    ]
+    summary = summarize_cells(selected)
+    return {'count': summary['total'], 'price': summary['price'], 'carpet_area': summary['carpet_area']}
+
+
+def bulk_import_flats(tower, rows, on_conflict='error', batch_size=500):
+    """
+    Validate and write many flats for one tower in a single transaction.
+    
+    ``on_conflict`` decides what happens to rows whose flat_number already
+    exists in the tower: 'error' rejects them, 'update' overwrites the
+    stored flat and 'skip' ignores them. Nothing is written if any row is
+    invalid. Returns (summary, row_errors).
+    """
+    from .serializers import FlatBulkRowSerializer
+    
+    # One ListSerializer validates every row with a single set of fields
+    serializer = FlatBulkRowSerializer(data=rows, many=True)
+    valid = serializer.is_valid()
+    errors = [
+        {'row': index, 'flat_number': rows[index].get('flat_number'), 'errors': row_errors}
+        for index, row_errors in enumerate(serializer.errors if not valid else []) if row_errors
+    ]
+    
+    # Duplicates inside the payload
+    seen = {}
+    for index, row in enumerate(rows):
+        number = str(row.get('flat_number', '')).strip()
+        if not number:
+            continue
+        if number in seen:
+            errors.append({'row': index, 'flat_number': number, 'errors': {'flat_number': [f'Duplicate of row {seen[number]}']}})
+        else:
+            seen[number] = index
+    
+    # Conflicts with stored flats, in one query
+    existing = {flat.flat_number: flat for flat in Flat.objects.filter(tower=tower, flat_number__in=list(seen))}
+    if on_conflict == 'error':
+        for number in existing:
+            errors.append({'row': seen[number], 'flat_number': number, 'errors': {'flat_number': ['Flat with this number already exists in this tower']}})
+    if errors:
+        return None, sorted(errors, key=lambda error: error['row'])
+    
+    now = timezone.now()
+    to_create, to_update, update_fields = [], [], {'updated_at'}
+    for data in serializer.validated_data:
+        flat = existing.get(data['flat_number'])
+        if flat is None:
+            to_create.append(Flat(tower=tower, **data))
+        elif on_conflict == 'update':
+            for field, value in data.items():
+                setattr(flat, field, value)
+            flat.updated_at = now
+            update_fields.update(data)
+            to_update.append(flat)
+    
+    with transaction.atomic():
+        Flat.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            Flat.objects.bulk_update(to_update, sorted(update_fields), batch_size=batch_size)
+        # bulk writes bypass the model signals
+        recount_towers([tower.id])
+        invalidate_projects_on_commit([tower.project_id])
+        saved_searches.match_on_commit(flat_ids=[flat.pk for flat in to_create])
+    
+    summary = {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'skipped': len(rows) - len(to_create) - len(to_update),
+    }
+    return summary, []
+
+
+def transition_flat_statuses(changes, default_to=None, allowed_from=None):
+    """
+    Move many flats to a new status with per-flat compare-and-set updates.
+    
+    Each flat is updated with ``UPDATE ... WHERE id = %s AND status = <status
+    just read>`` (plus ``AND updated_at = %s`` when the client sent the
+    version it saw), so a flat changed by someone else in between is reported
+    as a lost race instead of being overwritten. Returns (updated_ids, conflicts).
+    """
+    ids = [change['id'] for change in changes]
+    current = {row['id']: row for row in Flat.objects.filter(pk__in=ids).values('id', 'status', 'tower_id', 'updated_at')}
+    now = timezone.now()
+    updated, conflicts, tower_ids, available = [], [], set(), []
+    
+    with transaction.atomic():
+        for change in changes:
+            pk = change['id']
+            to = change.get('to') or default_to
+            row = current.get(pk)
+            if row is None:
+                conflicts.append({'id': pk, 'reason': 'not_found'})
+                continue
+            allowed = [status for status, targets in Flat.STATUS_TRANSITIONS.items() if to in targets]
+            if allowed_from:
+                allowed = [status for status in allowed if status in allowed_from]
+            if row['status'] not in allowed:
+                conflicts.append({'id': pk, 'reason': 'invalid_transition', 'status': row['status']})
+                continue
+            expected = change.get('updated_at')
+            if expected is not None and row['updated_at'] != expected:
+                conflicts.append({'id': pk, 'reason': 'stale', 'status': row['status'], 'updated_at': row['updated_at']})
+                continue
+            
+            queryset = Flat.objects.filter(pk=pk, status=row['status'])
+            if expected is not None:
+                queryset = queryset.filter(updated_at=expected)
+            if queryset.update(status=to, updated_at=now):
+                updated.append(pk)
+                tower_ids.add(row['tower_id'])
+                if to == 'available':
+                    available.append(pk)
+            else:
+                conflicts.append({'id': pk, 'reason': 'lost_race'})
+        
+        # queryset.update() bypasses the model signals
+        recount_towers(tower_ids)
+        invalidate_projects_on_commit(Tower.objects.filter(pk__in=tower_ids).values_list('project_id', flat=True))
+        saved_searches.match_on_commit(flat_ids=available)
+    return updated, conflicts
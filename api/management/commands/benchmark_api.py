@@ -0,0 +1,90 @@
+"""
+Benchmark the public API
+
+Usage:
+    # In-process: seed a throwaway test database, then measure latency,
+    # query count and payload size per endpoint
+    python manage.py benchmark_api --projects-per-city 50 --output benchmarks/
+    
+    # Same against the data already in the configured database
+    python manage.py benchmark_api --existing-db
+    
+    # Concurrent load against a running server (ids come from the local database)
+    python manage.py benchmark_api --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+
+Results are printed and, with --output, saved as JSON together with the git
+commit so runs can be compared across commits.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmarks import ENDPOINTS, endpoint_paths, profile_endpoints, run_load, sample_ids, write_results
+from api.seeding import SeedSpec, seed_catalog
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, query count and payload size of the public API endpoints'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS), help='Only these endpoints (repeatable)')
+        parser.add_argument('--output', help='JSON file, or directory for one file per run')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint (in-process mode)')
+        parser.add_argument('--existing-db', action='store_true', help='Use the configured database instead of a seeded test database')
+        parser.add_argument('--cities', type=int, default=3)
+        parser.add_argument('--projects-per-city', type=int, default=20)
+        parser.add_argument('--towers-per-project', type=int, default=3)
+        parser.add_argument('--flats-per-tower', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--url', help='Base URL of a running server: run the concurrent load driver instead')
+        parser.add_argument('--concurrency', type=int, default=16, help='Threads (load mode)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds (load mode)')
+    
+    def handle(self, *args, **options):
+        if options['url']:
+            return self.load(options)
+        
+        setup_test_environment()
+        old_name = None
+        try:
+            if not options['existing_db']:
+                old_name = connection.settings_dict['NAME']
+                connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                spec = SeedSpec(
+                    cities=options['cities'], projects_per_city=options['projects_per_city'],
+                    towers_per_project=options['towers_per_project'], floors_per_tower=max(1, options['flats_per_tower'] // 4),
+                    flats_per_floor=4, seed=options['seed'],
+                )
+                created = seed_catalog(spec)
+                self.stdout.write('Seeded ' + ', '.join(f'{count} {name}' for name, count in created.items()))
+            paths = endpoint_paths(sample_ids(), options['endpoint'])
+            results = profile_endpoints(paths, repeat=options['repeat'])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        
+        self.stdout.write(f'{"endpoint":<24} {"status":>6} {"queries":>7} {"bytes":>9} {"p50 ms":>9} {"p99 ms":>9}')
+        for name, row in results.items():
+            self.stdout.write(f'{name:<24} {row["status"]:>6} {row["queries"]:>7} {row["bytes"]:>9} {row["p50_ms"]:>9.2f} {row["p99_ms"]:>9.2f}')
+        self.save(options, 'profile', results)
+    
+    def load(self, options):
+        paths = endpoint_paths(sample_ids(), options['endpoint'])
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        results = run_load(options['url'], paths, concurrency=options['concurrency'], duration=options['duration'])
+        self.stdout.write(f'{"endpoint":<24} {"requests":>8} {"errors":>6} {"req/s":>8} {"p50 ms":>9} {"p99 ms":>9}')
+        for name, row in results.items():
+            if row['requests']:
+                self.stdout.write(f'{name:<24} {row["requests"]:>8} {row["errors"]:>6} {row["rps"]:>8.1f} {row["p50_ms"]:>9.2f} {row["p99_ms"]:>9.2f}')
+        self.save(options, 'load', results)
+    
+    def save(self, options, mode, results):
+        if options['output']:
+            settings = {key: options[key] for key in (
+                'endpoint', 'repeat', 'existing_db', 'cities', 'projects_per_city', 'towers_per_project',
+                'flats_per_tower', 'seed', 'url', 'concurrency', 'duration',
+            )}
+            path = write_results(options['output'], mode, results, settings)
+            self.stdout.write(self.style.SUCCESS(f'Saved {path}'))
@@ -0,0 +1,87 @@
+"""
+Compare the sync (WSGI) and async (ASGI) catalog read paths under concurrency
+
+Usage:
+    python manage.py benchmark_async
+    python manage.py benchmark_async --requests 1000 --concurrency 32 --path /api/projects/
+
+Each sync path is requested through the WSGI handler from a thread pool and
+its /api/async/ twin through the ASGI handler from one event loop, with the
+same number of requests in flight. Reports requests/sec, p50 and p99.
+Run it against a database with realistic data (see seed_scale).
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+from api.benchmarks import percentile
+
+DEFAULT_PATHS = ['/api/projects/', '/api/cities/', '/api/reviews/featured/', '/api/blog/']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark requests/sec and latency of the sync vs async read endpoints'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', help=f'Sync API path to compare (repeatable, default: {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path and mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight')
+    
+    def handle(self, *args, **options):
+        paths = options['path'] or DEFAULT_PATHS
+        total, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f'{total} requests per run, concurrency {concurrency}')
+        self.stdout.write(f'{"path":<32} {"mode":<6} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}')
+        for path in paths:
+            async_path = path.replace('/api/', '/api/async/', 1)
+            for mode, run in (('sync', self.run_sync), ('async', self.run_async)):
+                elapsed, latencies, errors = run(async_path if mode == 'async' else path, total, concurrency)
+                self.stdout.write(
+                    f'{path:<32} {mode:<6} {total / elapsed:>9.1f} '
+                    f'{percentile(latencies, 0.5) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f} {errors:>7}'
+                )
+    
+    def run_sync(self, path, total, concurrency):
+        def fetch(client):
+            started = time.perf_counter()
+            status_code = client.get(path).status_code
+            return time.perf_counter() - started, status_code
+        
+        def worker(count):
+            client = Client()
+            try:
+                return [fetch(client) for _ in range(count)]
+            finally:
+                connections.close_all()
+        
+        shares = [total // concurrency + (1 if index < total % concurrency else 0) for index in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = [result for batch in pool.map(worker, shares) for result in batch]
+        return self.summarize(time.perf_counter() - started, results)
+    
+    def run_async(self, path, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            limit = asyncio.Semaphore(concurrency)
+            
+            async def fetch():
+                async with limit:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - started, response.status_code
+            
+            return await asyncio.gather(*(fetch() for _ in range(total)))
+        
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        return self.summarize(time.perf_counter() - started, results)
+    
+    def summarize(self, elapsed, results):
+        latencies = [latency for latency, status_code in results]
+        errors = sum(1 for latency, status_code in results if status_code >= 400)
+        return elapsed, latencies, errors
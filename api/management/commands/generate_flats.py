@@ -0,0 +1,62 @@
+"""
+Generate a tower's flats from a floor-plan template file
+
+Usage:
+    python manage.py generate_flats --tower 3 --template layouts/tower_a.json
+    python manage.py generate_flats --tower 3 --template layouts/tower_a.json --dry-run
+
+Template format (JSON):
+    {
+        "layout": [
+            {"unit": 1, "flat_type": "2bhk", "carpet_area": "650", "facing": "East"},
+            {"unit": 2, "flat_type": "3bhk", "carpet_area": "920", "facing": "West"}
+        ],
+        "base_price_per_sqft": "9000",
+        "price_per_sqft_step": "50",
+        "flat_number_format": "{tower}-{floor}{unit:02d}",
+        "refuge_floors": [7, 14]
+    }
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.floorplans import FloorPlanError, generate_flats
+from api.models import Tower
+from api.serializers import FloorPlanTemplateSerializer
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create (or refresh) the flats of a tower from a per-floor layout template'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--tower', type=int, required=True, help='Tower id')
+        parser.add_argument('--template', required=True, help='Path to the JSON layout template')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be generated without writing')
+    
+    def handle(self, *args, **options):
+        try:
+            tower = Tower.objects.get(pk=options['tower'])
+        except Tower.DoesNotExist:
+            raise CommandError(f"Tower {options['tower']} does not exist")
+        
+        try:
+            with open(options['template']) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read template: {e}')
+        
+        serializer = FloorPlanTemplateSerializer(data=data)
+        if not serializer.is_valid():
+            raise CommandError(f'Invalid template: {json.dumps(serializer.errors)}')
+        
+        try:
+            summary = generate_flats(tower, serializer.validated_data, dry_run=options['dry_run'])
+        except FloorPlanError as e:
+            raise CommandError(str(e))
+        
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(f"{prefix}Floors: {', '.join(str(floor) for floor in summary['floors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{tower}: {summary['flats']} flats ({summary['created']} new, {summary['updated']} updated)"
+        ))
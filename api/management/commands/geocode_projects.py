@@ -0,0 +1,56 @@
+"""
+Backfill Project.latitude/longitude from a local gazetteer file
+
+Usage:
+    python manage.py geocode_projects --gazetteer data/places.csv
+    python manage.py geocode_projects --gazetteer IN.txt --overwrite
+
+The gazetteer is either a CSV with name,latitude,longitude columns or a
+GeoNames country dump (e.g. IN.txt). No network lookups are made.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import invalidate_projects
+from api.geo import geocode, load_gazetteer
+from api.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Fill in project coordinates by matching addresses against a gazetteer file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--gazetteer', required=True, help='Path to the gazetteer file (.csv or GeoNames .txt)')
+        parser.add_argument('--overwrite', action='store_true', help='Also re-geocode projects that already have coordinates')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without saving')
+    
+    def handle(self, *args, **options):
+        try:
+            places = load_gazetteer(options['gazetteer'])
+        except (OSError, KeyError, ValueError) as error:
+            raise CommandError(f'Could not read gazetteer: {error}')
+        
+        projects = Project.objects.select_related('city').only(
+            'id', 'title', 'map_location', 'location', 'city_name', 'city__name', 'latitude', 'longitude'
+        )
+        if not options['overwrite']:
+            projects = projects.filter(latitude__isnull=True)
+        
+        matched, unmatched = [], []
+        for project in projects:
+            point = geocode(project, places)
+            if point is None:
+                unmatched.append(project)
+                continue
+            project.latitude, project.longitude = (round(value, 6) for value in point)
+            matched.append(project)
+        
+        if not options['dry_run']:
+            # bulk_update bypasses the model signals
+            Project.objects.bulk_update(matched, ['latitude', 'longitude'], batch_size=500)
+            invalidate_projects([project.id for project in matched])
+        for project in unmatched:
+            self.stdout.write(f'No match for project {project.id} ({project.title})')
+        self.stdout.write(self.style.SUCCESS(
+            f'Geocoded {len(matched)} projects, {len(unmatched)} unmatched'
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
@@ -0,0 +1,44 @@
+"""
+Recompute the denormalized Tower/Project inventory counters
+
+Usage:
+    python manage.py recount_inventory
+    python manage.py recount_inventory --project 12
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.inventory import recount_projects, recount_towers
+from api.models import Project, Tower
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in the tower/project flat counters'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help='Only recount this project (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Towers recounted per transaction')
+    
+    def handle(self, *args, **options):
+        towers = Tower.objects.order_by('pk')
+        projects = Project.objects.order_by('pk')
+        if options['project']:
+            towers = towers.filter(project_id__in=options['project'])
+            projects = projects.filter(pk__in=options['project'])
+        
+        fixed = 0
+        tower_ids = list(towers.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(tower_ids), batch_size):
+            with transaction.atomic():
+                fixed += recount_towers(tower_ids[start:start + batch_size])
+        
+        # Projects without towers are not reached through recount_towers
+        project_ids = list(projects.values_list('pk', flat=True))
+        for start in range(0, len(project_ids), batch_size):
+            with transaction.atomic():
+                fixed += recount_projects(project_ids[start:start + batch_size])
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {len(tower_ids)} towers and {len(project_ids)} projects; fixed {fixed} rows'
+        ))
@@ -0,0 +1,20 @@
+"""
+Recompute the projects' trending scores from the hourly view buckets
+
+Run from cron every few minutes; buckets older than the window are deleted.
+
+Usage:
+    python manage.py refresh_trending
+"""
+from django.core.management.base import BaseCommand
+
+from api import trending
+
+
+class Command(BaseCommand):
+    help = 'Refresh Project.trending_score and prune expired view buckets'
+    
+    def handle(self, *args, **options):
+        scored = trending.refresh()
+        pruned = trending.prune()
+        self.stdout.write(self.style.SUCCESS(f'{scored} trending projects; pruned {pruned} expired view buckets'))
@@ -0,0 +1,139 @@
+"""
+Generate a large synthetic catalog for scale testing
+
+Usage:
+    # Defaults: 10k projects, 2M flats, 1M leads, 100k client users
+    python manage.py seed_scale --workers 8
+    
+    # One percent of that, with a different status mix
+    python manage.py seed_scale --scale 0.01 --status-weights available=40,sold=50,reserved=10
+
+The run is split into one chunk per city. Each chunk has its own random
+stream derived from --seed, so the generated rows are the same whatever the
+number of workers. Use a different --prefix to seed the same database again.
+"""
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from api import autocomplete
+from api.models import Flat
+from api.seeding import MAX_CHUNKS, MAX_USERS_PER_CHUNK, SeedSpec, seed_catalog
+
+
+def seed_chunk(job):
+    spec, prefix, chunk = job
+    return chunk, seed_catalog(spec, prefix=prefix, chunk=chunk)
+
+
+def share(total, parts, index):
+    return total // parts + (1 if index < total % parts else 0)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate cities, projects, towers, flats, media, leads, client users and OTPs'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=50, help='Cities, one chunk of work each')
+        parser.add_argument('--projects', type=int, default=10000, help='Projects in total')
+        parser.add_argument('--towers-per-project', type=int, default=2)
+        parser.add_argument('--floors-per-tower', type=int, default=25)
+        parser.add_argument('--flats-per-floor', type=int, default=4)
+        parser.add_argument('--images-per-project', type=int, default=4)
+        parser.add_argument('--blog-posts-per-project', type=int, default=1)
+        parser.add_argument('--leads-per-project', type=int, default=100, help='Enquiries and contacts per project')
+        parser.add_argument('--client-users', type=int, default=100000, help='Client users in total')
+        parser.add_argument('--otps-per-user', type=int, default=2)
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply the number of projects and client users by this factor')
+        parser.add_argument('--size-spread', type=float, default=0.3, help='Vary floors and leads by up to this fraction')
+        parser.add_argument('--status-weights', help='e.g. available=60,sold=30,reserved=7,hold=3')
+        parser.add_argument('--flat-type-weights', help='e.g. 1bhk=2,2bhk=4,3bhk=3')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='scale', help='Makes names, slugs and mobiles unique per run')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1, help='Processes seeding chunks in parallel')
+    
+    def handle(self, *args, **options):
+        chunks = options['cities']
+        if not 1 <= chunks <= MAX_CHUNKS:
+            raise CommandError(f'--cities must be between 1 and {MAX_CHUNKS}')
+        if not 0 <= options['size_spread'] < 1:
+            raise CommandError('--size-spread must be between 0 and 1')
+        projects = round(options['projects'] * options['scale'])
+        users = round(options['client_users'] * options['scale'])
+        if share(users, chunks, 0) > MAX_USERS_PER_CHUNK:
+            raise CommandError(f'At most {MAX_USERS_PER_CHUNK} client users per city')
+        
+        weights = {}
+        if options['status_weights']:
+            weights['status_weights'] = self.parse_weights(options['status_weights'], Flat.STATUS_CHOICES)
+        if options['flat_type_weights']:
+            weights['flat_type_weights'] = self.parse_weights(options['flat_type_weights'], Flat.FLAT_TYPE_CHOICES)
+        jobs = [
+            (SeedSpec(
+                cities=1, projects_per_city=share(projects, chunks, chunk), towers_per_project=options['towers_per_project'],
+                floors_per_tower=options['floors_per_tower'], flats_per_floor=options['flats_per_floor'],
+                images_per_project=options['images_per_project'], blog_posts_per_project=options['blog_posts_per_project'],
+                leads_per_project=options['leads_per_project'],
+                client_users=share(users, chunks, chunk), otps_per_user=options['otps_per_user'],
+                size_spread=options['size_spread'], seed=options['seed'], batch_size=options['batch_size'], **weights,
+            ), options['prefix'], chunk)
+            for chunk in range(chunks)
+        ]
+        
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite allows one writer at a time; seeding with a single process')
+            workers = 1
+        
+        started = time.perf_counter()
+        totals = Counter()
+        for done, (chunk, created) in enumerate(self.run(jobs, workers), 1):
+            totals.update(created)
+            self.stdout.write(f'[{done}/{chunks}] chunk {chunk}: {created["projects"]} projects, {created["flats"]} flats')
+        # Workers invalidated their own process's cache only
+        autocomplete.invalidate()
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}' for name, count in totals.items())
+            + f' in {elapsed:.1f}s ({sum(totals.values()) / elapsed:.0f} rows/s)'
+        ))
+    
+    def run(self, jobs, workers):
+        if workers <= 1:
+            for job in jobs:
+                yield seed_chunk(job)
+            return
+        
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise CommandError('--workers needs the fork start method (Linux/macOS)')
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            for future in as_completed([pool.submit(seed_chunk, job) for job in jobs]):
+                yield future.result()
+    
+    def parse_weights(self, text, choices):
+        valid = {value for value, label in choices}
+        weights = {}
+        for item in text.split(','):
+            name, _, weight = item.partition('=')
+            name = name.strip()
+            if name not in valid:
+                raise CommandError(f'Unknown value "{name}", expected one of: {", ".join(sorted(valid))}')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid weight for "{name}": {weight!r}')
+            if weights[name] < 0:
+                raise CommandError(f'Invalid weight for "{name}": {weight!r}')
+        if not sum(weights.values()):
+            raise CommandError('At least one weight must be positive')
+        return weights
@@ -0,0 +1,53 @@
+"""
+Show the slowest SQL fingerprints and views recorded by SQLStatsMiddleware
+
+Usage:
+    python manage.py sql_stats
+    python manage.py sql_stats --sort p95_ms --limit 10
+    python manage.py sql_stats --view "GET /api/projects/"
+    python manage.py sql_stats --reset
+
+Statistics come from the cache, so this only sees the server processes when
+it shares their cache backend (Redis/Memcached, not LocMemCache).
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from api import sql_stats
+
+
+class Command(BaseCommand):
+    help = 'Top SQL fingerprints and views by total time, count or latency'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--sort', choices=sql_stats.SORT_KEYS, default='total_ms')
+        parser.add_argument('--view', help='Only fingerprints run by this view, e.g. "GET /api/projects/"')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON')
+        parser.add_argument('--reset', action='store_true', help='Clear the statistics of every process')
+    
+    def handle(self, *args, **options):
+        if options['reset']:
+            sql_stats.reset()
+            self.stdout.write(self.style.SUCCESS('SQL statistics reset'))
+            return
+        
+        report = sql_stats.report(limit=options['limit'], sort=options['sort'], view=options['view'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        
+        self.stdout.write(f'{report["processes"]} process(es)\n')
+        header = f'{"count":>8} {"total ms":>10} {"mean":>8} {"p95":>8} {"max":>8} {"slow":>5}'
+        self.stdout.write(f'{"fingerprint":<12} {header}  sql')
+        for row in report['fingerprints']:
+            self.stdout.write(f'{row["id"]:<12} {self.numbers(row)}  {row["sql"][:120]}')
+            for view in row['views'][:3]:
+                self.stdout.write(f'{"":<12} {"":>8} {view["total_ms"]:>10.1f}  {view["count"]}x {view["view"]}')
+        self.stdout.write(f'\n{"view":<48} {header}')
+        for row in report['views']:
+            self.stdout.write(f'{row["view"][:48]:<48} {self.numbers(row)}')
+    
+    def numbers(self, row):
+        return f'{row["count"]:>8} {row["total_ms"]:>10.1f} {row["mean_ms"]:>8.2f} {row["p95_ms"]:>8.2f} {row["max_ms"]:>8.2f} {row["slow"]:>5}'
@@ -0,0 +1,170 @@
+"""
+Media file serving with HTTP Range support
+
+Replaces django.conf.urls.static for MEDIA_URL so that blog walkthrough
+videos can be seeked without re-downloading the whole file. Files are
+streamed through FileResponse (which lets the WSGI server use sendfile),
+or handed off to nginx / Apache when MEDIA_SERVE_BACKEND is configured.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangedFileReader:
+    """
+    File wrapper that only yields ``length`` bytes from the current position.
+
+    The underlying file is already seeked to the range start, and
+    ``fileno()`` is exposed so servers using ``wsgi.file_wrapper`` can still
+    sendfile() the range (they send Content-Length bytes from the current
+    offset). No ``tell``/``seek``/``name`` is exposed so FileResponse does
+    not try to recompute Content-Length from the whole file.
+    """
+
+    def __init__(self, filelike, length):
+        self.filelike = filelike
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.filelike.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.filelike.fileno()
+
+    def close(self):
+        self.filelike.close()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range ``Range`` header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent, malformed or asks for multiple
+    ranges (the full file is served instead), and raises ValueError when the
+    range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def make_etag(stat):
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def range_applies(request, etag, mtime):
+    """Honour If-Range: only serve a partial response if the file is unchanged"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def set_cache_headers(response, etag, mtime):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    response['Accept-Ranges'] = 'bytes'
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT with Range, conditional GET and offload support"""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except Exception:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    stat = os.stat(fullpath)
+    size = stat.st_size
+    etag = make_etag(stat)
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        set_cache_headers(response, etag, stat.st_mtime)
+        return response
+
+    # Hand the transfer off to the front-end web server. It handles Range
+    # requests itself, so no body is produced here.
+    backend = settings.MEDIA_SERVE_BACKEND
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path)
+        set_cache_headers(response, etag, stat.st_mtime)
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        set_cache_headers(response, etag, stat.st_mtime)
+        return response
+
+    byte_range = None
+    if range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            set_cache_headers(response, etag, stat.st_mtime)
+            return response
+
+    filelike = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(filelike, content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        filelike.seek(start)
+        response = FileResponse(RangedFileReader(filelike, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    set_cache_headers(response, etag, stat.st_mtime)
+    return response
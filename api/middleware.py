@@ -1,13 +1,23 @@
 """
 Custom Middleware for Error Handling and Logging
 """
+import json
 import logging
+import re
 import traceback
-from django.http import JsonResponse
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from . import profiling, sql_stats
 
 logger = logging.getLogger(__name__)
 
+# Router regex groups, '(?P<pk>\d+)' -> '<pk>'
+ROUTE_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
 
 class ErrorHandlingMiddleware(MiddlewareMixin):
     """Middleware to handle errors globally"""
@@ -51,3 +61,81 @@ class RequestLoggingMiddleware(MiddlewareMixin):
                 }
             )
 
+
+
+class SQLStatsMiddleware:
+    """Record SQL fingerprint statistics per view (see api/sql_stats.py)"""
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.SQL_STATS_ENABLED:
+            return self.get_response(request)
+        with sql_stats.record_queries(lambda: self.view_name(request)):
+            response = self.get_response(request)
+        sql_stats.flush()
+        return response
+    
+    async def __acall__(self, request):
+        if not settings.SQL_STATS_ENABLED:
+            return await self.get_response(request)
+        # Async views query from the request's sync_to_async thread, so the
+        # execute_wrapper has to be installed on that thread's connection
+        recording = ExitStack()
+        await sync_to_async(recording.enter_context)(sql_stats.record_queries(lambda: self.view_name(request)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        await sync_to_async(sql_stats.flush)()
+        return response
+    
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '(middleware)'
+        route = ROUTE_GROUP.sub(r'<\1>', match.route).replace('^', '').replace('$', '')
+        return f'{request.method} /{route}'
+
+
+class ProfilingMiddleware:
+    """Profile staff requests flagged with ?_profile= or X-Profile (see api/profiling.py)"""
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request)
+        if mode is None or not profiling.is_staff(request):
+            return self.get_response(request)
+        return self.profile(request, self.get_response, mode)
+    
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request)
+        if mode is None or not await sync_to_async(profiling.is_staff)(request):
+            return await self.get_response(request)
+        # The profiler and SQL timeline watch the request's sync thread, which
+        # also runs the async view's ORM calls when it is driven from there
+        return await sync_to_async(self.profile)(request, async_to_sync(self.get_response), mode)
+    
+    def profile(self, request, get_response, mode):
+        response, report = profiling.profile_request(get_response, request, mode)
+        if mode == 'report':
+            response = HttpResponse(json.dumps(report), content_type='application/json')
+        response['X-Profile-Id'] = report['id']
+        response['X-Profile-Total-Ms'] = str(report['total_ms'])
+        response['X-Profile-Queries'] = str(len(report['queries']))
+        return response
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:54
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+STATUSES = ['available', 'sold', 'reserved', 'hold']
+
+
+def fill_counters(apps, schema_editor):
+    Tower = apps.get_model('api', 'Tower')
+    Project = apps.get_model('api', 'Project')
+    flat_counts = {'flats_count': Count('flats')}
+    for status in STATUSES:
+        flat_counts[f'{status}_flats_count'] = Count('flats', filter=Q(flats__status=status))
+    for tower in Tower.objects.annotate(**{f'n_{k}': v for k, v in flat_counts.items()}):
+        Tower.objects.filter(pk=tower.pk).update(**{k: getattr(tower, f'n_{k}') for k in flat_counts})
+    project_counts = {'towers_count': Count('towers', distinct=True)}
+    project_counts['flats_count'] = Count('towers__flats')
+    for status in STATUSES:
+        project_counts[f'{status}_flats_count'] = Count('towers__flats', filter=Q(towers__flats__status=status))
+    for project in Project.objects.annotate(**{f'n_{k}': v for k, v in project_counts.items()}):
+        Project.objects.filter(pk=project.pk).update(**{k: getattr(project, f'n_{k}') for k in project_counts})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='available_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='hold_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reserved_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='sold_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='towers_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tower',
+            name='available_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tower',
+            name='flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tower',
+            name='hold_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tower',
+            name='reserved_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tower',
+            name='sold_flats_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:02
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def fill_ranges(apps, schema_editor):
+    Project = apps.get_model('api', 'Project')
+    for project in Project.objects.annotate(
+        flat_price_min=Min('towers__flats__price'), flat_price_max=Max('towers__flats__price'),
+        area_min=Min('towers__flats__carpet_area'), area_max=Max('towers__flats__carpet_area'),
+    ):
+        prices = [value for value in (project.flat_price_min, project.flat_price_max, project.price) if value is not None]
+        Project.objects.filter(pk=project.pk).update(
+            price_min=min(prices) if prices else None,
+            price_max=max(prices) if prices else None,
+            carpet_area_min=project.area_min,
+            carpet_area_max=project.area_max,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_inventory_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='carpet_area_max',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='carpet_area_min',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='price_max',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='price_min',
+            field=models.DecimalField(db_index=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(fill_ranges, migrations.RunPython.noop),
+    ]
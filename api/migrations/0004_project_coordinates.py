@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_project_price_ranges'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['latitude', 'longitude'], name='api_project_latitud_eaf036_idx'),
+        ),
+    ]
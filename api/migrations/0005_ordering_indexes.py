@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_project_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['created_at'], name='api_blogpos_created_acee62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['views'], name='api_blogpos_views_c016ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['title'], name='api_blogpos_title_ea0716_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flat',
+            index=models.Index(fields=['tower', 'floor_number', 'flat_number'], name='api_flat_tower_i_70c881_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flat',
+            index=models.Index(fields=['price'], name='api_flat_price_b74740_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flat',
+            index=models.Index(fields=['carpet_area'], name='api_flat_carpet__ced049_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at'], name='api_project_created_cff6f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['views'], name='api_project_views_73d3b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['title'], name='api_project_title_68b90c_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortlistedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shortlisted_projects', to='api.clientuser')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShortlistedFlat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('flat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.flat')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shortlisted_flats', to='api.clientuser')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shortlistedproject',
+            constraint=models.UniqueConstraint(fields=('user', 'project'), name='unique_shortlisted_project'),
+        ),
+        migrations.AddConstraint(
+            model_name='shortlistedflat',
+            constraint=models.UniqueConstraint(fields=('user', 'flat'), name='unique_shortlisted_flat'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_shortlists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProjectViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='api_project_hour_7f1abd_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='projectviewbucket',
+            constraint=models.UniqueConstraint(fields=('project', 'hour'), name='unique_project_view_hour'),
+        ),
+    ]
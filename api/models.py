@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -21,6 +21,11 @@ class ClientUser(models.Model):
         if self.first_name:
             return f"{self.first_name} {self.last_name} - {self.mobile}"
         return f"User - {self.mobile}"
+    
+    @property
+    def is_authenticated(self):
+        # request.user for client JWTs (see api/authentication.py)
+        return True
         
 class City(models.Model):
     """City model for admin to add cities"""
@@ -96,6 +101,8 @@ class Project(models.Model):
     id_number = models.CharField(max_length=50, blank=True, null=True)
     about_listing = models.TextField(blank=True, null=True)
     map_location = models.TextField(blank=True, null=True)  # Full address for map
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     
     # Project Details (like RERA, area, etc.)
     rera_number = models.CharField(max_length=100, blank=True, null=True)
@@ -119,11 +126,36 @@ class Project(models.Model):
     plumbing = models.TextField(blank=True, null=True)
     lift = models.TextField(blank=True, null=True)
     
+    # Inventory counters, maintained from Tower/Flat writes (see api/signals.py)
+    towers_count = models.IntegerField(default=0, editable=False)
+    flats_count = models.IntegerField(default=0, editable=False)
+    available_flats_count = models.IntegerField(default=0, editable=False)
+    sold_flats_count = models.IntegerField(default=0, editable=False)
+    reserved_flats_count = models.IntegerField(default=0, editable=False)
+    hold_flats_count = models.IntegerField(default=0, editable=False)
+    
+    # Price/area ranges over the project's flats (and price), for budget search
+    price_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, editable=False, db_index=True)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, editable=False, db_index=True)
+    carpet_area_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, editable=False, db_index=True)
+    carpet_area_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, editable=False, db_index=True)
+    
+    # Decayed recent views, refreshed from ProjectViewBucket (see api/trending.py)
+    trending_score = models.FloatField(default=0, editable=False, db_index=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Bounding-box prefilter for "near me" search (see api/geo.py)
+            models.Index(fields=['latitude', 'longitude']),
+            # Default list order and ?ordering=created_at/views/title (see api/filters.py)
+            models.Index(fields=['created_at']),
+            models.Index(fields=['views']),
+            models.Index(fields=['title']),
+        ]
     
     def __str__(self):
         return self.title
@@ -182,6 +214,12 @@ class BlogPost(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default list order and ?ordering=created_at/views/title (see api/filters.py)
+            models.Index(fields=['created_at']),
+            models.Index(fields=['views']),
+            models.Index(fields=['title']),
+        ]
     
     def __str__(self):
         return self.title
@@ -312,6 +350,14 @@ class Tower(models.Model):
     
     is_active = models.BooleanField(default=True)
     order = models.IntegerField(default=0)
+    
+    # Inventory counters, maintained from Flat writes (see api/signals.py)
+    flats_count = models.IntegerField(default=0, editable=False)
+    available_flats_count = models.IntegerField(default=0, editable=False)
+    sold_flats_count = models.IntegerField(default=0, editable=False)
+    reserved_flats_count = models.IntegerField(default=0, editable=False)
+    hold_flats_count = models.IntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -322,10 +368,15 @@ class Tower(models.Model):
     def __str__(self):
         return f"{self.project.title} - {self.name}"
     
+    def save(self, *args, **kwargs):
+        # Project counters are updated from signals; keep them in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     @property
     def total_flats(self):
-        """Calculate total flats from related flats"""
-        return self.flats.count()
+        """Total flats in this tower (denormalized counter)"""
+        return self.flats_count
 
 
 class TowerAmenity(models.Model):
@@ -366,6 +417,14 @@ class Flat(models.Model):
         ('hold', 'Hold'),
     ]
     
+    # Allowed status changes for bulk transitions (sold -> available is a cancellation)
+    STATUS_TRANSITIONS = {
+        'available': ['reserved', 'hold', 'sold'],
+        'reserved': ['available', 'hold', 'sold'],
+        'hold': ['available', 'reserved', 'sold'],
+        'sold': ['available'],
+    }
+    
     tower = models.ForeignKey(Tower, related_name='flats', on_delete=models.CASCADE)
     flat_number = models.CharField(max_length=50, help_text='e.g., A-101, B-201')
     flat_type = models.CharField(max_length=20, choices=FLAT_TYPE_CHOICES)
@@ -395,9 +454,20 @@ class Flat(models.Model):
     class Meta:
         ordering = ['floor_number', 'flat_number']
         unique_together = ['tower', 'flat_number']
+        indexes = [
+            # A tower's flats in the default order; price/area for ?ordering=
+            models.Index(fields=['tower', 'floor_number', 'flat_number']),
+            models.Index(fields=['price']),
+            models.Index(fields=['carpet_area']),
+        ]
     
     def __str__(self):
         return f"{self.tower.name} - {self.flat_number} ({self.get_flat_type_display()})"
+    
+    def save(self, *args, **kwargs):
+        # Tower/Project counters are updated from signals; keep them in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 
@@ -429,3 +499,94 @@ class OTP(models.Model):
     def __str__(self):
         return f"{self.mobile} - {self.otp_code}"
 
+
+class SavedSearch(models.Model):
+    """A ClientUser's stored project search, alerted on new matches (see api/saved_searches.py)"""
+    user = models.ForeignKey(ClientUser, related_name='saved_searches', on_delete=models.CASCADE)
+    name = models.CharField(max_length=100, blank=True, default='')
+    filters = models.JSONField(default=dict, help_text='Normalized filter spec')
+    term_keys = models.PositiveSmallIntegerField(default=0, help_text='Indexed filters; a match must hit every one')
+    alerts = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'Saved Searches'
+    
+    def __str__(self):
+        return f"{self.user.mobile} - {self.name or self.filters}"
+
+
+class SavedSearchTerm(models.Model):
+    """Inverted index of saved searches: one row per filter value"""
+    search = models.ForeignKey(SavedSearch, related_name='terms', on_delete=models.CASCADE)
+    key = models.CharField(max_length=20)
+    value = models.CharField(max_length=50)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'value']),
+        ]
+
+
+class SavedSearchMatch(models.Model):
+    """A new match for a saved search, queued as a notification for its user"""
+    search = models.ForeignKey(SavedSearch, related_name='matches', on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE)
+    flat = models.ForeignKey(Flat, related_name='+', on_delete=models.CASCADE, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # A project or flat is announced once per search
+            models.UniqueConstraint(fields=['search', 'project'], condition=models.Q(flat__isnull=True), name='unique_saved_search_project'),
+            models.UniqueConstraint(fields=['search', 'flat'], condition=models.Q(flat__isnull=False), name='unique_saved_search_flat'),
+        ]
+
+
+class ShortlistedProject(models.Model):
+    """A project on a ClientUser's shortlist"""
+    # The unique (user, project) index serves per-user lookups
+    user = models.ForeignKey(ClientUser, related_name='shortlisted_projects', on_delete=models.CASCADE, db_index=False)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'project'], name='unique_shortlisted_project'),
+        ]
+
+
+class ShortlistedFlat(models.Model):
+    """A flat on a ClientUser's shortlist"""
+    # The unique (user, flat) index serves per-user lookups
+    user = models.ForeignKey(ClientUser, related_name='shortlisted_flats', on_delete=models.CASCADE, db_index=False)
+    flat = models.ForeignKey(Flat, related_name='+', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'flat'], name='unique_shortlisted_flat'),
+        ]
+
+
+class ProjectViewBucket(models.Model):
+    """A project's views in one hour, for trending (see api/trending.py)"""
+    # The unique (project, hour) index serves per-project lookups
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE, db_index=False)
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'hour'], name='unique_project_view_hour'),
+        ]
+        indexes = [
+            # The trending window and pruning scan by hour
+            models.Index(fields=['hour']),
+        ]
@@ -0,0 +1,54 @@
+"""
+Request parsers
+
+FastJSONParser is the orjson-backed counterpart of
+api.renderers.FastJSONRenderer. It falls back to DRF's JSONParser when orjson
+is not installed or the request body is not UTF-8. CSVParser accepts
+spreadsheet exports for bulk endpoints.
+"""
+import csv
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """Parses JSON request bodies with orjson"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read() if stream is not None else b'')
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def read_csv_rows(text):
+    """CSV text -> list of dicts; empty cells are dropped so field defaults apply"""
+    reader = csv.DictReader(io.StringIO(text))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, '')}
+        for row in reader
+    ]
+
+
+class CSVParser(BaseParser):
+    """Parses a text/csv body (header row + one row per record) into a list of dicts"""
+    media_type = 'text/csv'
+    
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            return read_csv_rows(stream.read().decode(encoding))
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
@@ -0,0 +1,152 @@
+"""
+On-demand request profiling
+
+A staff request with ?_profile=1 (or an X-Profile: 1 header) runs under
+cProfile, or under pyinstrument's sampling profiler when it is installed and
+PROFILER is 'auto' or 'pyinstrument'. The SQL run by the request is recorded
+as a timeline next to the profile:
+
+    ?_profile=1       normal response; profile saved under PROFILE_DIR, its
+                      id in the X-Profile-Id header
+    ?_profile=store   same as ?_profile=1
+    ?_profile=report  JSON report (top functions + SQL timeline) instead
+                      of the response
+
+Saved cProfile output is a pstats dump (open with snakeviz, or convert for
+KCachegrind with pyprof2calltree); pyinstrument output is an HTML page.
+Profiling only sees the request's own thread, so async views under ASGI
+show up as time spent waiting.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+PROFILE_MODES = ('1', 'store', 'report')
+TOP_FUNCTIONS = 40
+
+
+def requested_mode(request):
+    """The requested profiling mode, or None; cheap enough for every request"""
+    mode = request.META.get('HTTP_X_PROFILE')
+    if mode is None and '_profile=' in request.META.get('QUERY_STRING', ''):
+        mode = request.GET.get('_profile')
+    return mode if mode in PROFILE_MODES else None
+
+
+def is_staff(request):
+    """Session staff (Django admin) or a staff JWT, like IsCustomAdminUser"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and (user.is_staff or user.is_superuser):
+        return True
+    from .views import IsCustomAdminUser
+    return IsCustomAdminUser().has_permission(request, None)
+
+
+class SQLTimeline:
+    """execute_wrapper recording when each query started and how long it took"""
+    
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'start_ms': round((started - self.started) * 1000, 3),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'sql': sql,
+                'params': [str(param)[:100] for param in params] if params and not many else None,
+            })
+
+
+def _profiler():
+    if settings.PROFILER in ('auto', 'pyinstrument'):
+        try:
+            from pyinstrument import Profiler
+            return 'pyinstrument', Profiler()
+        except ImportError:
+            if settings.PROFILER == 'pyinstrument':
+                raise
+    return 'cprofile', cProfile.Profile()
+
+
+@contextmanager
+def _running(kind, profiler):
+    if kind == 'pyinstrument':
+        profiler.start()
+    else:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if kind == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+
+
+def top_functions(profile, limit=TOP_FUNCTIONS):
+    """cProfile functions by cumulative time"""
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [
+        {
+            'function': f'{os.path.relpath(filename, settings.BASE_DIR) if filename.startswith(str(settings.BASE_DIR)) else filename}:{line}({name})',
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for (filename, line, name), (primitive, calls, own, cumulative, callers) in rows
+    ]
+
+
+def profile_request(get_response, request, mode):
+    """Run the request under the profiler; returns (response, report)"""
+    kind, profiler = _profiler()
+    started = time.perf_counter()
+    timeline = SQLTimeline(started)
+    with connection.execute_wrapper(timeline), _running(kind, profiler):
+        response = get_response(request)
+    total_ms = (time.perf_counter() - started) * 1000
+    
+    report = {
+        'id': f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}',
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'profiler': kind,
+        'total_ms': round(total_ms, 3),
+        'sql_ms': round(sum(query['duration_ms'] for query in timeline.queries), 3),
+        'queries': timeline.queries,
+    }
+    if kind == 'cprofile':
+        report['functions'] = top_functions(profiler)
+    if mode != 'report':
+        save(report, kind, profiler)
+    return response, report
+
+
+def save(report, kind, profiler):
+    """Write <id>.prof or <id>.html plus <id>.json (the report) to PROFILE_DIR"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR, report['id'] + '-' + re.sub(r'\W+', '-', report['path'].split('?')[0]).strip('-'))
+    if kind == 'cprofile':
+        profiler.dump_stats(base + '.prof')
+    else:
+        with open(base + '.html', 'w') as handle:
+            handle.write(profiler.output_html())
+    with open(base + '.json', 'w') as handle:
+        json.dump(report, handle, indent=2)
+    return base
@@ -0,0 +1,159 @@
+"""
+Query-count budgets for API views
+
+Each view declares the most queries one request may run, per HTTP method,
+or per action for a ViewSet:
+
+    @query_budget(get=3, post=5)
+    class ProjectFlatFacetsView(APIView):
+        ...
+    
+    @query_budget(list=6, retrieve=7)
+    class ProjectViewSet(ResourceViewSet):
+        ...
+
+Views we do not own are listed in BUDGETS by dotted name. The generated
+tests (see budget_tests()) request every URL against a fixed dataset and
+fail with the offending SQL grouped by call site when a view goes over,
+which is how N+1 regressions in the serializers show up.
+"""
+import os
+import re
+import traceback
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.urls import URLPattern, URLResolver
+
+from . import sql_stats
+
+# dotted view name -> {method or action: max queries}
+BUDGETS = {
+    # API docs (drf-spectacular) mounted in api/urls.py; only the JWT user lookup
+    'drf_spectacular.views.SpectacularAPIView': {'get': 1},
+    'drf_spectacular.views.SpectacularSwaggerView': {'get': 1},
+    'drf_spectacular.views.SpectacularRedocView': {'get': 1},
+}
+
+
+def view_name(view):
+    """Dotted name of a view class, as_view() function or @api_view function"""
+    view = getattr(view, 'view_class', None) or getattr(view, 'cls', None) or view
+    return f'{view.__module__}.{view.__name__}'
+
+
+def query_budget(**methods):
+    """Declare a view's query budget, e.g. @query_budget(get=2, post=4) or @query_budget(list=3)"""
+    def decorate(view):
+        BUDGETS[view_name(view)] = methods
+        return view
+    return decorate
+
+
+def get_budget(view, method):
+    """Budget of a URL callback for an HTTP method (routed ViewSets by action)"""
+    method = method.lower()
+    action = getattr(view, 'actions', {}).get(method)
+    return BUDGETS.get(view_name(view), {}).get(action or method)
+
+
+def _call_site(stack):
+    # Innermost frames in our own code (not Django/DRF, not the query wrappers)
+    ours = [
+        frame for frame in stack
+        if frame.filename.startswith(str(settings.BASE_DIR)) and 'site-packages' not in frame.filename
+        and frame.filename not in (__file__, sql_stats.__file__) and not os.path.basename(frame.filename).startswith('test')
+    ]
+    return ' < '.join(
+        f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:{frame.lineno} {frame.name}' for frame in reversed(ours[-3:])
+    ) or '(framework)'
+
+
+class QueryRecorder:
+    """Context manager recording every query with the code that ran it"""
+    
+    def __init__(self):
+        self.queries = []
+    
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, _call_site(traceback.extract_stack()[:-1])))
+        return execute(sql, params, many, context)
+    
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+    
+    def __len__(self):
+        return len(self.queries)
+    
+    def report(self):
+        """Queries grouped by call site, most frequent first"""
+        sites = defaultdict(list)
+        for sql, site in self.queries:
+            sites[site].append(sql)
+        lines = []
+        for site, statements in sorted(sites.items(), key=lambda item: -len(item[1])):
+            lines.append(f'  {len(statements)}x {site}')
+            for sql in dict.fromkeys(statements):
+                lines.append(f'      {sql[:300]}')
+        return '\n'.join(lines)
+
+
+def url_patterns(urlconf, prefix=''):
+    """(route, name, view) for every URL in ``urlconf``, includes flattened"""
+    for pattern in urlconf.urlpatterns if hasattr(urlconf, 'urlpatterns') else urlconf:
+        if isinstance(pattern, URLResolver):
+            yield from url_patterns(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern), pattern.name, pattern.callback
+
+
+def fill_route(route, values):
+    """'projects/<int:pk>/' or router's '^projects/(?P<pk>\\d+)/$' -> 'projects/1/'"""
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', lambda match: str(values[match.group(1)]), route).replace('^', '').replace('$', '')
+    for part in route.split('<')[1:]:
+        spec = part.split('>')[0]
+        route = route.replace(f'<{spec}>', str(values[spec.split(':')[-1]]))
+    return route
+
+
+def budget_tests(test_case, urlconf, url_prefix, values, requests=None):
+    """
+    Add a test_budget_<name> method to ``test_case`` per URL in ``urlconf``.
+    
+    ``values`` fills the URL parameters; ``requests`` maps URL names to
+    (method, data) for anything that is not a plain GET, or to (method,
+    data, status) to also require that status, so the budget is measured
+    on the successful path rather than on an early validation error. The
+    test case provides budget_client(view) and the fixed dataset in setUp().
+    """
+    requests = requests or {}
+    for route, name, view in url_patterns(urlconf):
+        method, data, *expected = requests.get(name, ('get', None))
+        path = url_prefix + fill_route(route, values)
+        
+        def test(self, view=view, method=method, path=path, data=data, expected=expected):
+            budget = get_budget(view, method)
+            self.assertIsNotNone(budget, f'{view_name(view)} declares no query budget for {method.upper()} {path}')
+            client = self.budget_client(view)
+            with QueryRecorder() as recorded:
+                if method == 'get':
+                    response = client.get(path, data)
+                else:
+                    response = getattr(client, method)(path, data, format='json')
+            self.assertLess(response.status_code, 500, path)
+            if expected:
+                self.assertEqual(response.status_code, expected[0], f'{path}: {getattr(response, "data", None)}')
+            self.assertLessEqual(
+                len(recorded), budget,
+                f'{method.upper()} {path} ran {len(recorded)} queries, budget {budget}:\n{recorded.report()}'
+            )
+        
+        test.__name__ = 'test_budget_' + re.sub(r'\W+', '_', name or route).strip('_')
+        setattr(test_case, test.__name__, test)
+    return test_case
@@ -0,0 +1,52 @@
+"""
+Fast JSON renderer
+
+Uses orjson when it is installed and falls back to DRF's stdlib-based
+JSONRenderer otherwise. Output matches the stock renderer: compact
+separators, UTF-8, ISO 8601 datetimes with microseconds and a trailing 'Z'
+for UTC (DRF's encoder does not cut them to milliseconds the way Django's
+DjangoJSONEncoder does) and decimals as strings (unless
+COERCE_DECIMAL_TO_STRING is off).
+"""
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def default(obj):
+    """Fallback for types orjson does not serialize natively"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Indented output (``Accept: application/json; indent=4`` or the browsable
+    API), ASCII-only output and non-compact separators are rare, so they are
+    handed to the stdlib renderer.
+    """
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=default, option=self.options)
+        # Same strict javascript subset escaping as the stock renderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
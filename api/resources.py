@@ -0,0 +1,243 @@
+"""
+Generic API resources
+
+Every catalog model is served by a ResourceViewSet registered on the router
+in api/urls.py. A resource declares only what differs:
+
+    class TowerViewSet(ResourceViewSet):
+        queryset = Tower.objects.all()
+        serializer_class = TowerSerializer
+        compiled_serializer_class = CompiledTowerSerializer  # list fast path
+        public_filter = {'is_active': True}                  # rows non-staff can list
+        filterset_class = TowerFilterSet                     # ?project=3, ?ids=3,1,2 (see api/filters.py)
+
+and the base provides the handlers, permissions and read optimizations:
+
+- Reads are public and writes need a staff/superuser JWT. The token is
+  checked once per request, lazily, the first time request.user is needed,
+  so anonymous reads run no authentication query at all.
+- select_related / prefetch_related are applied to reads that go through
+  the ModelSerializer; lists with a compiled serializer render .values()
+  rows instead.
+- Lists are paginated only when ?page= is given, so clients that expect a
+  plain array keep getting one.
+
+ClientResourceView and ClientResourceViewSet serve a ClientUser's own data
+under a client token.
+"""
+from django.core.paginator import InvalidPage
+from rest_framework import viewsets
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import ClientJWTAuthentication, StaffJWTAuthentication
+from .exceptions import ValidationError
+from .models import ClientUser
+
+MAX_IDS = 100
+
+
+def parse_ids(value):
+    """List of ids from a "1,2,3" query parameter, or None when absent"""
+    if not value:
+        return None
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValidationError('ids must be a comma-separated list of integers')
+    if len(ids) > MAX_IDS:
+        raise ValidationError(f'At most {MAX_IDS} ids can be requested at once')
+    return ids
+
+
+def parse_id_list(value, name='ids'):
+    """List of ids from a JSON list, or None when absent"""
+    if value is None:
+        return None
+    try:
+        if not isinstance(value, list):
+            raise TypeError(value)
+        ids = [int(pk) for pk in value]
+    except (TypeError, ValueError):
+        raise ValidationError(f'{name} must be a list of integers')
+    if len(ids) > MAX_IDS:
+        raise ValidationError(f'At most {MAX_IDS} {name} can be sent at once')
+    return ids
+
+
+def in_id_order(data, ids):
+    """Results in the order the ids were requested"""
+    position = {pk: index for index, pk in enumerate(ids)}
+    return sorted(data, key=lambda item: position[item['id']])
+
+
+def is_admin(user):
+    return bool(user and (getattr(user, 'is_staff', False) or getattr(user, 'is_superuser', False)))
+
+
+class OptionalJWTAuthentication(StaffJWTAuthentication):
+    """Staff JWT authentication where a missing, expired or invalid token means anonymous"""
+    
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+
+
+class IsAdminOrReadOnly(BasePermission):
+    """Anyone may read; writes need a staff/superuser token"""
+    
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or is_admin(request.user)
+
+
+class IsAdmin(BasePermission):
+    """Staff/superuser token for every method"""
+    
+    def has_permission(self, request, view):
+        return is_admin(request.user)
+
+
+class IsClientUser(BasePermission):
+    """A ClientUser token for every method"""
+    
+    def has_permission(self, request, view):
+        return isinstance(request.user, ClientUser)
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """Page numbers only when ?page= is given; ?page_size= up to 100"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params:
+            return None
+        # PageNumberPagination.paginate_queryset() without its list(page): the
+        # page's slice stays a queryset, which the compiled serializers need
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        return self.page.object_list
+
+
+class ResourceMixin:
+    """Authentication and permission handling shared by every API view"""
+    authentication_classes = [OptionalJWTAuthentication]
+    permission_classes = [IsAdminOrReadOnly]
+    
+    def perform_authentication(self, request):
+        # Lazy: the token is checked when a permission or queryset asks for request.user
+        pass
+    
+    def permission_denied(self, request, message=None, code=None):
+        raise PermissionDenied({'error': 'Permission denied'})
+
+
+class ResourceView(ResourceMixin, APIView):
+    """APIView for endpoints that are not plain CRUD on one model"""
+
+
+class ResourceViewSet(ResourceMixin, viewsets.ModelViewSet):
+    """
+    CRUD for one model with declarative filters, prefetch plan and permissions.
+    
+    filterset_class validates and applies the list's query parameters and
+    ?ordering=; public_filter restricts what non-staff users list.
+    """
+    pagination_class = OptionalPageNumberPagination
+    lookup_value_regex = r'\d+'
+    compiled_serializer_class = None
+    public_filter = None
+    filterset_class = None
+    limit_param = None
+    select_related = ()
+    prefetch_related = ()
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in SAFE_METHODS and not self.is_compiled():
+            if self.select_related:
+                queryset = queryset.select_related(*self.select_related)
+            if self.prefetch_related:
+                queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+    
+    def is_compiled(self):
+        return self.action == 'list' and self.compiled_serializer_class is not None
+    
+    def filter_queryset(self, queryset):
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        if self.public_filter and not is_admin(self.request.user):
+            queryset = queryset.filter(**self.public_filter)
+        if self.filterset_class is not None:
+            queryset = self.filterset_class(params).filter(queryset)
+        if self.limit_param and params.get(self.limit_param):
+            try:
+                queryset = queryset[:int(params[self.limit_param])]
+            except ValueError:
+                pass
+        return queryset
+    
+    def serialize_list(self, queryset):
+        if self.is_compiled():
+            return self.compiled_serializer_class(context=self.get_serializer_context()).serialize(queryset)
+        return self.get_serializer(queryset, many=True).data
+    
+    def finish_list(self, data):
+        """Request order for ?ids= unless ?ordering= is given"""
+        params = self.request.query_params
+        ids = parse_ids(params.get('ids')) if self.filterset_class and 'ids' in self.filterset_class.filters else None
+        if ids and 'ordering' not in params:
+            data = in_id_order(data, ids)
+        return data
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        data = self.finish_list(self.serialize_list(queryset if page is None else page))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ClientResourceMixin(ResourceMixin):
+    """A client JWT (OTP login) for every method; request.user is the ClientUser"""
+    authentication_classes = [ClientJWTAuthentication]
+    permission_classes = [IsClientUser]
+    
+    def permission_denied(self, request, message=None, code=None):
+        if not request.successful_authenticator:
+            raise NotAuthenticated({'error': 'Authentication required'})
+        super().permission_denied(request, message, code)
+
+
+class ClientResourceView(ClientResourceMixin, APIView):
+    """APIView over a ClientUser's own data"""
+
+
+class ClientResourceViewSet(ClientResourceMixin, ResourceViewSet):
+    """
+    A ClientUser's own rows (e.g. saved searches).
+    
+    Lists and lookups only see rows whose ``user_field`` is request.user,
+    and created rows belong to it.
+    """
+    user_field = 'user'
+    
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.user_field: self.request.user})
+    
+    def perform_create(self, serializer):
+        serializer.save(**{self.user_field: self.request.user})
@@ -0,0 +1,162 @@
+"""
+Saved searches and new-match alerts
+
+A SavedSearch stores a normalized project filter spec:
+
+    {'city_id': [1], 'flat_type': ['2bhk', '3bhk'], 'max_price': '9000000'}
+
+Its list filters are indexed in SavedSearchTerm, one (key, value) row per
+value, and term_keys counts the filters a match has to satisfy. When a
+project or flat is created or changes status, the terms it has (its city,
+property type, status and flat types) are looked up in the index and only
+searches that hit one value of every filter are loaded; the budget is then
+checked in Python. Each new match is queued once per search as a
+SavedSearchMatch, which the client reads as a notification.
+
+Matching runs after the triggering write commits (see api/signals.py and
+the bulk flat writes in api/inventory.py and api/floorplans.py).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .exceptions import ValidationError
+from .filters import ProjectFilterSet, decimal
+from .models import Flat, Project, SavedSearch, SavedSearchMatch, SavedSearchTerm
+
+# Filters indexed in SavedSearchTerm, as ProjectFilterSet parameters
+INDEXED_FILTERS = ('city_id', 'property_type', 'project_status', 'flat_type')
+PRICE_FILTERS = ('min_price', 'max_price')
+MAX_SAVED_SEARCHES = 20
+
+
+def normalize(data):
+    """Normalized filter spec from request data, e.g. {'flat_type': '2bhk,3bhk'}"""
+    if not isinstance(data, dict):
+        raise ValidationError('filters must be an object')
+    unknown = set(data) - set(INDEXED_FILTERS) - set(PRICE_FILTERS)
+    if unknown:
+        raise ValidationError(f'Unknown filters: {", ".join(sorted(unknown))}; use {", ".join(INDEXED_FILTERS + PRICE_FILTERS)}')
+    spec = {}
+    for key in INDEXED_FILTERS:
+        value = data.get(key)
+        if isinstance(value, list):
+            value = ','.join(str(item) for item in value)
+        if value in (None, ''):
+            continue
+        values = sorted(set(ProjectFilterSet.filters[key].split(key, str(value))))
+        if values:
+            spec[key] = values
+    for key in PRICE_FILTERS:
+        if data.get(key) in (None, ''):
+            continue
+        try:
+            spec[key] = f'{decimal(str(data[key])):f}'
+        except ValueError:
+            raise ValidationError(f'{key}: invalid value "{data[key]}"')
+    if 'min_price' in spec and 'max_price' in spec and Decimal(spec['min_price']) > Decimal(spec['max_price']):
+        raise ValidationError('min_price cannot be greater than max_price')
+    return spec
+
+
+def term_keys(spec):
+    return sum(1 for key in INDEXED_FILTERS if spec.get(key))
+
+
+def index_terms(search):
+    """Rewrite the search's rows in the inverted index"""
+    SavedSearchTerm.objects.filter(search=search).delete()
+    SavedSearchTerm.objects.bulk_create([
+        SavedSearchTerm(search=search, key=key, value=str(value))
+        for key in INDEXED_FILTERS for value in search.filters.get(key, [])
+    ])
+
+
+def candidates(terms):
+    """Alerting searches whose every indexed filter has a value in ``terms``"""
+    query = Q()
+    for key, value in terms:
+        query |= Q(key=key, value=str(value))
+    ids = []
+    if terms:
+        ids = list(
+            SavedSearchTerm.objects.filter(query)
+            .values('search_id', 'search__term_keys')
+            .annotate(hits=Count('key', distinct=True))
+            .filter(hits=F('search__term_keys'))
+            .values_list('search_id', flat=True)
+        )
+    return list(SavedSearch.objects.filter(Q(pk__in=ids) | Q(term_keys=0), alerts=True).values('id', 'filters'))
+
+
+def in_budget(spec, low, high):
+    """Price range [low, high] overlaps the spec's budget (unknown prices only match no budget)"""
+    if 'min_price' in spec and (high is None or high < Decimal(spec['min_price'])):
+        return False
+    if 'max_price' in spec and (low is None or low > Decimal(spec['max_price'])):
+        return False
+    return True
+
+
+def project_terms(project, flat_types):
+    terms = [('property_type', project['property_type']), ('project_status', project['project_status'])]
+    if project['city_id']:
+        terms.append(('city_id', project['city_id']))
+    return [(key, value) for key, value in terms if value] + [('flat_type', flat_type) for flat_type in flat_types]
+
+
+def match_project(project_id):
+    """Queue matches for a project that was created or changed status"""
+    project = Project.objects.filter(pk=project_id).values(
+        'id', 'city_id', 'property_type', 'project_status', 'available_flat_types', 'price', 'price_min', 'price_max'
+    ).first()
+    if project is None:
+        return
+    flat_types = {value.strip() for value in (project['available_flat_types'] or '').split(',') if value.strip()}
+    flat_types.update(Flat.objects.filter(tower__project_id=project_id, status='available').values_list('flat_type', flat=True).distinct())
+    low = project['price_min'] if project['price_min'] is not None else project['price']
+    high = project['price_max'] if project['price_max'] is not None else project['price']
+    matches = [
+        SavedSearchMatch(search_id=search['id'], project_id=project_id)
+        for search in candidates(project_terms(project, sorted(flat_types))) if in_budget(search['filters'], low, high)
+    ]
+    # Already announced (search, project/flat) pairs are skipped by the unique constraints
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+
+
+def match_flats(flat_ids):
+    """Queue matches for flats that were created or became available"""
+    flats = Flat.objects.filter(pk__in=flat_ids, status='available').values(
+        'id', 'flat_type', 'price', 'tower__project_id',
+        project_city_id=F('tower__project__city_id'),
+        project_property_type=F('tower__project__property_type'),
+        project_status=F('tower__project__project_status'),
+    )
+    # Flats sharing a project and flat type hit the same searches
+    groups = defaultdict(list)
+    for flat in flats:
+        groups[(flat['tower__project_id'], flat['flat_type'])].append(flat)
+    matches = []
+    for (project_id, flat_type), group in groups.items():
+        first = group[0]
+        project = {'city_id': first['project_city_id'], 'property_type': first['project_property_type'], 'project_status': first['project_status']}
+        searches = candidates(project_terms(project, [flat_type]))
+        matches.extend(
+            SavedSearchMatch(search_id=search['id'], project_id=project_id, flat_id=flat['id'])
+            for search in searches for flat in group if in_budget(search['filters'], flat['price'], flat['price'])
+        )
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+
+
+def match_on_commit(project_ids=(), flat_ids=()):
+    """Run the matching once the current transaction commits; ``flat_ids`` may be a lazy queryset"""
+    def run():
+        for project_id in {pk for pk in project_ids if pk}:
+            match_project(project_id)
+        ids = list(flat_ids)
+        if ids:
+            match_flats(ids)
+    
+    transaction.on_commit(run)
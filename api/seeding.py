@@ -0,0 +1,209 @@
+"""
+Deterministic synthetic catalog data for benchmarks and scale tests
+
+seed_catalog() writes cities, projects, towers, flats, images, blog posts,
+leads, client users and OTPs with bulk_create and then recounts the
+denormalized counters once, so seeding does not go through the per-row
+signals. The same seed and chunk always produce the same rows; large runs
+are split into chunks of cities (see the seed_scale command).
+"""
+import random
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import autocomplete
+from .inventory import recount_projects, recount_towers
+from .models import OTP, BlogPost, City, ClientUser, Contact, Flat, Project, ProjectEnquiry, ProjectImage, Tower
+
+LOCALITIES = ['Baner', 'Wakad', 'Hinjewadi', 'Kharadi', 'Hadapsar', 'Aundh', 'Kothrud', 'Viman Nagar', 'Undri', 'Ravet']
+DEVELOPERS = ['Kolte Patil', 'Godrej Properties', 'VTP Realty', 'Kumar Properties', 'Pride Group', 'Paranjape Schemes']
+CITY_NAMES = ['Pune', 'Mumbai', 'Nashik', 'Nagpur', 'Aurangabad', 'Kolhapur', 'Satara', 'Solapur']
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Isha', 'Rohan', 'Sneha', 'Kabir', 'Meera']
+LAST_NAMES = ['Patil', 'Deshmukh', 'Joshi', 'Kulkarni', 'Shinde', 'Pawar', 'Jadhav', 'Gokhale']
+# Typical carpet area (sqft) per flat type
+FLAT_AREAS = {'1bhk': 450, '1.5bhk': 550, '2bhk': 650, '2.5bhk': 800, '3bhk': 950, '3.5bhk': 1100, '4bhk': 1400, '4.5bhk': 1600, '5bhk': 1900, '5.5bhk': 2100}
+IMAGE_CATEGORIES = [value for value, label in ProjectImage.IMAGE_CATEGORY_CHOICES]
+OTP_PURPOSES = ['login', 'login', 'signup', 'contact']
+# Users per chunk are numbered into the last four digits of their mobile
+MAX_USERS_PER_CHUNK = 10000
+MAX_CHUNKS = 1000
+
+
+def default_status_weights():
+    return {'available': 60, 'sold': 30, 'reserved': 7, 'hold': 3}
+
+
+def default_flat_type_weights():
+    return {'1bhk': 2, '2bhk': 4, '2.5bhk': 1, '3bhk': 3, '4bhk': 1}
+
+
+@dataclass
+class SeedSpec:
+    """
+    How much data to generate, per chunk. ``size_spread`` (0-1) varies floors
+    per tower and leads per project by up to that fraction around the given
+    numbers; the weights are relative, e.g. {'available': 60, 'sold': 40}.
+    """
+    cities: int = 3
+    projects_per_city: int = 5
+    towers_per_project: int = 2
+    floors_per_tower: int = 10
+    flats_per_floor: int = 4
+    images_per_project: int = 4
+    blog_posts_per_project: int = 1
+    leads_per_project: int = 5
+    client_users: int = 0
+    otps_per_user: int = 1
+    size_spread: float = 0.0
+    status_weights: dict = field(default_factory=default_status_weights)
+    flat_type_weights: dict = field(default_factory=default_flat_type_weights)
+    seed: int = 0
+    batch_size: int = 1000
+
+
+def _spread(rng, spec, value):
+    if not spec.size_spread or not value:
+        return value
+    delta = int(value * spec.size_spread)
+    return max(1, value + rng.randint(-delta, delta))
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def _flat_rows(rng, spec, tower, prefix):
+    rate = rng.randint(6000, 14000)
+    # One layout per unit position, repeated on every floor like a real tower
+    layout = [_weighted(rng, spec.flat_type_weights) for _ in range(spec.flats_per_floor)]
+    for floor in range(1, tower.total_floors + 1):
+        for unit, flat_type in enumerate(layout, 1):
+            area = Decimal(FLAT_AREAS[flat_type] + rng.randint(-30, 30))
+            yield Flat(
+                tower=tower, flat_number=f'{prefix}-{floor}{unit:02d}', flat_type=flat_type, floor_number=floor,
+                carpet_area=area, price=area * (rate + 25 * floor), price_per_sqft=rate + 25 * floor,
+                status=_weighted(rng, spec.status_weights),
+                facing=rng.choice(['North', 'South', 'East', 'West']),
+            )
+
+
+def _mobile(prefix, chunk, n):
+    """Unique 10-digit mobile per (prefix, chunk, n)"""
+    return f'6{zlib.crc32(prefix.encode()) % 100:02d}{chunk:03d}{n:04d}'
+
+
+@transaction.atomic
+def seed_catalog(spec=None, prefix='seed', chunk=0):
+    """
+    Generate a catalog per ``spec`` and return the number of rows created per
+    model. ``prefix`` keeps names/slugs/mobiles unique if seeding more than
+    once; ``chunk`` numbers the slice of a larger run (its own cities, users
+    and random stream).
+    """
+    spec = spec or SeedSpec()
+    if not 0 <= chunk < MAX_CHUNKS or spec.client_users > MAX_USERS_PER_CHUNK:
+        raise ValueError(f'At most {MAX_CHUNKS} chunks of {MAX_USERS_PER_CHUNK} client users')
+    rng = random.Random(f'{spec.seed}:{chunk}')
+    created = {}
+    
+    first = chunk * spec.cities
+    taken = set(City.objects.filter(name__in=CITY_NAMES).values_list('name', flat=True))
+    names = [
+        CITY_NAMES[index] if index < len(CITY_NAMES) and CITY_NAMES[index] not in taken else f'{prefix.title()} City {index}'
+        for index in range(first, first + spec.cities)
+    ]
+    cities = City.objects.bulk_create([City(name=name, order=first + n) for n, name in enumerate(names)])
+    created['cities'] = len(cities)
+    
+    projects = []
+    for city in cities:
+        for n in range(spec.projects_per_city):
+            locality = rng.choice(LOCALITIES)
+            projects.append(Project(
+                title=f'{prefix.title()} {locality} {city.name} {n}', property_type=rng.choice(['residential', 'residential', 'commercial']),
+                project_status=rng.choice([s for s, label in Project.PROJECT_STATUS_CHOICES]),
+                location=locality, city=city, city_name=city.name, developer_name=rng.choice(DEVELOPERS),
+                description='Synthetic project for benchmarking.', cover_image=f'projects/{prefix}-{city.pk}-{n}.jpg',
+                featured=rng.random() < 0.2, is_hot=rng.random() < 0.1,
+            ))
+    projects = Project.objects.bulk_create(projects, batch_size=spec.batch_size)
+    created['projects'] = len(projects)
+    
+    towers = []
+    for project in projects:
+        for n in range(spec.towers_per_project):
+            floors = _spread(rng, spec, spec.floors_per_tower)
+            towers.append(Tower(
+                project=project, name=chr(ord('A') + n), total_floors=floors,
+                residential_floors=floors, per_floor_flats=spec.flats_per_floor,
+                completion_date=date(2026, 1, 1) + timedelta(days=rng.randint(0, 1500)),
+            ))
+    towers = Tower.objects.bulk_create(towers, batch_size=spec.batch_size)
+    created['towers'] = len(towers)
+    
+    # Flats dominate large runs; write them tower by tower instead of building one huge list
+    created['flats'] = 0
+    pending = []
+    for tower in towers:
+        pending.extend(_flat_rows(rng, spec, tower, tower.name))
+        if len(pending) >= spec.batch_size * 10:
+            created['flats'] += len(Flat.objects.bulk_create(pending, batch_size=spec.batch_size))
+            pending = []
+    created['flats'] += len(Flat.objects.bulk_create(pending, batch_size=spec.batch_size))
+    
+    created['images'] = len(ProjectImage.objects.bulk_create([
+        ProjectImage(project=project, image=f'projects/gallery/{prefix}-{project.pk}-{n}.jpg', category=IMAGE_CATEGORIES[n % len(IMAGE_CATEGORIES)], order=n)
+        for project in projects for n in range(spec.images_per_project)
+    ], batch_size=spec.batch_size))
+    
+    created['blog_posts'] = len(BlogPost.objects.bulk_create([
+        BlogPost(
+            project=project, title=f'{project.title} walkthrough {n}', slug=f'{prefix}-{project.pk}-{n}',
+            excerpt='Site visit notes.', content='Synthetic blog post for benchmarking. ' * 20,
+        )
+        for project in projects for n in range(spec.blog_posts_per_project)
+    ], batch_size=spec.batch_size))
+    
+    now = timezone.now()
+    users = [
+        ClientUser(
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES), mobile=_mobile(prefix, chunk, n),
+            is_registered=rng.random() < 0.7, last_login=now - timedelta(days=rng.randint(0, 365)),
+        )
+        for n in range(spec.client_users)
+    ]
+    for user in users:
+        if user.is_registered:
+            user.email = f'{user.first_name.lower()}.{user.mobile}@example.com'
+    created['client_users'] = len(ClientUser.objects.bulk_create(users, batch_size=spec.batch_size))
+    created['otps'] = len(OTP.objects.bulk_create([
+        OTP(
+            mobile=user.mobile, otp_code=f'{rng.randint(0, 999999):06d}', is_verified=rng.random() < 0.8,
+            purpose=rng.choice(OTP_PURPOSES), expires_at=now - timedelta(minutes=rng.randint(-10, 60 * 24 * 90)),
+        )
+        for user in users for _ in range(spec.otps_per_user)
+    ], batch_size=spec.batch_size))
+    
+    # About half of the leads come from registered users
+    mobiles = [user.mobile for user in users]
+    enquiries, contacts = [], []
+    for project in projects:
+        for n in range(_spread(rng, spec, spec.leads_per_project)):
+            mobile = rng.choice(mobiles) if mobiles and rng.random() < 0.5 else f'9{rng.randint(0, 999999999):09d}'
+            if n % 2:
+                contacts.append(Contact(project=project, name=f'Lead {n}', phone=mobile, subject='Site visit', message='Please call back.', read=rng.random() < 0.5))
+            else:
+                enquiries.append(ProjectEnquiry(project=project, name=f'Lead {n}', mobile=mobile, subject='Price', message='Share the price sheet.'))
+    created['enquiries'] = len(ProjectEnquiry.objects.bulk_create(enquiries, batch_size=spec.batch_size))
+    created['contacts'] = len(Contact.objects.bulk_create(contacts, batch_size=spec.batch_size))
+    
+    # bulk_create bypasses the counter and autocomplete signals
+    recount_towers([tower.pk for tower in towers])
+    recount_projects([project.pk for project in projects])
+    transaction.on_commit(autocomplete.invalidate)
+    return created
@@ -1,9 +1,14 @@
+import asyncio
+
 from rest_framework import serializers
 from .models import (
     City, Project, Client, Review, BlogPost,
     Contact, Achievement,
-    ProjectImage, ProjectAmenity, Tower, TowerAmenity, Flat, ClientUser, OTP , ProjectEnquiry
+    ProjectImage, ProjectAmenity, Tower, TowerAmenity, Flat, ClientUser, OTP , ProjectEnquiry,
+    SavedSearch, SavedSearchMatch, ShortlistedFlat, ShortlistedProject
 )
+from . import saved_searches
+from .exceptions import ValidationError
 
 
 
@@ -41,6 +46,86 @@ class FlatSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class FlatBulkRowSerializer(serializers.ModelSerializer):
+    """One row of a bulk flat import; the tower comes from the URL"""
+    class Meta:
+        model = Flat
+        exclude = ['tower']
+
+
+class FlatStatusChangeSerializer(serializers.Serializer):
+    """One flat in a bulk status transition; unset fields fall back to the request defaults"""
+    id = serializers.IntegerField()
+    to = serializers.ChoiceField(choices=Flat.STATUS_CHOICES, required=False)
+    updated_at = serializers.DateTimeField(required=False)
+
+
+class FlatStatusTransitionSerializer(serializers.Serializer):
+    """Bulk status transition request"""
+    to = serializers.ChoiceField(choices=Flat.STATUS_CHOICES, required=False)
+    # Extra restriction on the statuses a flat may move from
+    from_status = serializers.ListField(
+        child=serializers.ChoiceField(choices=Flat.STATUS_CHOICES), source='allowed_from', required=False
+    )
+    flats = FlatStatusChangeSerializer(many=True, allow_empty=False)
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" is a Python keyword, so it cannot be declared directly
+        fields['from'] = fields.pop('from_status')
+        return fields
+    
+    def to_internal_value(self, data):
+        # Accept plain ids next to {"id": ..., "updated_at": ...} objects
+        if isinstance(data, dict) and isinstance(data.get('flats'), list):
+            data = dict(data, flats=[{'id': item} if not isinstance(item, dict) else item for item in data['flats']])
+        return super().to_internal_value(data)
+    
+    def validate(self, attrs):
+        for item in attrs['flats']:
+            if not item.get('to') and not attrs.get('to'):
+                raise serializers.ValidationError({'to': 'Target status is required (per flat or for the whole request)'})
+        ids = [item['id'] for item in attrs['flats']]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError({'flats': 'Each flat may appear only once'})
+        return attrs
+
+
+class FloorPlanUnitSerializer(serializers.Serializer):
+    """One flat position on a typical floor"""
+    unit = serializers.IntegerField(min_value=1)
+    flat_type = serializers.ChoiceField(choices=Flat.FLAT_TYPE_CHOICES)
+    carpet_area = serializers.DecimalField(max_digits=10, decimal_places=2)
+    built_up_area = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    super_area = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    facing = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    balcony = serializers.BooleanField(default=False)
+    parking = serializers.BooleanField(default=False)
+    base_price_per_sqft = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+
+
+class FloorPlanTemplateSerializer(serializers.Serializer):
+    """Per-floor layout template used to generate a tower's flats"""
+    layout = FloorPlanUnitSerializer(many=True, allow_empty=False)
+    base_price_per_sqft = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    price_per_sqft_step = serializers.DecimalField(max_digits=10, decimal_places=2, default=0)
+    flat_number_format = serializers.CharField(default='{tower}-{floor}{unit:02d}')
+    refuge_floors = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    
+    def validate_layout(self, value):
+        units = [unit['unit'] for unit in value]
+        if len(units) != len(set(units)):
+            raise serializers.ValidationError('Unit numbers must be unique')
+        return value
+    
+    def validate_flat_number_format(self, value):
+        try:
+            value.format(tower='A', floor=1, unit=1)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as exc:
+            raise serializers.ValidationError(f'Invalid format: {exc}')
+        return value
+
+
 class TowerAmenitySerializer(serializers.ModelSerializer):
     class Meta:
         model = TowerAmenity
@@ -50,18 +135,12 @@ class TowerAmenitySerializer(serializers.ModelSerializer):
 class TowerSerializer(serializers.ModelSerializer):
     flats = FlatSerializer(many=True, read_only=True)
     amenities = TowerAmenitySerializer(many=True, read_only=True)
-    available_flats_count = serializers.SerializerMethodField()
-    sold_flats_count = serializers.SerializerMethodField()
+    # flats_count / available_flats_count / sold_flats_count / ... are
+    # read-only counter columns maintained from Flat writes
     
     class Meta:
         model = Tower
         fields = '__all__'
-    
-    def get_available_flats_count(self, obj):
-        return obj.flats.filter(status='available').count()
-    
-    def get_sold_flats_count(self, obj):
-        return obj.flats.filter(status='sold').count()
 
 
 class ProjectSerializer(serializers.ModelSerializer):
@@ -70,7 +149,6 @@ class ProjectSerializer(serializers.ModelSerializer):
     amenities = ProjectAmenitySerializer(many=True, read_only=True)
     towers = TowerSerializer(many=True, read_only=True)
     city_name_display = serializers.SerializerMethodField()
-    towers_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Project
@@ -86,9 +164,6 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_city_name_display(self, obj):
         return obj.get_city_name()
-    
-    def get_towers_count(self, obj):
-        return obj.towers.count()
 
 
 class ClientSerializer(serializers.ModelSerializer):
@@ -191,3 +266,272 @@ class ProjectEnquirySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectEnquiry
         fields = '__all__'
+
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'filters', 'alerts', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_filters(self, value):
+        try:
+            return saved_searches.normalize(value)
+        except ValidationError as exc:
+            raise serializers.ValidationError(exc.detail)
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    """A saved-search notification; the flat's status is read live"""
+    search_name = serializers.CharField(source='search.name', read_only=True)
+    project = serializers.SerializerMethodField()
+    flat = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'search', 'search_name', 'project', 'flat', 'created_at', 'read_at']
+    
+    def get_project(self, obj):
+        return {'id': obj.project.id, 'title': obj.project.title, 'location': obj.project.location}
+    
+    def get_flat(self, obj):
+        if obj.flat is None:
+            return None
+        return {
+            'id': obj.flat.id, 'flat_number': obj.flat.flat_number, 'flat_type': obj.flat.flat_type,
+            'price': obj.flat.price, 'status': obj.flat.status,
+        }
+
+
+
+class ShortlistedProjectSerializer(serializers.ModelSerializer):
+    """Summary of a shortlisted project (select_related project__city)"""
+    id = serializers.IntegerField(source='project.id')
+    title = serializers.CharField(source='project.title')
+    location = serializers.CharField(source='project.location')
+    city_name = serializers.CharField(source='project.get_city_name')
+    property_type = serializers.CharField(source='project.property_type')
+    project_status = serializers.CharField(source='project.project_status')
+    cover_image_url = serializers.SerializerMethodField()
+    price_min = serializers.DecimalField(source='project.price_min', max_digits=12, decimal_places=2)
+    price_max = serializers.DecimalField(source='project.price_max', max_digits=12, decimal_places=2)
+    available_flats_count = serializers.IntegerField(source='project.available_flats_count')
+    added_at = serializers.DateTimeField(source='created_at')
+    
+    class Meta:
+        model = ShortlistedProject
+        fields = [
+            'id', 'title', 'location', 'city_name', 'property_type', 'project_status', 'cover_image_url',
+            'price_min', 'price_max', 'available_flats_count', 'added_at',
+        ]
+    
+    def get_cover_image_url(self, obj):
+        if obj.project.cover_image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.project.cover_image.url)
+            return obj.project.cover_image.url
+        return None
+
+
+class ShortlistedFlatSerializer(serializers.ModelSerializer):
+    """A shortlisted flat with its live status (select_related flat__tower__project)"""
+    id = serializers.IntegerField(source='flat.id')
+    flat_number = serializers.CharField(source='flat.flat_number')
+    flat_type = serializers.CharField(source='flat.flat_type')
+    floor_number = serializers.IntegerField(source='flat.floor_number')
+    carpet_area = serializers.DecimalField(source='flat.carpet_area', max_digits=10, decimal_places=2)
+    price = serializers.DecimalField(source='flat.price', max_digits=12, decimal_places=2)
+    status = serializers.CharField(source='flat.status')
+    tower = serializers.SerializerMethodField()
+    project = serializers.SerializerMethodField()
+    added_at = serializers.DateTimeField(source='created_at')
+    
+    class Meta:
+        model = ShortlistedFlat
+        fields = ['id', 'flat_number', 'flat_type', 'floor_number', 'carpet_area', 'price', 'status', 'tower', 'project', 'added_at']
+    
+    def get_tower(self, obj):
+        return {'id': obj.flat.tower.id, 'name': obj.flat.tower.name}
+    
+    def get_project(self, obj):
+        return {'id': obj.flat.tower.project.id, 'title': obj.flat.tower.project.title}
+
+class CompiledSerializer:
+    """
+    Read-only fast path for a ModelSerializer.
+    
+    Renders ``.values()`` rows instead of model instances. The wrapped
+    serializer's fields are inspected once per class to decide the output
+    keys (in the same order) and how each value is converted. Nested
+    serializers listed in ``children`` are filled with one query per
+    relation for the whole result set; SerializerMethodFields are filled
+    by ``finish()``.
+    """
+    serializer_class = None
+    # output key -> (compiled child serializer class, FK name on the child)
+    children = {}
+    # extra ``.values()`` lookups needed by finish()
+    extra_values = ()
+    
+    # Field types whose database value can be emitted as-is
+    PASSTHROUGH_FIELDS = (
+        serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+        serializers.FloatField, serializers.ChoiceField, serializers.PrimaryKeyRelatedField,
+        serializers.ModelField,
+    )
+    
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.request = self.context.get('request')
+    
+    @classmethod
+    def compile(cls):
+        if '_plan' not in cls.__dict__:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)) or '.' in field.source:
+                    # Filled in by children / finish(); keeps the key order
+                    plan.append((name, None, None))
+                elif isinstance(field, serializers.FileField):
+                    storage = cls.serializer_class.Meta.model._meta.get_field(field.source).storage
+                    plan.append((name, field.source, storage))
+                elif isinstance(field, cls.PASSTHROUGH_FIELDS):
+                    plan.append((name, field.source, None))
+                else:
+                    plan.append((name, field.source, field.to_representation))
+            cls._plan = plan
+            cls._values = [source for name, source, convert in plan if source] + list(cls.extra_values)
+        return cls._plan
+    
+    def file_url(self, storage, name):
+        if not name:
+            return None
+        url = storage.url(name)
+        if self.request:
+            return self.request.build_absolute_uri(url)
+        return url
+    
+    def to_representation(self, row):
+        data = {}
+        for name, source, convert in self._plan:
+            if source is None:
+                data[name] = None
+                continue
+            value = row[source]
+            if value is None or convert is None:
+                data[name] = value
+            elif callable(convert):
+                data[name] = convert(value)
+            else:
+                data[name] = self.file_url(convert, value)
+        return data
+    
+    def finish(self, data, row):
+        """Fill SerializerMethodFields; ``row`` is the raw values() row"""
+    
+    def serialize(self, queryset):
+        """Serialize a queryset into a list of dicts"""
+        self.compile()
+        rows = list(queryset.values(*self._values))
+        return self.serialize_rows(rows)
+    
+    def serialize_rows(self, rows):
+        results = [self.to_representation(row) for row in rows]
+        if self.children and rows:
+            ids = [row['id'] for row in rows]
+            for name, (child_class, fk) in self.children.items():
+                child = child_class(self.context)
+                items = child.serialize(child.queryset_for(fk, ids))
+                self.attach(results, name, fk, items)
+        for data, row in zip(results, rows):
+            self.finish(data, row)
+        return results
+    
+    async def aserialize(self, queryset):
+        """serialize() on the async ORM; child relations are loaded concurrently"""
+        self.compile()
+        rows = [row async for row in queryset.values(*self._values)]
+        results = [self.to_representation(row) for row in rows]
+        if self.children and rows:
+            ids = [row['id'] for row in rows]
+            children = [(name, fk, child_class(self.context)) for name, (child_class, fk) in self.children.items()]
+            loaded = await asyncio.gather(*(child.aserialize(child.queryset_for(fk, ids)) for name, fk, child in children))
+            for (name, fk, child), items in zip(children, loaded):
+                self.attach(results, name, fk, items)
+        for data, row in zip(results, rows):
+            self.finish(data, row)
+        return results
+    
+    @classmethod
+    def queryset_for(cls, fk, ids):
+        return cls.serializer_class.Meta.model.objects.filter(**{f'{fk}__in': ids})
+    
+    @staticmethod
+    def attach(results, name, fk, items):
+        grouped = {data['id']: [] for data in results}
+        for item in items:
+            grouped[item[fk]].append(item)
+        for data in results:
+            data[name] = grouped[data['id']]
+
+
+class CompiledFlatSerializer(CompiledSerializer):
+    serializer_class = FlatSerializer
+
+
+class CompiledTowerAmenitySerializer(CompiledSerializer):
+    serializer_class = TowerAmenitySerializer
+
+
+class CompiledTowerSerializer(CompiledSerializer):
+    serializer_class = TowerSerializer
+    children = {
+        'flats': (CompiledFlatSerializer, 'tower'),
+        'amenities': (CompiledTowerAmenitySerializer, 'tower'),
+    }
+
+
+class CompiledProjectImageSerializer(CompiledSerializer):
+    serializer_class = ProjectImageSerializer
+    
+    def finish(self, data, row):
+        data['image_url'] = data['image']
+
+
+class CompiledProjectAmenitySerializer(CompiledSerializer):
+    serializer_class = ProjectAmenitySerializer
+
+
+class CompiledBlogPostSerializer(CompiledSerializer):
+    serializer_class = BlogPostSerializer
+    
+    def finish(self, data, row):
+        data['featured_image_url'] = data['featured_image']
+        data['video_url'] = data['video']
+
+
+class CompiledCitySerializer(CompiledSerializer):
+    serializer_class = CitySerializer
+
+
+class CompiledReviewSerializer(CompiledSerializer):
+    serializer_class = ReviewSerializer
+
+
+class CompiledProjectSerializer(CompiledSerializer):
+    """Full project tree (images, amenities, towers, flats) in six queries"""
+    serializer_class = ProjectSerializer
+    children = {
+        'images': (CompiledProjectImageSerializer, 'project'),
+        'amenities': (CompiledProjectAmenitySerializer, 'project'),
+        'towers': (CompiledTowerSerializer, 'project'),
+    }
+    extra_values = ('city__name',)
+    
+    def finish(self, data, row):
+        data['cover_image_url'] = data['cover_image']
+        data['city_name_display'] = row['city__name'] or row['city_name']
@@ -0,0 +1,65 @@
+"""
+Client shortlists
+
+A ClientUser's shortlisted projects and flats are (user, item) rows, each
+table with a unique (user, item) index that also serves the per-user
+lookups. A shortlist is read with one joined query per kind, so it costs
+the same for two items or two hundred, and flats come with their live
+status. POST /api/shortlist/ adds many ids at once, so a list kept in the
+browser can be synced in one request.
+"""
+from django.db import transaction
+
+from .exceptions import ValidationError
+from .models import ClientUser, Flat, Project, ShortlistedFlat, ShortlistedProject
+
+MAX_ITEMS = 200
+
+# request key -> (shortlist model, item field, item model)
+KINDS = {
+    'projects': (ShortlistedProject, 'project', Project),
+    'flats': (ShortlistedFlat, 'flat', Flat),
+}
+
+
+def add(user, ids):
+    """Shortlist the existing ids ({kind: ids}) not on the user's shortlist yet; returns {kind: how many were added}"""
+    with transaction.atomic():
+        # Concurrent adds for the user wait here, so the cap holds
+        list(ClientUser.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+        return {kind: _add(user, kind, list(dict.fromkeys(ids.get(kind) or []))) for kind in KINDS}
+
+
+def _add(user, kind, ids):
+    model, field, item_model = KINDS[kind]
+    if not ids:
+        return 0
+    current = set(model.objects.filter(user=user).values_list(f'{field}_id', flat=True))
+    new = [pk for pk in ids if pk not in current]
+    if not new:
+        return 0
+    found = set(item_model.objects.filter(pk__in=new).values_list('id', flat=True))
+    missing = [pk for pk in new if pk not in found]
+    if missing:
+        raise ValidationError(f'{kind}: not found: {", ".join(map(str, missing))}')
+    if len(current) + len(new) > MAX_ITEMS:
+        raise ValidationError(f'At most {MAX_ITEMS} {kind} can be shortlisted')
+    # ignore_conflicts: SQLite has no row locks, so a concurrent add can still
+    # get in first; only the rows that are there now were added
+    model.objects.bulk_create([model(user=user, **{f'{field}_id': pk}) for pk in new], ignore_conflicts=True)
+    return model.objects.filter(user=user).count() - len(current)
+
+
+def remove(user, kind, pk):
+    """Drop an item from the user's shortlist; returns whether it was there"""
+    model, field, item_model = KINDS[kind]
+    deleted, per_model = model.objects.filter(user=user, **{f'{field}_id': pk}).delete()
+    return bool(deleted)
+
+
+def shortlisted_projects(user):
+    return ShortlistedProject.objects.filter(user=user).select_related('project__city')
+
+
+def shortlisted_flats(user):
+    return ShortlistedFlat.objects.filter(user=user).select_related('flat__tower__project')
@@ -0,0 +1,191 @@
+"""
+Model signal handlers
+
+Keep the denormalized inventory counters on Tower and Project in step with
+Flat and Tower writes, and the project price/area ranges in step with flat
+prices and areas. Flat.save() and Tower.save() run inside a transaction, so
+the counter updates commit or roll back with the row.
+Cached per-project payloads are invalidated, the autocomplete index
+updated, and saved searches matched against new or newly available
+projects and flats, once the write commits.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, inventory, saved_searches
+from .cache import invalidate_projects_on_commit
+from .models import BlogPost, City, Contact, Flat, Project, ProjectAmenity, ProjectEnquiry, ProjectImage, Tower, TowerAmenity
+
+# Models whose rows are part of cached project payloads (e.g. the bundle)
+PROJECT_CHILDREN = (ProjectImage, ProjectAmenity, BlogPost, ProjectEnquiry, Contact)
+
+
+def tower_project_id(tower_id, instance=None):
+    """Project of a tower, using the instance's cached tower when loaded"""
+    if instance is not None and Flat.tower.is_cached(instance) and instance.tower.pk == tower_id:
+        return instance.tower.project_id
+    return Tower.objects.filter(pk=tower_id).values_list('project_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Flat)
+def remember_flat_state(sender, instance, raw=False, **kwargs):
+    """Load the stored tower/status/price/area so post_save can move the counters"""
+    instance._stored_state = None
+    if instance.pk and not raw:
+        instance._stored_state = Flat.objects.filter(pk=instance.pk).values_list('tower_id', 'status', 'price', 'carpet_area').first()
+
+
+@receiver(post_save, sender=Flat)
+def update_counters_on_flat_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    project_ids = {tower_project_id(instance.tower_id, instance)}
+    stored = getattr(instance, '_stored_state', None)
+    if created or stored is None:
+        inventory.add_flat(instance.tower_id, instance.status)
+        inventory.refresh_project_ranges(project_ids)
+    else:
+        old_tower_id, old_status, old_price, old_area = stored
+        if old_tower_id != instance.tower_id:
+            inventory.add_flat(old_tower_id, old_status, -1)
+            inventory.add_flat(instance.tower_id, instance.status)
+            project_ids.add(tower_project_id(old_tower_id))
+        elif old_status != instance.status:
+            inventory.move_flat_status(instance.tower_id, old_status, instance.status)
+        if len(project_ids) > 1 or old_price != instance.price or old_area != instance.carpet_area:
+            inventory.refresh_project_ranges(project_ids)
+    invalidate_projects_on_commit(project_ids)
+
+
+@receiver(post_delete, sender=Flat)
+def update_counters_on_flat_delete(sender, instance, **kwargs):
+    inventory.add_flat(instance.tower_id, instance.status, -1)
+    project_id = tower_project_id(instance.tower_id, instance)
+    inventory.refresh_project_ranges_on_commit([project_id])
+    invalidate_projects_on_commit([project_id])
+
+
+@receiver(pre_save, sender=Tower)
+def remember_tower_project(sender, instance, raw=False, **kwargs):
+    instance._stored_project_id = None
+    if instance.pk and not raw:
+        instance._stored_project_id = Tower.objects.filter(pk=instance.pk).values_list('project_id', flat=True).first()
+
+
+@receiver(post_save, sender=Tower)
+def update_counters_on_tower_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_project_id = getattr(instance, '_stored_project_id', None)
+    if created or old_project_id is None:
+        Project.objects.filter(pk=instance.project_id).update(towers_count=F('towers_count') + 1)
+    elif old_project_id != instance.project_id:
+        # Tower moved with its flats; recount both projects
+        inventory.recount_projects([old_project_id, instance.project_id])
+    invalidate_projects_on_commit([old_project_id, instance.project_id])
+
+
+@receiver(post_delete, sender=Tower)
+def update_counters_on_tower_delete(sender, instance, **kwargs):
+    # The tower's flats are deleted first and already removed their counts
+    Project.objects.filter(pk=instance.project_id).update(towers_count=F('towers_count') - 1)
+    invalidate_projects_on_commit([instance.project_id])
+
+
+@receiver(post_save, sender=Project)
+def update_ranges_on_project_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Project.price is part of the project's price range
+    if raw or (update_fields and 'price' not in update_fields):
+        return
+    inventory.refresh_project_ranges([instance.pk])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_cache(sender, instance, raw=False, update_fields=None, **kwargs):
+    # View counting (update_fields=['views']) does not change cached payloads
+    if raw or (update_fields and set(update_fields) <= {'views'}):
+        return
+    invalidate_projects_on_commit([instance.pk])
+
+
+def remember_child_project(sender, instance, raw=False, **kwargs):
+    """A child moved to another project invalidates both"""
+    instance._stored_project_id = None
+    if instance.pk and not raw:
+        instance._stored_project_id = sender.objects.filter(pk=instance.pk).values_list('project_id', flat=True).first()
+
+
+def invalidate_child_project(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_projects_on_commit([instance.project_id, getattr(instance, '_stored_project_id', None)])
+
+
+for model in PROJECT_CHILDREN:
+    pre_save.connect(remember_child_project, sender=model)
+    post_save.connect(invalidate_child_project, sender=model)
+    post_delete.connect(invalidate_child_project, sender=model)
+
+
+@receiver(post_save, sender=TowerAmenity)
+@receiver(post_delete, sender=TowerAmenity)
+def invalidate_tower_amenity_project(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_projects_on_commit([tower_project_id(instance.tower_id)])
+
+
+@receiver(post_save, sender=City)
+def invalidate_city_projects(sender, instance, raw=False, **kwargs):
+    # Cached project payloads embed the city name
+    if raw:
+        return
+    invalidate_projects_on_commit(Project.objects.filter(city=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def update_autocomplete_for_project(sender, instance, raw=False, update_fields=None, signal=None, **kwargs):
+    if raw or (update_fields and not set(update_fields) & {'title', 'location', 'developer_name', 'city', 'city_name'}):
+        return
+    entries = autocomplete.project_entries(instance) if signal is post_save else []
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.update(('project', pk), entries))
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def update_autocomplete_for_city(sender, instance, raw=False, signal=None, **kwargs):
+    if raw:
+        return
+    entries = autocomplete.city_entries(instance) if signal is post_save else []
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.update(('city', pk), entries))
+
+
+@receiver(pre_save, sender=Project)
+def remember_project_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._stored_status = None
+    if instance.pk and not raw and not (update_fields and 'project_status' not in update_fields):
+        instance._stored_status = Project.objects.filter(pk=instance.pk).values_list('project_status', flat=True).first()
+
+
+@receiver(post_save, sender=Project)
+def match_saved_searches_on_project_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and 'project_status' not in update_fields):
+        return
+    if created or instance.project_status != getattr(instance, '_stored_status', None):
+        saved_searches.match_on_commit(project_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Flat)
+def match_saved_searches_on_flat_save(sender, instance, created, raw=False, **kwargs):
+    # New flats and flats that became available again
+    if raw or instance.status != 'available':
+        return
+    stored = getattr(instance, '_stored_state', None)
+    if created or stored is None or stored[1] != 'available':
+        saved_searches.match_on_commit(flat_ids=[instance.pk])
@@ -0,0 +1,245 @@
+"""
+SQL fingerprint statistics and slow-query log
+
+While a request runs (see SQLStatsMiddleware), every query goes through
+record() via connection.execute_wrapper. The SQL is normalized into a
+fingerprint (literals, placeholders, IN lists and savepoint names replaced)
+and its latency is added to a fixed-bucket histogram per fingerprint and per
+view. Histograms merge exactly, so each process keeps its own totals and
+flushes them to the cache under its own key; report() merges all processes.
+
+Queries slower than settings.SQL_SLOW_QUERY_MS are logged with their EXPLAIN
+plan.
+"""
+import functools
+import hashlib
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, NotSupportedError, connection
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+CACHE_PREFIX = 'sql-stats'
+PROCESS_TTL = 60 * 60 * 24
+SORT_KEYS = ('total_ms', 'count', 'p95_ms', 'max_ms', 'slow')
+
+_lock = threading.Lock()
+_local = threading.local()
+_fingerprints = {}
+_views = {}
+_state = {'epoch': None, 'flushed': 0.0}
+PROCESS_KEY = f'{CACHE_PREFIX}:process:{socket.gethostname()}:{os.getpid()}'
+
+_SUBSTITUTIONS = [
+    (re.compile(r'(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT) "?\w+"?'), r'\1 ?'),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bIN \((?:\?,\s*)*\?\)'), 'IN (...)'),
+    (re.compile(r'\bVALUES \(.*?\)(?:, \(.*?\))+'), 'VALUES (...)'),
+    (re.compile(r'(?:WHEN \([^()]*\) THEN \?\s*){2,}'), 'WHEN ... THEN ? '),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """(id, normalized SQL) that is the same for every run of a query shape"""
+    normalized = sql
+    for pattern, replacement in _SUBSTITUTIONS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _new_entry(**extra):
+    return {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0, 'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1), **extra}
+
+
+def _add(entry, elapsed_ms, slow):
+    entry['count'] += 1
+    entry['total_ms'] += elapsed_ms
+    entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+    entry['slow'] += slow
+    index = next((n for n, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound), len(LATENCY_BUCKETS_MS))
+    entry['buckets'][index] += 1
+
+
+def _explain(sql, params):
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except NotSupportedError:
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except DatabaseError:
+        return None
+    finally:
+        _local.explaining = False
+
+
+def record(execute, sql, params, many, context):
+    """execute_wrapper: time the query and add it to the statistics"""
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    view = _local.view() if getattr(_local, 'view', None) else '(no view)'
+    key, normalized = fingerprint(sql)
+    slow = elapsed_ms >= settings.SQL_SLOW_QUERY_MS
+    with _lock:
+        entry = _fingerprints.setdefault(key, _new_entry(sql=normalized, views={}))
+        _add(entry, elapsed_ms, slow)
+        per_view = entry['views'].setdefault(view, [0, 0.0])
+        per_view[0] += 1
+        per_view[1] += elapsed_ms
+        _add(_views.setdefault(view, _new_entry()), elapsed_ms, slow)
+    
+    if slow:
+        plan = _explain(sql, params) if not many and sql.lstrip()[:6].upper() == 'SELECT' else None
+        logger.warning(
+            f'Slow query ({elapsed_ms:.1f} ms) in {view} [{key}]: {sql}\nParams: {params!r}'
+            + (f'\nPlan:\n{plan}' if plan else '')
+        )
+    return result
+
+
+@contextmanager
+def record_queries(view):
+    """Record queries on the default connection; ``view`` is a name or a callable returning one"""
+    previous = getattr(_local, 'view', None)
+    _local.view = view if callable(view) else (lambda: view)
+    try:
+        with connection.execute_wrapper(record):
+            yield
+    finally:
+        _local.view = previous
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'fingerprints': {
+                key: dict(entry, buckets=list(entry['buckets']), views={view: list(value) for view, value in entry['views'].items()})
+                for key, entry in _fingerprints.items()
+            },
+            'views': {view: dict(entry, buckets=list(entry['buckets'])) for view, entry in _views.items()},
+        }
+
+
+def _clear_local():
+    with _lock:
+        _fingerprints.clear()
+        _views.clear()
+
+
+def flush(force=False):
+    """Publish this process's totals to the cache (at most every SQL_STATS_FLUSH_SECONDS)"""
+    now = time.monotonic()
+    if not force and now - _state['flushed'] < settings.SQL_STATS_FLUSH_SECONDS:
+        return
+    _state['flushed'] = now
+    epoch = cache.get_or_set(f'{CACHE_PREFIX}:epoch', time.time, None)
+    if _state['epoch'] != epoch:
+        # Stats were reset (possibly by another process) since our last flush
+        if _state['epoch'] is not None:
+            _clear_local()
+        _state['epoch'] = epoch
+    cache.set(PROCESS_KEY, _snapshot(), PROCESS_TTL)
+    processes = cache.get(f'{CACHE_PREFIX}:processes') or []
+    if PROCESS_KEY not in processes:
+        cache.set(f'{CACHE_PREFIX}:processes', processes + [PROCESS_KEY], None)
+
+
+def reset():
+    """Start counting from zero in every process"""
+    processes = cache.get(f'{CACHE_PREFIX}:processes') or []
+    cache.delete_many(processes + [f'{CACHE_PREFIX}:processes'])
+    cache.set(f'{CACHE_PREFIX}:epoch', time.time(), None)
+    _clear_local()
+    _state['epoch'] = None
+
+
+def _merge(target, entry):
+    target['count'] += entry['count']
+    target['total_ms'] += entry['total_ms']
+    target['max_ms'] = max(target['max_ms'], entry['max_ms'])
+    target['slow'] += entry['slow']
+    target['buckets'] = [a + b for a, b in zip(target['buckets'], entry['buckets'])]
+
+
+def percentile(entry, fraction):
+    """Upper bound of the bucket holding the given fraction of queries"""
+    needed = fraction * entry['count']
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, entry['buckets']):
+        seen += count
+        if count and seen >= needed:
+            return min(bound, entry['max_ms'])
+    return entry['max_ms']
+
+
+def _summary(entry):
+    return {
+        'count': entry['count'],
+        'total_ms': round(entry['total_ms'], 3),
+        'mean_ms': round(entry['total_ms'] / entry['count'], 3) if entry['count'] else 0,
+        'p50_ms': percentile(entry, 0.5),
+        'p95_ms': percentile(entry, 0.95),
+        'p99_ms': percentile(entry, 0.99),
+        'max_ms': round(entry['max_ms'], 3),
+        'slow': entry['slow'],
+    }
+
+
+def report(limit=20, sort='total_ms', view=None):
+    """Top ``limit`` fingerprints and views across all processes"""
+    if sort not in SORT_KEYS:
+        raise ValueError(f'sort must be one of {", ".join(SORT_KEYS)}')
+    flush(force=True)
+    processes = cache.get(f'{CACHE_PREFIX}:processes') or []
+    fingerprints, views = {}, {}
+    for snapshot in cache.get_many(processes).values():
+        for key, entry in snapshot['fingerprints'].items():
+            if view and view not in entry['views']:
+                continue
+            merged = fingerprints.setdefault(key, _new_entry(sql=entry['sql'], views={}))
+            _merge(merged, entry)
+            for name, (count, total_ms) in entry['views'].items():
+                per_view = merged['views'].setdefault(name, [0, 0.0])
+                per_view[0] += count
+                per_view[1] += total_ms
+        for name, entry in snapshot['views'].items():
+            if not view or name == view:
+                _merge(views.setdefault(name, _new_entry()), entry)
+    
+    def top(entries):
+        rows = [dict(_summary(entry), **extra) for extra, entry in entries]
+        return sorted(rows, key=lambda row: row[sort], reverse=True)[:limit]
+    
+    return {
+        'processes': len(processes),
+        'fingerprints': top(
+            ({'id': key, 'sql': entry['sql'], 'views': [
+                {'view': name, 'count': count, 'total_ms': round(total_ms, 3)}
+                for name, (count, total_ms) in sorted(entry['views'].items(), key=lambda item: -item[1][1])[:5]
+            ]}, entry)
+            for key, entry in fingerprints.items()
+        ),
+        'views': top(({'view': name}, entry) for name, entry in views.items()),
+    }
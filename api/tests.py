@@ -1,12 +1,15 @@
 """
 Unit Tests for API
 """
-from django.test import TestCase
+import os
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import User, OTP, Project, City, Contact
+from .models import ClientUser, OTP, Project, City, Contact
+from .query_budget import budget_tests
+from . import urls
 
 
 class AuthenticationTestCase(TestCase):
@@ -48,7 +51,9 @@ class AuthenticationTestCase(TestCase):
             'purpose': 'login'
         })
         self.assertEqual(verify_response.status_code, status.HTTP_200_OK)
-        self.assertIn('user', verify_response.data)
+        # A new mobile has to complete its profile before it gets a token
+        self.assertTrue(verify_response.data['needs_registration'])
+        self.assertNotIn('access_token', verify_response.data)
     
     def test_verify_otp_invalid(self):
         """Test OTP verification with invalid OTP"""
@@ -85,8 +90,8 @@ class ProjectViewSetTestCase(TestCase):
             'description': 'Test Description',
             # Don't include cover_image if it's None
         })
-        # Should allow (permission check is in frontend)
-        self.assertIn(response.status_code, [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
+        # Writes need a staff token
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
 class ContactViewSetTestCase(TestCase):
@@ -107,3 +112,1145 @@ class ContactViewSetTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Contact.objects.count(), 1)
 
+
+
+class MediaRangeServingTestCase(TestCase):
+    """Test Range/conditional handling of the media view"""
+    
+    def setUp(self):
+        import tempfile
+        from django.test import RequestFactory
+        self.factory = RequestFactory()
+        self.media_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.media_root, 'blog', 'videos'))
+        with open(os.path.join(self.media_root, 'blog', 'videos', 'tour.mp4'), 'wb') as f:
+            f.write(bytes(range(256)) * 4)
+    
+    def get(self, path, **headers):
+        from api.media import serve_media
+        with self.settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_BACKEND=None):
+            response = serve_media(self.factory.get('/media/' + path, **headers), path)
+            response.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+    
+    def test_full_file(self):
+        response = self.get('blog/videos/tour.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.body), 1024)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+    
+    def test_partial_content(self):
+        response = self.get('blog/videos/tour.mp4', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(response.body, bytes(range(10, 20)))
+        
+        response = self.get('blog/videos/tour.mp4', HTTP_RANGE='bytes=-4')
+        self.assertEqual(response.body, bytes(range(252, 256)))
+    
+    def test_unsatisfiable_range(self):
+        response = self.get('blog/videos/tour.mp4', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+    
+    def test_not_modified(self):
+        etag = self.get('blog/videos/tour.mp4')['ETag']
+        response = self.get('blog/videos/tour.mp4', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_path_traversal(self):
+        from django.http import Http404
+        with self.assertRaises(Http404):
+            self.get('../settings.py')
+
+
+class CompiledSerializerTestCase(TestCase):
+    """Compiled (values-based) serializers must match the DRF serializers"""
+    
+    def setUp(self):
+        from decimal import Decimal
+        from rest_framework.test import APIRequestFactory
+        from .models import Tower, Flat, ProjectImage, ProjectAmenity, TowerAmenity
+        self.request = APIRequestFactory().get('/api/projects/')
+        city = City.objects.create(name='Pune')
+        self.project = Project.objects.create(
+            title='Skyline', property_type='residential', location='Baner',
+            description='Test', cover_image='projects/cover.jpg', city=city,
+            price=Decimal('7500000.50')
+        )
+        Project.objects.create(title='Empty', property_type='commercial', location='Wakad', description='Test', cover_image='projects/empty.jpg')
+        ProjectImage.objects.create(project=self.project, image='projects/gallery/a.jpg', category='lobby')
+        ProjectAmenity.objects.create(project=self.project, name='Gym')
+        tower = Tower.objects.create(project=self.project, name='A', total_floors=10)
+        TowerAmenity.objects.create(tower=tower, name='Lift')
+        Flat.objects.create(tower=tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area=Decimal('650.5'), price=Decimal('6500000'))
+        Flat.objects.create(tower=tower, flat_number='A-102', flat_type='3bhk', floor_number=1, carpet_area=Decimal('900'), status='sold')
+    
+    def render(self, data):
+        from .renderers import FastJSONRenderer
+        import json
+        return json.loads(FastJSONRenderer().render(data))
+    
+    def test_project_tree_matches(self):
+        from .serializers import ProjectSerializer, CompiledProjectSerializer
+        context = {'request': self.request}
+        expected = ProjectSerializer(Project.objects.all(), many=True, context=context).data
+        compiled = CompiledProjectSerializer(context=context).serialize(Project.objects.all())
+        self.assertEqual(self.render(compiled), self.render(expected))
+        self.assertEqual(list(compiled[1]), list(expected[1]))
+    
+    def test_project_tree_query_count(self):
+        from .serializers import CompiledProjectSerializer
+        with self.assertNumQueries(6):
+            CompiledProjectSerializer().serialize(Project.objects.all())
+    
+    def test_renderer_matches_stock_renderer(self):
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'created_at': timezone.now(), 'title': 'Łódź\u2028', 'n': [1, None, True]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({'price': Decimal('1.50')}), b'{"price":"1.50"}')
+    
+    def test_renderer_datetime_format(self):
+        # DRF's encoder keeps microseconds (DjangoJSONEncoder would cut them to milliseconds)
+        import datetime
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        ist = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+        data = [
+            datetime.datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2024, 5, 1, 9, 30, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2024, 5, 1, 15, 0, 0, 500, tzinfo=ist),
+            datetime.datetime(2024, 5, 1, 9, 30),
+            datetime.date(2024, 5, 1),
+            datetime.time(9, 30, 0, 250000),
+        ]
+        rendered = FastJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertEqual(rendered, (
+            b'["2024-05-01T09:30:15.123456Z","2024-05-01T09:30:00Z","2024-05-01T15:00:00.000500+05:30",'
+            b'"2024-05-01T09:30:00","2024-05-01","09:30:00.250000"]'
+        ))
+
+
+class TowerInventoryTestCase(TestCase):
+    """Test the columnar tower inventory endpoint"""
+    
+    def setUp(self):
+        from .models import Tower, Flat
+        self.client = APIClient()
+        project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=project, name='A')
+        Flat.objects.create(tower=self.tower, flat_number='A-201', flat_type='3bhk', floor_number=2, carpet_area='900.00', status='sold')
+        Flat.objects.create(tower=self.tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650.50', price='6500000.00')
+    
+    def test_inventory_columns(self):
+        response = self.client.get(f'/api/towers/{self.tower.id}/inventory/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['flats']['flat_number'], ['A-101', 'A-201'])
+        self.assertEqual(data['flats']['carpet_area'], [650.5, 900.0])
+        self.assertEqual(data['flats']['price'], [6500000.0, None])
+        self.assertEqual([data['status_legend'][i] for i in data['flats']['status']], ['available', 'sold'])
+        # Legacy statuses outside STATUS_CHOICES don't break the grid
+        self.tower.flats.filter(flat_number='A-201').update(status='blocked')
+        self.assertEqual(self.client.get(f'/api/towers/{self.tower.id}/inventory/').json()['flats']['status'][1], -1)
+    
+    def test_inventory_unknown_tower(self):
+        response = self.client.get('/api/towers/9999/inventory/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class InventoryCounterTestCase(TestCase):
+    """Tower/Project counters follow Flat and Tower writes"""
+    
+    def setUp(self):
+        from .models import Tower
+        self.project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=self.project, name='A')
+    
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(obj, field), value, field)
+    
+    def test_flat_lifecycle(self):
+        from .models import Flat
+        flat = Flat.objects.create(tower=self.tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650')
+        Flat.objects.create(tower=self.tower, flat_number='A-102', flat_type='2bhk', floor_number=1, carpet_area='650', status='sold')
+        self.assertCounters(self.tower, flats_count=2, available_flats_count=1, sold_flats_count=1)
+        self.assertCounters(self.project, towers_count=1, flats_count=2, available_flats_count=1)
+        
+        flat.status = 'reserved'
+        flat.save()
+        self.assertCounters(self.tower, available_flats_count=0, reserved_flats_count=1)
+        self.assertCounters(self.project, available_flats_count=0, reserved_flats_count=1)
+        
+        flat.delete()
+        self.assertCounters(self.tower, flats_count=1, reserved_flats_count=0)
+        self.assertCounters(self.project, flats_count=1, reserved_flats_count=0)
+        
+        self.tower.delete()
+        self.assertCounters(self.project, towers_count=0, flats_count=0, sold_flats_count=0)
+    
+    def test_recount_inventory_repairs_drift(self):
+        from django.core.management import call_command
+        from .models import Flat, Tower
+        Flat.objects.create(tower=self.tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650')
+        Tower.objects.filter(pk=self.tower.pk).update(flats_count=7, available_flats_count=0)
+        Project.objects.filter(pk=self.project.pk).update(towers_count=3)
+        call_command('recount_inventory', stdout=open(os.devnull, 'w'))
+        self.assertCounters(self.tower, flats_count=1, available_flats_count=1)
+        self.assertCounters(self.project, towers_count=1, flats_count=1)
+
+
+class FlatFacetsTestCase(TestCase):
+    """Test the project flat facets endpoint"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import Tower, Flat
+        cache.clear()
+        self.client = APIClient()
+        self.project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=self.project, name='A')
+        for floor in range(1, 11):
+            Flat.objects.create(tower=self.tower, flat_number=f'A-{floor}01', flat_type='2bhk', floor_number=floor, carpet_area=600 + floor, price=5000000 + floor * 100000)
+            Flat.objects.create(tower=self.tower, flat_number=f'A-{floor}02', flat_type='3bhk', floor_number=floor, carpet_area=900, status='sold')
+    
+    def test_facets(self):
+        response = self.client.get(f'/api/projects/{self.project.id}/flat-facets/?flat_type=2bhk&status=available&floor_min=5&floor_max=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['total'], 20)
+        self.assertEqual(data['flat_types']['3bhk']['status'], {'sold': 10})
+        self.assertEqual(data['carpet_area'], {'min': 601.0, 'max': 900.0})
+        self.assertEqual(data['floors']['5'], {'total': 2, 'available': 1})
+        self.assertEqual(data['selection']['count'], 6)
+        self.assertEqual(data['selection']['price'], {'min': 5500000.0, 'max': 6000000.0})
+    
+    def test_facets_cached_until_flat_changes(self):
+        from .models import Flat
+        url = f'/api/projects/{self.project.id}/flat-facets/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['status_counts']['sold'], 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Flat.objects.filter(flat_number='A-101').get().delete()
+        self.assertEqual(self.client.get(url).json()['total'], 19)
+
+
+def admin_client():
+    """APIClient authenticated as a Django staff user"""
+    from django.contrib.auth.models import User as AuthUser
+    from rest_framework_simplejwt.tokens import AccessToken
+    admin = AuthUser.objects.create_user(username='admin', is_staff=True)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+    return client
+
+
+def client_user_client(mobile='9876543210'):
+    """APIClient authenticated as a registered ClientUser (OTP login); returns (client, user)"""
+    from .authentication import client_access_token
+    user = ClientUser.objects.create(mobile=mobile, first_name='Asha', is_registered=True)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {client_access_token(user)}')
+    return client, user
+
+
+class FlatBulkImportTestCase(TestCase):
+    """Test bulk flat import for a tower"""
+    
+    def setUp(self):
+        from .models import Tower
+        self.client = admin_client()
+        project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=project, name='A')
+        self.url = f'/api/towers/{self.tower.id}/flats/bulk/'
+    
+    def rows(self, floors):
+        return [
+            {'flat_number': f'A-{floor}{unit:02d}', 'flat_type': '2bhk', 'floor_number': floor, 'carpet_area': '650.00', 'price': '6500000.00'}
+            for floor in range(1, floors + 1) for unit in range(1, 11)
+        ]
+    
+    def test_bulk_create_batches_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.rows(40), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 400)
+        # INSERTs are batched (SQLite caps parameters per statement), not per row
+        self.assertLess(len(queries.captured_queries), 25)
+        self.tower.refresh_from_db()
+        self.assertEqual(self.tower.available_flats_count, 400)
+    
+    def test_conflicts_and_invalid_rows_are_reported(self):
+        self.client.post(self.url, self.rows(1), format='json')
+        rows = self.rows(1)[:2] + [{'flat_number': 'X-1', 'flat_type': 'castle', 'floor_number': 1, 'carpet_area': '1'}, {'flat_number': 'X-1'}]
+        response = self.client.post(self.url, {'flats': rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row['row'] for row in response.data['rows']], [0, 1, 2, 3, 3])
+        self.assertEqual(self.tower.flats.count(), 10)
+    
+    def test_csv_upsert(self):
+        self.client.post(self.url, self.rows(1), format='json')
+        csv_body = 'flat_number,flat_type,floor_number,carpet_area,status\nA-101,2bhk,1,700,sold\nA-201,3bhk,2,900,\n'
+        response = self.client.post(self.url + '?on_conflict=update', csv_body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        flat = self.tower.flats.get(flat_number='A-101')
+        self.assertEqual((str(flat.carpet_area), flat.status), ('700.00', 'sold'))
+    
+    def test_requires_admin(self):
+        response = APIClient().post(self.url, self.rows(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class FloorPlanGeneratorTestCase(TestCase):
+    """Test flat generation from layout templates"""
+    
+    TEMPLATE = {
+        'layout': [
+            {'unit': 1, 'flat_type': '2bhk', 'carpet_area': '650', 'facing': 'East'},
+            {'unit': 2, 'flat_type': '3bhk', 'carpet_area': '900', 'facing': 'West'},
+        ],
+        'base_price_per_sqft': '9000',
+        'price_per_sqft_step': '100',
+    }
+    
+    def setUp(self):
+        from .models import Tower
+        self.client = admin_client()
+        project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=project, name='A', total_floors=12, parking_floors=2, refugee_floors=1, per_floor_flats=2)
+        self.url = f'/api/towers/{self.tower.id}/generate-flats/'
+    
+    def test_generate_skips_parking_and_refuge_floors(self):
+        response = self.client.post(self.url, self.TEMPLATE, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['floors'], [3, 4, 5, 6, 8, 9, 10, 11, 12])
+        self.assertEqual(response.data['created'], 18)
+        flat = self.tower.flats.get(flat_number='A-402')
+        self.assertEqual((flat.flat_type, str(flat.price_per_sqft), str(flat.price)), ('3bhk', '9100.00', '8190000.00'))
+        self.tower.refresh_from_db()
+        self.assertEqual(self.tower.flats_count, 18)
+    
+    def test_regenerate_is_idempotent_and_keeps_status(self):
+        self.client.post(self.url, self.TEMPLATE, format='json')
+        self.tower.flats.filter(flat_number='A-301').update(status='sold')
+        template = dict(self.TEMPLATE, base_price_per_sqft='9500')
+        response = self.client.post(self.url, template, format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 18))
+        self.assertEqual(self.tower.flats.count(), 18)
+        flat = self.tower.flats.get(flat_number='A-301')
+        self.assertEqual((flat.status, str(flat.price_per_sqft)), ('sold', '9500.00'))
+    
+    def test_layout_must_match_per_floor_flats(self):
+        template = dict(self.TEMPLATE, layout=self.TEMPLATE['layout'][:1])
+        response = self.client.post(self.url, template, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_invalid_flat_number_format(self):
+        for flat_number_format in ('{tower}-{floor.x}', '{floor[0]}{unit}', '{tower}-{flat}'):
+            response = self.client.post(self.url, dict(self.TEMPLATE, flat_number_format=flat_number_format), format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, flat_number_format)
+
+
+class FlatStatusTransitionTestCase(TestCase):
+    """Test bulk flat status transitions"""
+    
+    def setUp(self):
+        from .models import Tower, Flat
+        self.client = admin_client()
+        project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.tower = Tower.objects.create(project=project, name='A')
+        self.flats = [
+            Flat.objects.create(tower=self.tower, flat_number=f'A-10{unit}', flat_type='2bhk', floor_number=1, carpet_area='650')
+            for unit in range(1, 5)
+        ]
+        self.flats[3].status = 'sold'
+        self.flats[3].save()
+    
+    def test_transition_reports_conflicts(self):
+        from .serializers import FlatSerializer
+        seen = FlatSerializer(self.flats[1]).data['updated_at']
+        self.flats[1].facing = 'East'
+        self.flats[1].save()  # changed by someone else after it was read
+        
+        response = self.client.post('/api/flats/status/', {
+            'to': 'reserved',
+            'flats': [self.flats[0].id, {'id': self.flats[1].id, 'updated_at': seen}, self.flats[3].id, 9999],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], [self.flats[0].id])
+        self.assertEqual([c['reason'] for c in response.data['conflicts']], ['stale', 'invalid_transition', 'not_found'])
+        self.tower.refresh_from_db()
+        self.assertEqual((self.tower.available_flats_count, self.tower.reserved_flats_count), (2, 1))
+    
+    def test_second_agent_loses_the_race(self):
+        payload = {'to': 'reserved', 'from': ['available'], 'flats': [self.flats[0].id]}
+        self.assertEqual(self.client.post('/api/flats/status/', payload, format='json').data['updated'], [self.flats[0].id])
+        response = self.client.post('/api/flats/status/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'][0]['reason'], 'invalid_transition')
+
+
+class ProjectPriceRangeTestCase(TestCase):
+    """Project price/area ranges follow flat writes and drive the list filters"""
+    
+    def setUp(self):
+        from .models import Tower, Flat
+        self.project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.other = Project.objects.create(title='Villas', property_type='residential', location='Wakad', description='Test', cover_image='projects/cover.jpg', price='25000000')
+        tower = Tower.objects.create(project=self.project, name='A')
+        self.cheap = Flat.objects.create(tower=tower, flat_number='A-101', flat_type='1bhk', floor_number=1, carpet_area='450', price='4500000')
+        Flat.objects.create(tower=tower, flat_number='A-102', flat_type='3bhk', floor_number=1, carpet_area='1100', price='11000000')
+    
+    def test_ranges_follow_flat_writes(self):
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.price_min, self.project.price_max), (4500000, 11000000))
+        self.assertEqual((self.project.carpet_area_min, self.project.carpet_area_max), (450, 1100))
+        
+        self.cheap.price = '5000000'
+        self.cheap.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.delete()
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.price_min, self.project.carpet_area_min), (11000000, 1100))
+        
+        self.other.refresh_from_db()
+        self.assertEqual((self.other.price_min, self.other.price_max, self.other.carpet_area_min), (25000000, 25000000, None))
+    
+    def test_cascade_delete_refreshes_once_per_project(self):
+        from unittest import mock
+        from . import inventory
+        from .models import Tower, Flat
+        tower = Tower.objects.create(project=self.project, name='B')
+        for unit in range(3):
+            Flat.objects.create(tower=tower, flat_number=f'B-10{unit}', flat_type='4bhk', floor_number=1, carpet_area='2000', price='30000000')
+        with mock.patch.object(inventory, 'refresh_project_ranges', wraps=inventory.refresh_project_ranges) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                tower.delete()
+        self.assertEqual(refresh.call_count, 1)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.price_max, self.project.carpet_area_max), (11000000, 1100))
+    
+    def test_list_filters(self):
+        def titles(query):
+            return [project['title'] for project in self.client.get('/api/projects/' + query).data]
+        
+        self.assertEqual(titles('?budget=5000000'), ['Skyline'])
+        self.assertEqual(titles('?min_price=20000000'), ['Villas'])
+        self.assertEqual(titles('?min_price=10000000&max_price=30000000'), ['Villas', 'Skyline'])
+        self.assertEqual(titles('?min_area=1000&max_area=1200'), ['Skyline'])
+        self.assertEqual(titles('?max_area=400'), [])
+        self.assertEqual(len(titles('?budget=abc')), 2)
+
+
+class ProjectNearSearchTestCase(TestCase):
+    """Distance search and gazetteer backfill"""
+    
+    def setUp(self):
+        for title, location in [('Baner Heights', 'Baner, Pune'), ('Wakad Greens', 'Wakad'), ('Bandra Bay', 'Bandra, Mumbai'), ('Unknown', 'Nowhere')]:
+            Project.objects.create(title=title, property_type='residential', location=location, description='Test', cover_image='projects/cover.jpg')
+        import tempfile
+        handle, self.gazetteer = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as f:
+            f.write('name,latitude,longitude\nBaner,18.5590,73.7868\nWakad,18.5993,73.7625\nMumbai,19.0760,72.8777\n')
+        self.addCleanup(os.remove, self.gazetteer)
+    
+    def test_geocode_and_search(self):
+        from django.core.management import call_command
+        from io import StringIO
+        call_command('geocode_projects', gazetteer=self.gazetteer, stdout=StringIO())
+        self.assertEqual(Project.objects.filter(latitude__isnull=True).count(), 1)
+        self.assertEqual(float(Project.objects.get(title='Bandra Bay').latitude), 19.076)
+        
+        response = self.client.get('/api/projects/?near=18.5600,73.7800&radius_km=10')
+        self.assertEqual([p['title'] for p in response.data], ['Baner Heights', 'Wakad Greens'])
+        self.assertLess(response.data[0]['distance_km'], response.data[1]['distance_km'])
+        self.assertEqual(len(self.client.get('/api/projects/?near=18.5600,73.7800&radius_km=1').data), 1)
+        self.assertEqual(len(self.client.get('/api/projects/?near=north').data), 4)
+    
+    def test_bounding_box_contains_radius(self):
+        from .geo import bounding_box, haversine_km
+        min_lat, max_lat, min_lng, max_lng = bounding_box(18.56, 73.78, 25)
+        self.assertGreaterEqual(haversine_km(18.56, 73.78, max_lat, 73.78), 24.99)
+        self.assertGreaterEqual(haversine_km(18.56, 73.78, 18.56, max_lng), 24.99)
+        self.assertEqual(bounding_box(89.9, 0, 50)[2:], (None, None))
+
+
+class AutocompleteTestCase(TestCase):
+    """Test the typeahead index and endpoint"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from . import autocomplete
+        cache.clear()
+        autocomplete.reset()
+        self.pune = City.objects.create(name='Pune')
+        self.heights = Project.objects.create(title='Baner Heights', property_type='residential', location='Baner', city=self.pune, developer_name='Kolte Patil', description='Test', cover_image='projects/cover.jpg')
+        Project.objects.create(title='Skyline Towers', property_type='residential', location='Baner', city_name='Nashik', description='Test', cover_image='projects/cover.jpg')
+    
+    def search(self, q):
+        return [(r['type'], r['label']) for r in self.client.get('/api/autocomplete/', {'q': q}).data['results']]
+    
+    def test_prefix_search(self):
+        self.assertEqual(self.search('ban'), [('project', 'Baner Heights'), ('location', 'Baner')])
+        self.assertEqual(self.search('heig'), [('project', 'Baner Heights')])
+        self.assertEqual(self.search('kol'), [('developer', 'Kolte Patil')])
+        self.assertEqual(self.search('n'), [('city', 'Nashik')])
+        self.assertEqual(self.search(''), [])
+    
+    def test_incremental_updates(self):
+        self.search('x')  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.heights.title = 'Riverside'
+            self.heights.save()
+            City.objects.create(name='Mumbai')
+        self.assertEqual(self.search('ban'), [('location', 'Baner')])
+        self.assertEqual(self.search('riv'), [('project', 'Riverside')])
+        self.assertEqual(self.search('mum'), [('city', 'Mumbai')])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.heights.delete()
+        # Baner is still the location of the other project
+        self.assertEqual(self.search('ban'), [('location', 'Baner')])
+        self.assertEqual(self.search('riv'), [])
+    
+    def test_changes_from_other_processes_are_applied_without_rebuild(self):
+        from unittest import mock
+        from . import autocomplete
+        self.search('x')  # build the index
+        # Another process renamed a project and added a city
+        Project.objects.filter(pk=self.heights.pk).update(title='Riverside')
+        mumbai = City.objects.create(name='Mumbai')
+        autocomplete._publish(('project', self.heights.pk))
+        autocomplete._publish(('city', mumbai.pk))
+        with mock.patch.object(autocomplete, '_build', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(self.search('riv'), [('project', 'Riverside')])
+            self.assertEqual(self.search('mum'), [('city', 'Mumbai')])
+        
+        # invalidate() records no change, so the next lookup rebuilds
+        Project.objects.filter(pk=self.heights.pk).update(title='Baner Heights')
+        autocomplete.invalidate()
+        self.assertEqual(self.search('heig'), [('project', 'Baner Heights')])
+
+
+class ProjectBundleTestCase(TestCase):
+    """Test the cached project page bundle"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import Tower, Flat, BlogPost
+        cache.clear()
+        self.project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        tower = Tower.objects.create(project=self.project, name='A')
+        Flat.objects.create(tower=tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650')
+        BlogPost.objects.create(project=self.project, title='Walkthrough', slug='walkthrough', excerpt='x', content='x')
+        BlogPost.objects.create(project=self.project, title='Draft', slug='draft', excerpt='x', content='x', published=False)
+        self.url = f'/api/projects/{self.project.id}/bundle/'
+    
+    def test_bundle_contents(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['project']['towers'][0]['flats'][0]['flat_number'], 'A-101')
+        self.assertEqual([post['title'] for post in response.data['blog_posts']], ['Walkthrough'])
+        self.assertEqual((response.data['enquiries_count'], response.data['contacts_count']), (0, 0))
+        self.assertEqual(response.data['project']['views'], 1)
+        self.assertEqual(self.client.get('/api/projects/9999/bundle/').status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_cached_until_a_child_changes(self):
+        from .models import ProjectEnquiry, ProjectImage
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(self.url)
+        # views UPDATE, hourly view bucket upsert, views SELECT
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['project']['views'], 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectEnquiry.objects.create(project=self.project, name='A', mobile='9999999999', subject='Price', message='?')
+            ProjectImage.objects.create(project=self.project, image='projects/gallery/1.jpg')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['enquiries_count'], 1)
+        self.assertEqual(len(response.data['project']['images']), 1)
+    
+    def test_cached_per_scheme(self):
+        cover = self.client.get(self.url).data['project']['cover_image']
+        self.assertTrue(cover.startswith('http://testserver/'))
+        cover = self.client.get(self.url, secure=True).data['project']['cover_image']
+        self.assertTrue(cover.startswith('https://testserver/'))
+
+
+class BatchGetTestCase(TestCase):
+    """Test ?ids= on list views and the batch endpoint"""
+    
+    def setUp(self):
+        from .models import Tower, Flat
+        self.client = APIClient()
+        self.projects = [
+            Project.objects.create(title=f'Project {n}', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+            for n in range(3)
+        ]
+        self.tower = Tower.objects.create(project=self.projects[0], name='A')
+        self.flat = Flat.objects.create(tower=self.tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650')
+    
+    def test_ids_filter(self):
+        ids = [self.projects[0].id, self.projects[2].id]
+        response = self.client.get('/api/projects/', {'ids': f'{ids[0]},{ids[1]}'})
+        self.assertEqual([project['id'] for project in response.data], ids)
+        response = self.client.get('/api/flats/', {'ids': str(self.flat.id)})
+        self.assertEqual([flat['flat_number'] for flat in response.data], ['A-101'])
+        self.assertEqual(len(self.client.get('/api/towers/', {'ids': str(self.tower.id)}).data), 1)
+        self.assertEqual(self.client.get('/api/projects/', {'ids': '1,x'}).status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_batch(self):
+        paths = [f'/api/projects/{project.id}/' for project in self.projects] + [
+            f'/api/towers/{self.tower.id}/', '/api/projects/9999/', f'/api/flats/?tower={self.tower.id}', '/api/nowhere/',
+        ]
+        # 3 projects: views update + 6-query tree + view bucket upsert; tower: 3; flats list: 1
+        with self.assertNumQueries(12):
+            response = self.client.post('/api/batch/', {'requests': paths}, format='json')
+        responses = response.data['responses']
+        self.assertEqual([r['status'] for r in responses], [200, 200, 200, 200, 404, 200, 404])
+        self.assertEqual(responses[1]['body']['id'], self.projects[1].id)
+        self.assertEqual(responses[3]['body']['flats'][0]['flat_number'], 'A-101')
+        self.assertEqual(responses[5]['body'][0]['id'], self.flat.id)
+        self.assertEqual(Project.objects.get(pk=self.projects[0].id).views, 1)
+        # Counted for trending too, once per project
+        from .models import ProjectViewBucket
+        self.assertEqual(sorted(ProjectViewBucket.objects.values_list('project_id', 'views')), sorted((project.id, 1) for project in self.projects))
+        
+        # Async views are not dispatched in-process
+        response = self.client.post('/api/batch/', {'requests': ['/api/async/projects/', f'/api/async/projects/{self.projects[0].id}/']}, format='json')
+        self.assertEqual([r['status'] for r in response.data['responses']], [404, 404])
+        
+        too_many = self.client.post('/api/batch/', {'requests': paths * 4}, format='json')
+        self.assertEqual(too_many.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProjectCompareTestCase(TestCase):
+    """Test the project comparison matrix"""
+    
+    def setUp(self):
+        import datetime
+        from django.core.cache import cache
+        from .models import Tower, Flat, ProjectAmenity
+        cache.clear()
+        self.a = Project.objects.create(title='Skyline', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+        self.b = Project.objects.create(title='Riverside', property_type='residential', location='Wakad', description='Test', cover_image='projects/cover.jpg')
+        tower = Tower.objects.create(project=self.a, name='A', completion_date=datetime.date(2027, 6, 30))
+        Flat.objects.create(tower=tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650', price='6500000')
+        Flat.objects.create(tower=tower, flat_number='A-102', flat_type='3bhk', floor_number=1, carpet_area='900', price='9000000', status='sold')
+        for project, names in [(self.a, ['Gym', 'Pool']), (self.b, ['gym', 'Clubhouse'])]:
+            for name in names:
+                ProjectAmenity.objects.create(project=project, name=name)
+    
+    def test_compare(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/projects/compare/', {'ids': f'{self.b.id},{self.a.id}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        riverside, skyline = response.data['projects']
+        self.assertEqual(riverside['title'], 'Riverside')
+        self.assertEqual(skyline['price'], {'min': 6500000.0, 'max': 9000000.0})
+        self.assertEqual(skyline['flat_types']['3bhk']['available'], 0)
+        self.assertEqual(str(skyline['possession']['latest']), '2027-06-30')
+        self.assertEqual(response.data['common_amenities'], ['Gym'])
+        self.assertEqual((skyline['unique_amenities'], riverside['unique_amenities']), (['Pool'], ['Clubhouse']))
+        
+        # Same id set in another order is served from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/projects/compare/', {'ids': f'{self.a.id},{self.b.id}'})
+        self.assertEqual(response.data['projects'][0]['title'], 'Skyline')
+    
+    def test_invalid_ids(self):
+        self.assertEqual(self.client.get('/api/projects/compare/', {'ids': str(self.a.id)}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/projects/compare/', {'ids': f'{self.a.id},9999'}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncCatalogTestCase(TestCase):
+    """The async read paths return the same payloads as the sync views"""
+    
+    def setUp(self):
+        from .models import Tower, Flat, BlogPost, Review
+        city = City.objects.create(name='Pune')
+        City.objects.create(name='Hidden', is_active=False)
+        self.project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', city=city, description='Test', cover_image='projects/cover.jpg')
+        tower = Tower.objects.create(project=self.project, name='A')
+        Flat.objects.create(tower=tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650')
+        BlogPost.objects.create(project=self.project, title='Walkthrough', slug='walkthrough', excerpt='x', content='x', featured_image='blog/a.jpg')
+        Review.objects.create(customer_name='Asha', review_text='Great', featured=True)
+    
+    def test_payloads_match_sync_views(self):
+        for path in ['/api/projects/?search=sky', '/api/cities/', '/api/reviews/featured/', '/api/blog/']:
+            sync = self.client.get(path)
+            self.assertEqual(self.client.get(path.replace('/api/', '/api/async/')).json(), sync.json(), path)
+        
+        for path in [f'/api/projects/{self.project.id}/', '/api/blog/walkthrough/']:
+            sync = self.client.get(path).json()
+            response = self.client.get(path.replace('/api/', '/api/async/')).json()
+            self.assertEqual(response['views'], sync['views'] + 1)
+            sync['views'] = response['views']
+            self.assertEqual(response, sync, path)
+    
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/async/projects/9999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/blog/missing/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/projects/', {'ids': 'x'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/async/cities/').status_code, 405)
+    
+    def test_project_detail_counts_trending_view(self):
+        from .models import ProjectViewBucket
+        self.client.get(f'/api/async/projects/{self.project.id}/')
+        self.client.get(f'/api/async/projects/{self.project.id}/')
+        self.assertEqual(list(ProjectViewBucket.objects.values_list('project_id', 'views')), [(self.project.id, 2)])
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    """Seeded fixtures and the in-process endpoint profile"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_seed_catalog_is_deterministic(self):
+        from .models import Flat, Tower
+        from .seeding import SeedSpec, seed_catalog
+        spec = SeedSpec(cities=1, projects_per_city=2, towers_per_project=2, floors_per_tower=2, flats_per_floor=3, seed=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            created = seed_catalog(spec, prefix='one')
+        self.assertEqual((created['projects'], created['towers'], created['flats']), (2, 4, 24))
+        project = Project.objects.order_by('pk').first()
+        self.assertEqual(project.flats_count, 12)
+        self.assertEqual(Tower.objects.filter(project=project).first().total_flats, 6)
+        
+        first = list(Flat.objects.order_by('pk').values_list('status', 'price')[:12])
+        with self.captureOnCommitCallbacks(execute=True):
+            seed_catalog(SeedSpec(cities=1, projects_per_city=2, towers_per_project=2, floors_per_tower=2, flats_per_floor=3, seed=7), prefix='two')
+        self.assertEqual(list(Flat.objects.order_by('pk').values_list('status', 'price')[24:36]), first)
+    
+    def test_profile_endpoints(self):
+        from .benchmarks import endpoint_paths, profile_endpoints, sample_ids
+        from .seeding import SeedSpec, seed_catalog
+        with self.captureOnCommitCallbacks(execute=True):
+            seed_catalog(SeedSpec(cities=1, projects_per_city=2, floors_per_tower=2))
+        results = profile_endpoints(endpoint_paths(sample_ids(), ['project-detail', 'tower-list', 'blog-detail']), repeat=2)
+        for name, row in results.items():
+            self.assertEqual(row['status'], 200, name)
+            self.assertGreater(row['queries'], 0, name)
+            self.assertGreater(row['bytes'], 0, name)
+            self.assertIn('p99_ms', row)
+
+
+class SeedScaleCommandTestCase(TestCase):
+    """seed_scale splits the run into per-city chunks with consistent hierarchies"""
+    
+    def test_seed_scale(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Flat, OTP, ProjectEnquiry
+        call_command(
+            'seed_scale', cities=2, projects=5, floors_per_tower=3, leads_per_project=4, client_users=6,
+            size_spread=0, status_weights='sold=1', flat_type_weights='3bhk=1', stdout=StringIO(),
+        )
+        self.assertEqual(City.objects.count(), 2)
+        self.assertEqual(Project.objects.count(), 5)
+        self.assertEqual(Flat.objects.count(), 5 * 2 * 3 * 4)
+        self.assertFalse(Flat.objects.exclude(status='sold', flat_type='3bhk').exists())
+        self.assertFalse(Project.objects.exclude(flats_count=24, sold_flats_count=24).exists())
+        self.assertEqual(ClientUser.objects.values('mobile').distinct().count(), 6)
+        self.assertEqual(OTP.objects.count(), 12)
+        self.assertEqual(ProjectEnquiry.objects.count() + Contact.objects.count(), 20)
+    
+    def test_invalid_weights(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', projects=1, status_weights='gone=1')
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', projects=1, status_weights='sold=0')
+
+
+def budget_dataset():
+    """Fixed dataset for the query budget tests: two of everything, so N+1 queries show"""
+    from .models import (
+        Achievement, BlogPost, Client, Flat, ProjectAmenity, ProjectEnquiry, ProjectImage, Review, SavedSearch,
+        SavedSearchMatch, ShortlistedFlat, ShortlistedProject, Tower, TowerAmenity
+    )
+    for n in (1, 2):
+        city = City.objects.create(id=n, name=f'City {n}')
+        project = Project.objects.create(
+            id=n, title=f'Skyline {n}', property_type='residential', location='Baner', city=city,
+            description='Test', cover_image='projects/cover.jpg', featured=True, trending_score=n,
+        )
+        for m in (1, 2):
+            ProjectImage.objects.create(id=2 * n + m - 2, project=project, image='projects/gallery/a.jpg', order=m)
+            ProjectAmenity.objects.create(id=2 * n + m - 2, project=project, name=f'Pool {m}')
+            tower = Tower.objects.create(id=2 * n + m - 2, project=project, name=chr(64 + m), total_floors=10, per_floor_flats=2)
+            TowerAmenity.objects.create(id=2 * n + m - 2, tower=tower, name=f'Gym {m}')
+            for k in (1, 2):
+                Flat.objects.create(tower=tower, flat_number=f'{tower.name}-{k}01', flat_type='2bhk', floor_number=k, carpet_area='650', price='6500000')
+            BlogPost.objects.create(id=2 * n + m - 2, project=project, title=f'Post {n}{m}', slug=f'post-{2 * n + m - 2}', excerpt='x', content='x')
+            ProjectEnquiry.objects.create(project=project, name='Lead', mobile='9876543210', subject='Price', message='x')
+            Contact.objects.create(id=2 * n + m - 2, project=project, name='Lead', phone='9876543210', subject='Visit', message='x')
+        Client.objects.create(id=n, name=f'Client {n}')
+        Review.objects.create(id=n, customer_name=f'Customer {n}', review_text='Great', featured=True)
+        Achievement.objects.create(id=n, title=f'Award {n}', image='achievements/a.jpg')
+    user = ClientUser.objects.create(id=1, mobile='9876543210', first_name='Asha', is_registered=True)
+    search = SavedSearch.objects.create(id=1, user=user, filters={'city_id': [1]}, term_keys=1)
+    SavedSearchMatch.objects.bulk_create([SavedSearchMatch(search=search, project_id=n) for n in (1, 2)])
+    ShortlistedProject.objects.create(user=user, project_id=1)
+    ShortlistedFlat.objects.create(user=user, flat=Flat.objects.order_by('pk').first())
+    OTP.objects.create(mobile='9876543210', otp_code='123456', expires_at=timezone.now() + timedelta(minutes=5))
+
+
+BUDGET_URL_VALUES = {'pk': 1, 'slug': 'post-1', 'lead_id': 1}
+
+
+class QueryBudgetTestCase(TestCase):
+    """Every API URL stays within the query budget declared on its view"""
+    
+    REQUESTS = {
+        'batch': ('post', {'requests': ['/api/projects/1/', '/api/towers/1/', '/api/flats/?tower=1']}),
+        'project-compare': ('get', {'ids': '1,2'}),
+        'autocomplete': ('get', {'q': 'sky'}),
+        'project-enquiry-create': ('post', {'project': 1, 'name': 'Lead', 'mobile': '9876543210', 'subject': 'Price', 'message': 'x'}),
+        'tower-flat-bulk-import': ('post', [
+            {'flat_number': f'A-9{unit:02d}', 'flat_type': '2bhk', 'floor_number': 9, 'carpet_area': '650.00'} for unit in range(1, 5)
+        ]),
+        'tower-generate-flats': ('post', FloorPlanGeneratorTestCase.TEMPLATE),
+        'flat-status-transition': ('post', {'to': 'reserved', 'flats': [1, 2, 3]}),
+        'send_otp': ('post', {'mobile': '9876543210'}),
+        # Login of the fixture's registered user, and a profile update
+        'verify_otp': ('post', {'mobile': '9876543210', 'otp_code': '123456'}, 200),
+        'complete_registration': ('post', {'mobile': '9876543210', 'first_name': 'Asha', 'last_name': 'Patil'}, 201),
+        # The fixture client's own saved search, matches and shortlist
+        'savedsearch-list': ('get', None, 200),
+        'savedsearch-detail': ('get', None, 200),
+        'savedsearch-matches': ('get', None, 200),
+        'savedsearch-read-matches': ('post', {}, 200),
+        'shortlist': ('post', {'projects': [1, 2], 'flats': [1, 2]}, 201),
+        'shortlist-project-remove': ('delete', None, 204),
+        'shortlist-flat-remove': ('delete', None, 204),
+    }
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        budget_dataset()
+    
+    def budget_client(self, view):
+        from .authentication import client_access_token
+        from .resources import ClientResourceMixin
+        if not issubclass(getattr(view, 'cls', object), ClientResourceMixin):
+            return admin_client()
+        # The fixture's ClientUser, for the client's own data
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {client_access_token(ClientUser.objects.get(pk=1))}')
+        return client
+
+
+budget_tests(QueryBudgetTestCase, urls, '/api/', BUDGET_URL_VALUES, QueryBudgetTestCase.REQUESTS)
+
+
+@override_settings(SQL_STATS_ENABLED=True)
+class SQLStatsTestCase(TestCase):
+    """SQL fingerprints, per-view statistics and the slow-query log"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from . import sql_stats
+        cache.clear()
+        sql_stats.reset()
+    
+    def test_fingerprint_normalizes_literals(self):
+        from .sql_stats import fingerprint
+        a = fingerprint('SELECT * FROM "api_flat" WHERE "id" IN (%s, %s, %s) AND "status" = \'sold\' LIMIT 21')
+        b = fingerprint('SELECT *  FROM "api_flat" WHERE "id" IN (%s) AND "status" = \'available\' LIMIT 5')
+        self.assertEqual(a, b)
+        self.assertEqual(a[1], 'SELECT * FROM "api_flat" WHERE "id" IN (...) AND "status" = ? LIMIT ?')
+        self.assertEqual(fingerprint('SAVEPOINT "s1_x1"'), fingerprint('SAVEPOINT "s2_x9"'))
+    
+    def test_report_per_view_and_slow_log(self):
+        from . import sql_stats
+        City.objects.create(name='Pune')
+        for _ in range(3):
+            self.client.get('/api/cities/')
+        report = sql_stats.report(view='GET /api/cities/')
+        self.assertEqual(report['views'][0]['view'], 'GET /api/cities/')
+        self.assertEqual(report['views'][0]['count'], 3)
+        city_query = next(row for row in report['fingerprints'] if '"api_city"' in row['sql'])
+        self.assertEqual((city_query['views'][0]['view'], city_query['views'][0]['count']), ('GET /api/cities/', 3))
+        
+        with override_settings(SQL_SLOW_QUERY_MS=0), self.assertLogs('api.sql_stats', 'WARNING') as logs:
+            self.client.get('/api/cities/')
+        self.assertIn('Plan:', logs.output[0])
+        self.assertEqual(sql_stats.report(sort='slow')['fingerprints'][0]['slow'], 1)
+    
+    async def test_async_views_are_recorded(self):
+        from asgiref.sync import iscoroutinefunction, sync_to_async
+        from django.test import AsyncClient
+        from . import sql_stats
+        from .async_views import city_list
+        from .middleware import SQLStatsMiddleware
+        self.assertTrue(iscoroutinefunction(SQLStatsMiddleware(city_list)))
+        await City.objects.acreate(name='Pune')
+        response = await AsyncClient().get('/api/async/cities/')
+        self.assertEqual(response.json()[0]['name'], 'Pune')
+        report = await sync_to_async(sql_stats.report)(view='GET /api/async/cities/')
+        city_query = next(row for row in report['fingerprints'] if '"api_city"' in row['sql'])
+        self.assertEqual(city_query['views'][0]['view'], 'GET /api/async/cities/')
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    """?_profile= runs staff requests under the profiler"""
+    
+    def setUp(self):
+        City.objects.create(name='Pune')
+    
+    def test_ignored_without_staff(self):
+        response = self.client.get('/api/cities/', {'_profile': 'report'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(response.json()[0]['name'], 'Pune')
+    
+    def test_report_and_stored_profile(self):
+        import pstats
+        import tempfile
+        client = admin_client()
+        with override_settings(PROFILER='cprofile'):
+            report = client.get('/api/cities/', {'_profile': 'report'}).json()
+        self.assertEqual(report['status'], 200)
+        self.assertTrue(any('"api_city"' in query['sql'] for query in report['queries']))
+        self.assertTrue(any('views.py' in row['function'] for row in report['functions']))
+        
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILER='cprofile', PROFILE_DIR=directory):
+            response = client.get('/api/cities/', HTTP_X_PROFILE='1')
+            self.assertEqual(response.json()[0]['name'], 'Pune')
+            files = sorted(os.listdir(directory))
+            self.assertEqual([name.rsplit('.', 1)[1] for name in files], ['json', 'prof'])
+            self.assertTrue(files[0].startswith(response['X-Profile-Id']))
+            pstats.Stats(os.path.join(directory, files[1]))
+    
+    async def test_async_views(self):
+        from asgiref.sync import iscoroutinefunction, sync_to_async
+        from django.test import AsyncClient
+        from .async_views import city_list
+        from .middleware import ProfilingMiddleware
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(city_list)))
+        response = await AsyncClient().get('/api/async/cities/', {'_profile': 'report'})
+        self.assertNotIn('X-Profile-Id', response)
+        
+        client = await sync_to_async(admin_client)()
+        headers = {'Authorization': client._credentials['HTTP_AUTHORIZATION']}
+        report = (await AsyncClient().get('/api/async/cities/', {'_profile': 'report'}, headers=headers)).json()
+        self.assertEqual(report['status'], 200)
+        self.assertTrue(any('"api_city"' in query['sql'] for query in report['queries']))
+
+
+class ResourceViewSetTestCase(TestCase):
+    """Routed resources: one authentication per request, staff-only writes, opt-in pagination"""
+    
+    def setUp(self):
+        for index in range(3):
+            City.objects.create(name=f'City {index}', is_active=index != 2)
+    
+    def test_writes_authenticate_once(self):
+        from .query_budget import QueryRecorder
+        city = City.objects.first()
+        self.assertEqual(APIClient().patch(f'/api/cities/{city.pk}/', {'state': 'MH'}, format='json').json(), {'error': 'Permission denied'})
+        
+        client = admin_client()
+        with QueryRecorder() as recorded:
+            response = client.patch(f'/api/cities/{city.pk}/', {'state': 'MH'}, format='json')
+        self.assertEqual(response.data['state'], 'MH')
+        self.assertEqual(sum('"auth_user"' in sql for sql, site in recorded.queries), 1)
+        # A stale token is ignored on public reads
+        stale = APIClient()
+        stale.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(len(stale.get('/api/cities/').json()), 2)
+    
+    def test_pagination_and_public_rows(self):
+        self.assertEqual(len(self.client.get('/api/cities/').json()), 2)
+        self.assertEqual(len(admin_client().get('/api/cities/').json()), 3)
+        page = self.client.get('/api/cities/', {'page': 2, 'page_size': 1}).json()
+        self.assertEqual((page['count'], [city['name'] for city in page['results']]), (2, ['City 1']))
+        self.assertEqual(self.client.get('/api/cities/', {'page': 9}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FilterSetTestCase(TestCase):
+    """Declarative list filters: coercion, __in values and the ordering whitelist"""
+    
+    def test_generated_sql(self):
+        from .exceptions import ValidationError
+        from .filters import FlatFilterSet, ProjectFilterSet
+        from .models import Flat
+        sql = str(FlatFilterSet({'tower': '1', 'status__in': 'sold,hold', 'floor': '3', 'ordering': '-price,flat_number'}).filter(Flat.objects.all()).query)
+        self.assertIn('"api_flat"."status" IN (sold, hold)', sql)
+        self.assertIn('"api_flat"."floor_number" = 3', sql)
+        self.assertTrue(sql.endswith('ORDER BY "api_flat"."price" DESC, "api_flat"."flat_number" ASC'))
+        
+        for params in ({'ordering': 'towers__flats__price'}, {'ordering': 'distance_km'}, {'flat_type': 'castle'}, {'city_id__in': '1,x'}):
+            with self.assertRaises(ValidationError):
+                ProjectFilterSet(params).filter(Project.objects.all())
+        # Floor/flat number order works with or without a tower filter
+        for params in ({'ordering': 'flat_number'}, {'ordering': '-floor_number'}, {'tower__in': '1,2', 'ordering': 'flat_number'}):
+            self.assertIn('ORDER BY "api_flat"', str(FlatFilterSet(params).filter(Flat.objects.all()).query))
+        self.assertTrue(str(ProjectFilterSet({'ordering': '-views,title'}).filter(Project.objects.all()).query).endswith(
+            'ORDER BY "api_project"."views" DESC, "api_project"."title" ASC'
+        ))
+        # Malformed ranges are ignored, as before
+        self.assertNotIn('WHERE', str(ProjectFilterSet({'budget': 'abc'}).filter(Project.objects.all()).query))
+    
+    def test_invalid_parameters_are_400(self):
+        response = self.client.get('/api/projects/', {'ordering': 'towers__flats__price'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('created_at', response.data['detail'])
+        self.assertEqual(self.client.get('/api/flats/', {'floor': 'first'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/flats/', {'status__in': 'available,sold', 'ordering': '-price'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/flats/', {'ordering': 'flat_number'}).status_code, status.HTTP_200_OK)
+        for ordering in ('views', '-views', 'title'):
+            self.assertEqual(self.client.get('/api/blog/', {'ordering': ordering}).status_code, status.HTTP_200_OK, ordering)
+
+
+class SavedSearchTestCase(TestCase):
+    """Client saved searches and their incrementally matched alerts"""
+    
+    def setUp(self):
+        self.client, self.user = client_user_client()
+    
+    def test_filters_are_normalized_and_indexed(self):
+        from .models import SavedSearch
+        response = self.client.post('/api/saved-searches/', {
+            'name': 'Pune 2-3 BHK', 'filters': {'flat_type': '3bhk,2bhk', 'city_id': [1], 'max_price': '9000000.00'},
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['filters'], {'city_id': [1], 'flat_type': ['2bhk', '3bhk'], 'max_price': '9000000.00'})
+        search = SavedSearch.objects.get()
+        self.assertEqual(search.term_keys, 2)
+        self.assertEqual(sorted(search.terms.values_list('key', 'value')), [('city_id', '1'), ('flat_type', '2bhk'), ('flat_type', '3bhk')])
+        
+        invalid = self.client.post('/api/saved-searches/', {'filters': {'flat_type': 'castle'}}, format='json')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        # Staff tokens are not client tokens, and client tokens are not staff tokens
+        self.assertEqual(admin_client().get('/api/saved-searches/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.post('/api/cities/', {'name': 'Nashik'}).status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_new_and_available_flats_queue_matches(self):
+        from .models import Flat, SavedSearchMatch, Tower
+        pune, mumbai = City.objects.create(name='Pune'), City.objects.create(name='Mumbai')
+        project = Project.objects.create(title='Skyline', property_type='residential', location='Baner', city=pune, description='x', cover_image='p.jpg')
+        tower = Tower.objects.create(project=project, name='A')
+        for filters in ({'city_id': [pune.id], 'flat_type': ['2bhk'], 'max_price': 7000000}, {'city_id': [mumbai.id]}):
+            self.client.post('/api/saved-searches/', {'filters': filters}, format='json')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            flat = Flat.objects.create(tower=tower, flat_number='A-101', flat_type='2bhk', floor_number=1, carpet_area='650', price='6500000')
+            Flat.objects.create(tower=tower, flat_number='A-102', flat_type='3bhk', floor_number=1, carpet_area='900', price='6500000')
+            Flat.objects.create(tower=tower, flat_number='A-103', flat_type='2bhk', floor_number=1, carpet_area='650', price='9500000')
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('flat_id', flat=True)), [flat.id])
+        
+        # Sold and back on sale is not announced twice; the status shown is live
+        with self.captureOnCommitCallbacks(execute=True):
+            flat.status = 'sold'
+            flat.save()
+            flat.status = 'available'
+            flat.save()
+        response = self.client.get('/api/saved-searches/matches/', {'unread': 'true'})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['flat']['status'], 'available')
+        self.assertEqual(self.client.post('/api/saved-searches/matches/read/', {}, format='json').data, {'read': 1})
+        self.assertEqual(self.client.get('/api/saved-searches/matches/', {'unread': 'true'}).data, [])
+
+
+class ShortlistTestCase(TestCase):
+    """Client shortlists: idempotent adds and one joined query per kind"""
+    
+    def setUp(self):
+        budget_dataset()
+        self.client, self.user = client_user_client(mobile='9000000001')
+    
+    def test_add_list_and_remove(self):
+        from .models import Flat
+        flats = list(Flat.objects.values_list('id', flat=True)[:2])
+        response = self.client.post('/api/shortlist/', {'projects': [2, 1], 'flats': flats}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['added'], {'projects': 2, 'flats': 2})
+        # Syncing the same list again adds nothing
+        again = self.client.post('/api/shortlist/', {'projects': [1], 'flats': flats}, format='json')
+        self.assertEqual((again.status_code, again.data['added']), (status.HTTP_200_OK, {'projects': 0, 'flats': 0}))
+        self.assertEqual(self.client.post('/api/shortlist/', {'projects': [99]}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.assertEqual(self.client.delete('/api/shortlist/projects/1/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete('/api/shortlist/projects/1/').status_code, status.HTTP_404_NOT_FOUND)
+        # One unknown id rejects the whole request
+        self.assertEqual(self.client.post('/api/shortlist/', {'projects': [1], 'flats': [9999]}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['id'] for item in self.client.get('/api/shortlist/').data['projects']], [2])
+        self.assertEqual(APIClient().get('/api/shortlist/').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_listing_is_one_query_per_kind_with_live_status(self):
+        from .models import Flat
+        flats = list(Flat.objects.values_list('id', flat=True))
+        self.client.post('/api/shortlist/', {'projects': [1, 2], 'flats': flats}, format='json')
+        Flat.objects.filter(pk=flats[0]).update(status='sold')
+        # Client token lookup + projects + flats, however long the shortlist
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/shortlist/')
+        self.assertEqual(len(response.data['flats']), len(flats))
+        self.assertEqual({item['id']: item['status'] for item in response.data['flats']}[flats[0]], 'sold')
+        self.assertTrue(response.data['flats'][0]['project']['title'].startswith('Skyline'))
+
+
+class TrendingTestCase(TestCase):
+    """Hourly view buckets, decayed trending scores and the trending list"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.projects = [
+            Project.objects.create(title=f'Project {n}', property_type='residential', location='Baner', description='Test', cover_image='projects/cover.jpg')
+            for n in range(3)
+        ]
+    
+    def test_buckets_decay_and_prune(self):
+        from datetime import timedelta
+        from . import trending
+        from .models import ProjectViewBucket
+        old, recent, stale = self.projects
+        for _ in range(2):
+            trending.record_view(recent.pk)
+        bucket = ProjectViewBucket.objects.get()
+        self.assertEqual((bucket.project_id, bucket.hour, bucket.views), (recent.pk, trending.current_hour(), 2))
+        # Four views a day ago weigh as much as two now; a week ago is outside the window
+        hour = trending.current_hour()
+        ProjectViewBucket.objects.create(project=old, hour=hour - timedelta(hours=trending.HALF_LIFE_HOURS), views=4)
+        ProjectViewBucket.objects.create(project=stale, hour=hour - timedelta(hours=trending.WINDOW_HOURS), views=100)
+        Project.objects.filter(pk=stale.pk).update(trending_score=5)
+        self.assertEqual(trending.decayed_scores(), {recent.pk: 2.0, old.pk: 2.0})
+        
+        self.assertEqual(trending.refresh(), 2)
+        self.assertEqual(dict(Project.objects.values_list('id', 'trending_score')), {old.pk: 2.0, recent.pk: 2.0, stale.pk: 0})
+        self.assertEqual(trending.prune(), 1)
+    
+    def test_trending_endpoint_reads_stored_scores(self):
+        from . import trending
+        first, second, unseen = self.projects
+        for project, views in ((first, 1), (second, 3)):
+            for _ in range(views):
+                self.client.get(f'/api/projects/{project.pk}/')
+        response = self.client.get('/api/projects/trending/')
+        self.assertEqual([item['id'] for item in response.data], [second.pk, first.pk])
+        
+        # Stored scores are served as they are until refresh_trending runs
+        for _ in range(3):
+            self.client.get(f'/api/projects/{first.pk}/bundle/')
+        self.assertEqual([item['id'] for item in self.client.get('/api/projects/trending/', {'limit': 1}).data], [second.pk])
+        self.assertFalse(trending.refresh_if_unscored())
+        trending.refresh()
+        self.assertEqual([item['id'] for item in self.client.get('/api/projects/', {'ordering': 'trending'}).data], [first.pk, second.pk, unseen.pk])
@@ -0,0 +1,91 @@
+"""
+Trending projects from hourly view counters
+
+Project page views (the detail, bundle, batch and async detail endpoints)
+are counted per project per hour in ProjectViewBucket. refresh() turns the
+buckets in the last WINDOW_HOURS into a decayed score, where a view loses
+half its weight every HALF_LIFE_HOURS, and stores it in the indexed
+Project.trending_score, so /api/projects/trending/ and ?ordering=trending
+read the top of an index instead of aggregating views per request.
+
+Requests only read the stored score; it is refreshed from cron:
+
+    python manage.py refresh_trending
+
+until that has first run, the trending list computes the scores itself.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Project, ProjectViewBucket
+
+WINDOW_HOURS = 7 * 24
+HALF_LIFE_HOURS = 24
+MAX_RESULTS = 50
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_view(project_id):
+    """Count a page view in the current hour's bucket"""
+    record_views([project_id])
+
+
+def record_views(project_ids):
+    """Count one page view for each of the (existing) projects"""
+    project_ids = list(dict.fromkeys(project_ids))
+    if not project_ids:
+        return
+    # One upsert for all of them (SQLite 3.24+ and PostgreSQL); the ORM would
+    # need an UPDATE, then a savepoint-guarded INSERT for the hour's first view
+    table = ProjectViewBucket._meta.db_table
+    hour = ProjectViewBucket._meta.get_field('hour').get_db_prep_value(current_hour(), connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (project_id, hour, views) VALUES {", ".join(["(%s, %s, 1)"] * len(project_ids))} '
+            f'ON CONFLICT (project_id, hour) DO UPDATE SET views = {table}.views + 1',
+            [value for project_id in project_ids for value in (project_id, hour)],
+        )
+
+
+def decayed_scores(now=None):
+    """{project_id: score} over the window, newest views weighing most"""
+    hour = current_hour(now)
+    scores = defaultdict(float)
+    rows = ProjectViewBucket.objects.filter(hour__gt=hour - timedelta(hours=WINDOW_HOURS)).values_list('project_id', 'hour', 'views')
+    for project_id, bucket_hour, views in rows:
+        age = (hour - bucket_hour).total_seconds() / 3600
+        scores[project_id] += views * 0.5 ** (age / HALF_LIFE_HOURS)
+    return scores
+
+
+def refresh(now=None, batch_size=500):
+    """Store the current scores on Project.trending_score; returns how many projects score"""
+    scores = decayed_scores(now)
+    Project.objects.filter(trending_score__gt=0).exclude(pk__in=list(scores)).update(trending_score=0)
+    Project.objects.bulk_update(
+        [Project(pk=pk, trending_score=round(score, 4)) for pk, score in scores.items()],
+        ['trending_score'], batch_size=batch_size,
+    )
+    return len(scores)
+
+
+def refresh_if_unscored():
+    """Compute the first scores when views are recorded but none are stored; returns whether it did"""
+    if Project.objects.filter(trending_score__gt=0).exists():
+        return False
+    if not ProjectViewBucket.objects.filter(hour__gt=current_hour() - timedelta(hours=WINDOW_HOURS)).exists():
+        return False
+    refresh()
+    return True
+
+
+def prune(now=None):
+    """Delete buckets that left the window; returns how many"""
+    deleted, per_model = ProjectViewBucket.objects.filter(hour__lte=current_hour(now) - timedelta(hours=WINDOW_HOURS)).delete()
+    return deleted
@@ -1,29 +1,17 @@
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import SimpleRouter
+from . import async_views
 from .views import (
+    # Resources
+    ProjectViewSet, ClientViewSet, ReviewViewSet, BlogPostViewSet, ContactViewSet, AchievementViewSet,
+    CityViewSet, TowerViewSet, ProjectImageViewSet, ProjectAmenityViewSet, TowerAmenityViewSet, FlatViewSet,
+    SavedSearchViewSet, ShortlistView, ShortlistItemView,
     # Projects
-    ProjectListCreateView, ProjectDetailView,
-    # Clients
-    ClientListCreateView, ClientDetailView,
-    # Reviews
-    ReviewListCreateView, ReviewDetailView, review_featured,
-    # Blog Posts
-    BlogPostListCreateView, BlogPostDetailView,
-    # Contact
-    ContactListCreateView, ContactDetailView,
-    # Achievements
-    AchievementListCreateView, AchievementDetailView,
-    # Cities
-    CityListCreateView, CityDetailView,
+    ProjectBundleView, ProjectCompareView, ProjectFlatFacetsView, AutocompleteView, BatchView,
     # Towers
-    TowerListCreateView, TowerDetailView,
-    # Project Images
-    ProjectImageListCreateView, ProjectImageDetailView,
-    # Project Amenities
-    ProjectAmenityListCreateView, ProjectAmenityDetailView,
-    # Tower Amenities
-    TowerAmenityListCreateView, TowerAmenityDetailView,
+    TowerInventoryView, TowerFlatBulkImportView, TowerGenerateFlatsView,
     # Flats
-    FlatListCreateView, FlatDetailView, ProjectEnquiryCreateAPIView,
+    FlatStatusTransitionView, ProjectEnquiryCreateAPIView,
     # Authentication
     send_otp, verify_otp, complete_registration
 )
@@ -33,64 +21,63 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+# CRUD resources: <prefix>/ (name <basename>-list) and <prefix>/<pk>/ (<basename>-detail)
+router = SimpleRouter()
+router.register('projects', ProjectViewSet, basename='project')
+router.register('clients', ClientViewSet, basename='client')
+router.register('reviews', ReviewViewSet, basename='review')
+router.register('blog', BlogPostViewSet, basename='blog')
+router.register('contact', ContactViewSet, basename='contact')
+router.register('achievements', AchievementViewSet, basename='achievement')
+router.register('cities', CityViewSet, basename='city')
+router.register('towers', TowerViewSet, basename='tower')
+router.register('project-images', ProjectImageViewSet, basename='projectimage')
+router.register('project-amenities', ProjectAmenityViewSet, basename='projectamenity')
+router.register('tower-amenities', TowerAmenityViewSet, basename='toweramenity')
+router.register('flats', FlatViewSet, basename='flat')
+# Client (OTP login) resources
+router.register('saved-searches', SavedSearchViewSet, basename='savedsearch')
+
 urlpatterns = [
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema')),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema')),
     # Projects
-    path('projects/', ProjectListCreateView.as_view(), name='project-list-create'),
-    path('projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
+    path('projects/compare/', ProjectCompareView.as_view(), name='project-compare'),
+    path('projects/<int:pk>/bundle/', ProjectBundleView.as_view(), name='project-bundle'),
+    path('projects/<int:pk>/flat-facets/', ProjectFlatFacetsView.as_view(), name='project-flat-facets'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('batch/', BatchView.as_view(), name='batch'),
+    
+    # Async (ASGI-native) read paths, same payloads as the sync views
+    path('async/projects/', async_views.project_list, name='async-project-list'),
+    path('async/projects/<int:pk>/', async_views.project_detail, name='async-project-detail'),
+    path('async/cities/', async_views.city_list, name='async-city-list'),
+    path('async/reviews/featured/', async_views.featured_reviews, name='async-review-featured'),
+    path('async/blog/', async_views.blog_list, name='async-blog-list'),
+    path('async/blog/<str:slug>/', async_views.blog_detail, name='async-blog-detail'),
     
     # Project Enquiry
     path('project-enquiry/', ProjectEnquiryCreateAPIView.as_view(), name='project-enquiry-create'),
     
-    # Clients
-    path('clients/', ClientListCreateView.as_view(), name='client-list-create'),
-    path('clients/<int:pk>/', ClientDetailView.as_view(), name='client-detail'),
-    
-    # Reviews
-    path('reviews/', ReviewListCreateView.as_view(), name='review-list-create'),
-    path('reviews/<int:pk>/', ReviewDetailView.as_view(), name='review-detail'),
-    path('reviews/featured/', review_featured, name='review-featured'),
-    
-    # Blog Posts
-    path('blog/', BlogPostListCreateView.as_view(), name='blog-list-create'),
-    path('blog/<str:slug>/', BlogPostDetailView.as_view(), name='blog-detail'),
-    
-    # Contact
-    path('contact/', ContactListCreateView.as_view(), name='contact-list-create'),
-    path('contact/<int:pk>/', ContactDetailView.as_view(), name='contact-detail'),
-    
-    # Achievements
-    path('achievements/', AchievementListCreateView.as_view(), name='achievement-list-create'),
-    path('achievements/<int:pk>/', AchievementDetailView.as_view(), name='achievement-detail'),
-    
-    # Cities
-    path('cities/', CityListCreateView.as_view(), name='city-list-create'),
-    path('cities/<int:pk>/', CityDetailView.as_view(), name='city-detail'),
-    
     # Towers
-    path('towers/', TowerListCreateView.as_view(), name='tower-list-create'),
-    path('towers/<int:pk>/', TowerDetailView.as_view(), name='tower-detail'),
-    
-    # Project Images
-    path('project-images/', ProjectImageListCreateView.as_view(), name='projectimage-list-create'),
-    path('project-images/<int:pk>/', ProjectImageDetailView.as_view(), name='projectimage-detail'),
-    
-    # Project Amenities
-    path('project-amenities/', ProjectAmenityListCreateView.as_view(), name='projectamenity-list-create'),
-    path('project-amenities/<int:pk>/', ProjectAmenityDetailView.as_view(), name='projectamenity-detail'),
-    
-    # Tower Amenities
-    path('tower-amenities/', TowerAmenityListCreateView.as_view(), name='toweramenity-list-create'),
-    path('tower-amenities/<int:pk>/', TowerAmenityDetailView.as_view(), name='toweramenity-detail'),
+    path('towers/<int:pk>/inventory/', TowerInventoryView.as_view(), name='tower-inventory'),
+    path('towers/<int:pk>/flats/bulk/', TowerFlatBulkImportView.as_view(), name='tower-flat-bulk-import'),
+    path('towers/<int:pk>/generate-flats/', TowerGenerateFlatsView.as_view(), name='tower-generate-flats'),
     
     # Flats
-    path('flats/', FlatListCreateView.as_view(), name='flat-list-create'),
-    path('flats/<int:pk>/', FlatDetailView.as_view(), name='flat-detail'),
+    path('flats/status/', FlatStatusTransitionView.as_view(), name='flat-status-transition'),
+    
+    # Client shortlist
+    path('shortlist/', ShortlistView.as_view(), name='shortlist'),
+    path('shortlist/projects/<int:pk>/', ShortlistItemView.as_view(kind='projects'), name='shortlist-project-remove'),
+    path('shortlist/flats/<int:pk>/', ShortlistItemView.as_view(kind='flats'), name='shortlist-flat-remove'),
     
     # User Authentication (OTP based)
     path('auth/send-otp/', send_otp, name='send_otp'),
     path('auth/verify-otp/', verify_otp, name='verify_otp'),
     path('auth/complete-registration/', complete_registration, name='complete_registration'),
+    
+    # Resources (after the fixed paths above, e.g. projects/compare/)
+    path('', include(router.urls)),
 ]
@@ -1,35 +1,59 @@
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser, BasePermission
+from rest_framework.permissions import AllowAny, BasePermission
 from django.http import Http404
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.db.models import Q, Count
+from django.db.models import F
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import timedelta
 import random
 import traceback
 from .models import (
     City, Project, Client, Review, BlogPost,
     Contact, Achievement,
-    Tower, Flat, ClientUser, OTP, ProjectImage, ProjectAmenity, TowerAmenity
+    Tower, Flat, ClientUser, OTP, ProjectImage, ProjectAmenity, TowerAmenity, ProjectEnquiry,
+    SavedSearch, SavedSearchMatch
 )
 from .serializers import (
     CitySerializer, ProjectSerializer, ClientSerializer,
     ReviewSerializer, BlogPostSerializer,
     ContactSerializer, AchievementSerializer,
-    TowerSerializer, FlatSerializer, ClientUserSerializer, OTPSerializer, 
-    ProjectImageSerializer, ProjectAmenitySerializer, TowerAmenitySerializer , ProjectEnquirySerializer
+    TowerSerializer, FlatSerializer, ClientUserSerializer,
+    ProjectImageSerializer, ProjectAmenitySerializer, TowerAmenitySerializer , ProjectEnquirySerializer,
+    CompiledProjectSerializer, CompiledTowerSerializer, CompiledFlatSerializer, FloorPlanTemplateSerializer,
+    FlatStatusTransitionSerializer, CompiledBlogPostSerializer, CompiledCitySerializer, CompiledReviewSerializer,
+    CompiledProjectImageSerializer, CompiledProjectAmenitySerializer, CompiledTowerAmenitySerializer,
+    SavedSearchSerializer, SavedSearchMatchSerializer, ShortlistedFlatSerializer, ShortlistedProjectSerializer
 )
+from .floorplans import FloorPlanError, generate_flats
 from rest_framework.decorators import authentication_classes
+from django.core.cache import cache
+from .cache import CACHE_TIMEOUT, project_cache_key
+from .inventory import flat_facets, select_facets, bulk_import_flats, transition_flat_statuses
+from .parsers import FastJSONParser, CSVParser, read_csv_rows
+from .geo import haversine_km, parse_point
+from .filters import (
+    BlogPostFilterSet, FlatFilterSet, ProjectChildFilterSet, ProjectFilterSet, TowerAmenityFilterSet, TowerFilterSet
+)
+from . import autocomplete
+from .batch import MAX_BATCH_SIZE, run_batch
+from .exceptions import ValidationError
+from .compare import MAX_COMPARE, MIN_COMPARE, compare_projects
+from .query_budget import query_budget
+from .authentication import StaffJWTAuthentication, client_access_token
+from .resources import ClientResourceView, ClientResourceViewSet, IsAdmin, ResourceView, ResourceViewSet, parse_id_list, parse_ids
+from . import saved_searches, shortlist, trending
+from django.db import transaction
+from rest_framework.parsers import MultiPartParser
+import time
 
 
 
 
 # Authentication Views
+@query_budget(post=3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def send_otp(request):
@@ -118,6 +142,7 @@ def send_otp(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(post=5)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_otp(request):
@@ -165,7 +190,7 @@ def verify_otp(request):
             user.save()
             
             serializer = ClientUserSerializer(user)
-            access_token = AccessToken.for_user(user)
+            access_token = client_access_token(user)
             
             return Response({
                 'message': 'Login successful',
@@ -199,6 +224,7 @@ def verify_otp(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(post=3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def complete_registration(request):
@@ -233,7 +259,7 @@ def complete_registration(request):
         user.save()
         
         serializer = ClientUserSerializer(user)
-        access_token = AccessToken.for_user(user)
+        access_token = client_access_token(user)
         
         return Response({
             'message': 'Registration successful',
@@ -254,21 +280,22 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
+@query_budget(post=3)
 class ProjectEnquiryCreateAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
-
+    
     def post(self, request):
         # 1️⃣ Bind request data to serializer
         serializer = ProjectEnquirySerializer(data=request.data)
-
+        
         # 2️⃣ Validate data
         if not serializer.is_valid():
             return Response(
                 serializer.errors,
                 status=status.HTTP_400_BAD_REQUEST
             )
-
+        
         # 3️⃣ Get mobile from validated data
         mobile = serializer.validated_data.get('mobile')
         # 4️⃣ Find user by mobile
@@ -278,9 +305,9 @@ class ProjectEnquiryCreateAPIView(APIView):
                 {'error': 'User not found, please register first'},
                 status=status.HTTP_404_NOT_FOUND
             )
-
+        
         enquiry = serializer.save(user=user)
-
+        
         # 7️⃣ Success response
         return Response(
             {
@@ -297,7 +324,11 @@ class IsCustomAuthenticated(BasePermission):
     Validates JWT token and attaches user to request.
     """
     def has_permission(self, request, view):
-        jwt_auth = JWTAuthentication()
+        # Already authenticated by the view's authentication classes
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return True
+        jwt_auth = StaffJWTAuthentication()
         try:
             auth_result = jwt_auth.authenticate(request)
             if auth_result:
@@ -331,963 +362,530 @@ class IsCustomAdminUser(IsCustomAuthenticated):
         return False
 
 
-class ProjectListCreateView(APIView):
+@query_budget(list=6, retrieve=9, trending=6)
+class ProjectViewSet(ResourceViewSet):
     """
-    List all projects or create a new project.
-    GET: List projects with filtering
-    POST: Create new project (Admin only)
+    Projects.
+    GET list: filtering, price/area ranges and ?near= distance search
+    GET detail: increments views
+    GET trending/: projects by decayed recent views
+    POST/PUT/PATCH/DELETE: Admin only
     """
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    
-    def get_queryset(self):
-        queryset = Project.objects.all()
-        property_type = self.request.query_params.get('property_type', None)
-        transaction_type = self.request.query_params.get('transaction_type', None)
-        featured = self.request.query_params.get('featured', None)
-        is_hot = self.request.query_params.get('is_hot', None)
-        city = self.request.query_params.get('city', None)
-        city_id = self.request.query_params.get('city_id', None)
-        project_status = self.request.query_params.get('project_status', None)
-        flat_type = self.request.query_params.get('flat_type', None)
-        search_query = self.request.query_params.get('search', None)
-        limit = self.request.query_params.get('limit', None)
-        
-        if property_type:
-            queryset = queryset.filter(property_type=property_type)
-        if transaction_type:
-            queryset = queryset.filter(transaction_type=transaction_type)
-        if featured is not None:
-            queryset = queryset.filter(featured=featured.lower() == 'true')
-        if is_hot is not None:
-            queryset = queryset.filter(is_hot=is_hot.lower() == 'true')
-        if city_id:
-            queryset = queryset.filter(city_id=city_id)
-        elif city:
-            queryset = queryset.filter(
-                Q(city__name__icontains=city) | Q(city_name__icontains=city)
-            )
-        if project_status:
-            queryset = queryset.filter(project_status=project_status)
-        if flat_type:
-            queryset = queryset.filter(
-                Q(available_flat_types__icontains=flat_type) |
-                Q(towers__flats__flat_type=flat_type)
-            ).distinct()
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(location__icontains=search_query) |
-                Q(city__name__icontains=search_query) |
-                Q(city_name__icontains=search_query)
-            )
-        
-        # Ordering
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering:
-            queryset = queryset.order_by(ordering)
-        else:
-            queryset = queryset.order_by('-created_at')
-        
-        if limit:
-            try:
-                queryset = queryset[:int(limit)]
-            except ValueError:
-                pass
-        
-        return queryset
-    
-    def get(self, request):
-        queryset = self.get_queryset()
-        serializer = ProjectSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+    queryset = Project.objects.all()
+    serializer_class = ProjectSerializer
+    # Read-only fast path: whole project tree from .values() rows
+    compiled_serializer_class = CompiledProjectSerializer
+    filterset_class = ProjectFilterSet
+    limit_param = 'limit'
+    select_related = ('city',)
+    prefetch_related = ('images', 'amenities', 'towers__flats', 'towers__amenities')
+    
+    def finish_list(self, data):
+        """Request-order for ?ids= and distances for ?near= (shared with the async view)"""
+        data = super().finish_list(data)
+        near = parse_point(self.request.query_params.get('near'))
+        if near:
+            for project in data:
+                project['distance_km'] = round(haversine_km(near[0], near[1], float(project['latitude']), float(project['longitude'])), 2)
+        return data
+    
+    def retrieve(self, request, *args, **kwargs):
+        project = self.get_object()
+        project.views += 1
+        project.save(update_fields=['views'])
+        trending.record_view(project.pk)
+        return Response(self.get_serializer(project).data)
     
-    def post(self, request):
-        # Check admin permission
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        
-        serializer = ProjectSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class ProjectDetailView(APIView):
+    @action(detail=False)
+    def trending(self, request):
+        """Projects by decayed recent views (?limit=, default 10)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), trending.MAX_RESULTS)
+        except ValueError:
+            raise ValidationError('limit must be an integer')
+        queryset = Project.objects.filter(trending_score__gt=0).order_by('-trending_score', '-id')[:limit]
+        serializer = CompiledProjectSerializer(context=self.get_serializer_context())
+        data = serializer.serialize(queryset)
+        # Scores come from cron (refresh_trending); only the very first ones are computed here
+        if not data and trending.refresh_if_unscored():
+            data = serializer.serialize(queryset.all())
+        return Response(data)
+
+
+@query_budget(get=11)
+class ProjectBundleView(APIView):
     """
-    Retrieve, update or delete a project instance.
-    GET: Retrieve project (increments views)
-    PUT: Update project (Admin only)
-    PATCH: Partial update project (Admin only)
-    DELETE: Delete project (Admin only)
+    Everything a project page needs in one response.
+    GET: Project with images, amenities, towers (with flats and amenities),
+    published blog posts and enquiry/contact counts. Cached as one unit and
+    invalidated whenever the project or any of its children changes.
     """
     permission_classes = [AllowAny]
     authentication_classes = []
     
-    def get_object(self, pk):
-        try:
-            return Project.objects.get(pk=pk)
-        except Project.DoesNotExist:
-            raise Http404
-    
     def get(self, request, pk):
-        project = self.get_object(pk)
-        project.views += 1
-        project.save(update_fields=['views'])
-        serializer = ProjectSerializer(project, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        
-        project = self.get_object(pk)
-        serializer = ProjectSerializer(project, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        
-        project = self.get_object(pk)
-        serializer = ProjectSerializer(project, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        
-        project = self.get_object(pk)
-        project.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        # Counts the page view like ProjectDetailView, without a model save
+        if not Project.objects.filter(pk=pk).update(views=F('views') + 1):
+            raise Http404
+        trending.record_view(pk)
+        
+        # Media URLs are absolute, so http and https pages need their own copy
+        key = project_cache_key('bundle', [pk], request.build_absolute_uri('/'))
+        bundle = cache.get(key)
+        if bundle is None:
+            context = {'request': request}
+            project = CompiledProjectSerializer(context=context).serialize(Project.objects.filter(pk=pk))[0]
+            blog_posts = BlogPost.objects.filter(project_id=pk, published=True)
+            bundle = {
+                'project': project,
+                'blog_posts': CompiledBlogPostSerializer(context=context).serialize(blog_posts),
+                'enquiries_count': ProjectEnquiry.objects.filter(project_id=pk).count(),
+                'contacts_count': Contact.objects.filter(project_id=pk).count(),
+            }
+            cache.set(key, bundle, CACHE_TIMEOUT)
+        else:
+            bundle['project']['views'] = Project.objects.filter(pk=pk).values_list('views', flat=True).first()
+        return Response(bundle)
 
 
-class ClientListCreateView(APIView):
-    """List all clients or create a new client"""
+@query_budget(get=4)
+class ProjectCompareView(APIView):
+    """
+    Side-by-side comparison of 2-4 projects.
+    GET: ?ids=3,7,9 -> price/area ranges, flat type availability, tower counts,
+    possession dates and amenity overlap. Cached per set of projects.
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
     
     def get(self, request):
-        clients = Client.objects.all()
-        serializer = ClientSerializer(clients, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = ClientSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class ClientDetailView(APIView):
-    """Retrieve, update or delete a client instance"""
+        ids = list(dict.fromkeys(parse_ids(request.query_params.get('ids')) or []))
+        if not MIN_COMPARE <= len(ids) <= MAX_COMPARE:
+            return Response({'error': f'Pass {MIN_COMPARE} to {MAX_COMPARE} distinct project ids'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        key = project_cache_key('compare', ids)
+        comparison = cache.get(key)
+        if comparison is None:
+            comparison = compare_projects(ids)
+            if comparison is None:
+                raise Http404
+            cache.set(key, comparison, CACHE_TIMEOUT)
+        # The cached matrix is shared by every ordering of the same ids
+        position = {pk: index for index, pk in enumerate(ids)}
+        comparison['projects'].sort(key=lambda column: position[column['id']])
+        return Response(comparison)
+
+
+@query_budget(get=2)
+class ProjectFlatFacetsView(APIView):
+    """
+    Flat inventory facets for a project.
+    GET: Counts by flat type x status, price/area ranges and floor histogram.
+    Optional flat_type, status, floor_min, floor_max narrow the "selection" block.
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
     
-    def get_object(self, pk):
-        try:
-            return Client.objects.get(pk=pk)
-        except Client.DoesNotExist:
-            raise Http404
-    
     def get(self, request, pk):
-        client = self.get_object(pk)
-        serializer = ClientSerializer(client, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        client = self.get_object(pk)
-        serializer = ClientSerializer(client, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        client = self.get_object(pk)
-        serializer = ClientSerializer(client, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        client = self.get_object(pk)
-        client.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        key = project_cache_key('flat-facets', [pk])
+        facets = cache.get(key)
+        if facets is None:
+            if not Project.objects.filter(pk=pk).exists():
+                raise Http404
+            facets = flat_facets(pk)
+            cache.set(key, facets, CACHE_TIMEOUT)
+        
+        params = request.query_params
+        selection = {name: params.get(name) or None for name in ('flat_type', 'status', 'floor_min', 'floor_max')}
+        if any(selection.values()):
+            try:
+                for name in ('floor_min', 'floor_max'):
+                    if selection[name] is not None:
+                        selection[name] = int(selection[name])
+            except ValueError:
+                return Response({'error': 'floor_min and floor_max must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            facets = dict(facets, selection=select_facets(facets['cells'], **selection))
+        return Response(facets)
 
 
-class ReviewListCreateView(APIView):
-    """List all reviews or create a new review"""
+@query_budget(post=12)
+class BatchView(APIView):
+    """
+    Several read-only API requests in one round trip.
+    POST: {"requests": ["/api/projects/3/", "/api/towers/7/", "/api/flats/?tower=7"]}
+    Returns {"responses": [{"path", "status", "body"}, ...]} in request order.
+    Project/tower/flat detail lookups are loaded together.
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
     
-    def get(self, request):
-        reviews = Review.objects.all()
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
-    
     def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = ReviewSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        paths = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            return Response({'error': 'requests must be a list of API paths'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(paths) > MAX_BATCH_SIZE:
+            return Response({'error': f'At most {MAX_BATCH_SIZE} requests per batch'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'responses': run_batch(request, paths)})
 
 
-class ReviewDetailView(APIView):
-    """Retrieve, update or delete a review instance"""
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    
-    def get_object(self, pk):
-        try:
-            return Review.objects.get(pk=pk)
-        except Review.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        review = self.get_object(pk)
-        serializer = ReviewSerializer(review)
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        review = self.get_object(pk)
-        serializer = ReviewSerializer(review, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        review = self.get_object(pk)
-        serializer = ReviewSerializer(review, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        review = self.get_object(pk)
-        review.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-@api_view(['GET'])
-@permission_classes([AllowAny])
-@authentication_classes([])
-def review_featured(request):
-    """Get featured reviews"""
-    featured_reviews = Review.objects.filter(featured=True)
-    serializer = ReviewSerializer(featured_reviews, many=True)
-    return Response(serializer.data)
-
-
-class BlogPostListCreateView(APIView):
-    """List all blog posts or create a new blog post"""
+@query_budget(get=2)
+class AutocompleteView(APIView):
+    """
+    Typeahead suggestions from the in-memory prefix index.
+    GET: ?q=ban&limit=8 -> project titles, locations, cities and developers
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
     
-    def get_queryset(self):
-        is_admin = self.request.user and (
-            getattr(self.request.user, 'is_staff', False) or 
-            getattr(self.request.user, 'is_superuser', False)
-        )
-        if is_admin:
-            queryset = BlogPost.objects.all()
-        else:
-            queryset = BlogPost.objects.filter(published=True)
-        
-        project_id = self.request.query_params.get('project', None)
-        if project_id:
-            queryset = queryset.filter(project_id=project_id)
-        
-        # Search
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(category__icontains=search)
-            )
-        
-        # Ordering
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering:
-            queryset = queryset.order_by(ordering)
-        else:
-            queryset = queryset.order_by('-created_at')
-        
-        limit = self.request.query_params.get('limit', None)
-        if limit:
-            try:
-                queryset = queryset[:int(limit)]
-            except ValueError:
-                pass
-        
-        return queryset
-    
     def get(self, request):
-        blog_posts = self.get_queryset()
-        serializer = BlogPostSerializer(blog_posts, many=True, context={'request': request})
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        return Response({'q': query, 'results': autocomplete.search(query, limit)})
+
+
+@query_budget(list=1, retrieve=1)
+class ClientViewSet(ResourceViewSet):
+    """Clients; writes are Admin only"""
+    queryset = Client.objects.all()
+    serializer_class = ClientSerializer
+
+
+@query_budget(list=1, retrieve=1, featured=1)
+class ReviewViewSet(ResourceViewSet):
+    """Reviews; writes are Admin only"""
+    queryset = Review.objects.all()
+    serializer_class = ReviewSerializer
+    compiled_serializer_class = CompiledReviewSerializer
+    
+    @action(detail=False)
+    def featured(self, request):
+        """Get featured reviews"""
+        serializer = self.get_serializer(self.get_queryset().filter(featured=True), many=True)
         return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = BlogPostSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BlogPostDetailView(APIView):
-    """Retrieve, update or delete a blog post instance (by slug)"""
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    
-    def get_object(self, slug):
-        try:
-            return BlogPost.objects.get(slug=slug)
-        except BlogPost.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, slug):
-        blog_post = self.get_object(slug)
+@query_budget(list=2, retrieve=3)
+class BlogPostViewSet(ResourceViewSet):
+    """Blog posts by slug; unpublished posts are listed for Admin only"""
+    queryset = BlogPost.objects.all()
+    serializer_class = BlogPostSerializer
+    compiled_serializer_class = CompiledBlogPostSerializer
+    lookup_field = 'slug'
+    lookup_value_regex = '[^/]+'
+    public_filter = {'published': True}
+    filterset_class = BlogPostFilterSet
+    limit_param = 'limit'
+    
+    def retrieve(self, request, *args, **kwargs):
+        blog_post = self.get_object()
         blog_post.views += 1
         blog_post.save(update_fields=['views'])
-        serializer = BlogPostSerializer(blog_post, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, slug):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        blog_post = self.get_object(slug)
-        serializer = BlogPostSerializer(blog_post, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(blog_post).data)
+
+
+@query_budget(list=2, retrieve=2)
+class ContactViewSet(ResourceViewSet):
+    """Contact form submissions; anyone can create, everything else is Admin only"""
+    queryset = Contact.objects.all()
+    serializer_class = ContactSerializer
+    select_related = ('project',)
+    
+    def get_permissions(self):
+        if self.action == 'create':
+            return [AllowAny()]
+        return [IsAdmin()]
+
+
+@query_budget(list=1, retrieve=1)
+class AchievementViewSet(ResourceViewSet):
+    """Achievements; writes are Admin only"""
+    queryset = Achievement.objects.all()
+    serializer_class = AchievementSerializer
+
+
+@query_budget(list=2, retrieve=1)
+class CityViewSet(ResourceViewSet):
+    """Cities; inactive cities are listed for Admin only"""
+    queryset = City.objects.all()
+    serializer_class = CitySerializer
+    compiled_serializer_class = CompiledCitySerializer
+    public_filter = {'is_active': True}
+
+
+@query_budget(list=4, retrieve=3)
+class TowerViewSet(ResourceViewSet):
+    """Towers with their flats and amenities; inactive towers are listed for Admin only"""
+    queryset = Tower.objects.all()
+    serializer_class = TowerSerializer
+    # Towers with flats and amenities from three queries
+    compiled_serializer_class = CompiledTowerSerializer
+    public_filter = {'is_active': True}
+    filterset_class = TowerFilterSet
+    prefetch_related = ('flats', 'amenities')
+
+
+@query_budget(list=1, retrieve=1)
+class ProjectImageViewSet(ResourceViewSet):
+    """Project gallery images; writes are Admin only"""
+    queryset = ProjectImage.objects.all()
+    serializer_class = ProjectImageSerializer
+    compiled_serializer_class = CompiledProjectImageSerializer
+    filterset_class = ProjectChildFilterSet
+
+
+@query_budget(list=1, retrieve=1)
+class ProjectAmenityViewSet(ResourceViewSet):
+    """Project amenities; writes are Admin only"""
+    queryset = ProjectAmenity.objects.all()
+    serializer_class = ProjectAmenitySerializer
+    compiled_serializer_class = CompiledProjectAmenitySerializer
+    filterset_class = ProjectChildFilterSet
+
+
+@query_budget(list=1, retrieve=1)
+class TowerAmenityViewSet(ResourceViewSet):
+    """Tower amenities; writes are Admin only"""
+    queryset = TowerAmenity.objects.all()
+    serializer_class = TowerAmenitySerializer
+    compiled_serializer_class = CompiledTowerAmenitySerializer
+    filterset_class = TowerAmenityFilterSet
+
+
+@query_budget(list=1, retrieve=1)
+class FlatViewSet(ResourceViewSet):
+    """Flats; writes are Admin only"""
+    queryset = Flat.objects.all()
+    serializer_class = FlatSerializer
+    compiled_serializer_class = CompiledFlatSerializer
+    filterset_class = FlatFilterSet
+
+
+@query_budget(list=2, retrieve=2, matches=2, read_matches=2)
+class SavedSearchViewSet(ClientResourceViewSet):
+    """
+    The client's saved project searches, alerted when new projects or flats match.
+    GET matches/: queued match notifications, newest first (?unread=true)
+    POST matches/read/: {"ids": [1, 2]} marks those (or, without ids, all) read
+    """
+    queryset = SavedSearch.objects.all()
+    serializer_class = SavedSearchSerializer
+    
+    def perform_create(self, serializer):
+        if SavedSearch.objects.filter(user=self.request.user).count() >= saved_searches.MAX_SAVED_SEARCHES:
+            raise ValidationError(f'At most {saved_searches.MAX_SAVED_SEARCHES} saved searches')
+        self.save_indexed(serializer, user=self.request.user)
+    
+    def perform_update(self, serializer):
+        self.save_indexed(serializer)
+    
+    def save_indexed(self, serializer, **kwargs):
+        if 'filters' not in serializer.validated_data and serializer.instance is not None:
+            serializer.save(**kwargs)
+            return
+        filters = serializer.validated_data.get('filters', {})
+        with transaction.atomic():
+            search = serializer.save(term_keys=saved_searches.term_keys(filters), **kwargs)
+            saved_searches.index_terms(search)
+    
+    def match_queryset(self):
+        queryset = SavedSearchMatch.objects.filter(search__user=self.request.user)
+        if self.request.query_params.get('unread', '').lower() == 'true':
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
     
-    def patch(self, request, slug):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        blog_post = self.get_object(slug)
-        serializer = BlogPostSerializer(blog_post, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=False)
+    def matches(self, request):
+        queryset = self.match_queryset().select_related('search', 'project', 'flat')
+        page = self.paginate_queryset(queryset)
+        serializer = SavedSearchMatchSerializer(queryset if page is None else page, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
     
-    def delete(self, request, slug):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        blog_post = self.get_object(slug)
-        blog_post.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(detail=False, methods=['post'], url_path='matches/read')
+    def read_matches(self, request):
+        ids = parse_id_list(request.data.get('ids'))
+        queryset = self.match_queryset().filter(read_at__isnull=True)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        return Response({'read': queryset.update(read_at=timezone.now())})
 
 
-class ContactListCreateView(APIView):
-    """List all contacts or create a new contact"""
-    permission_classes = [AllowAny]
+@query_budget(get=3, post=14)
+class ShortlistView(ClientResourceView):
+    """
+    The client's shortlisted projects and flats.
+    GET: {"projects": [...], "flats": [...]}, newest first, flats with live status
+    POST: {"projects": [1, 2], "flats": [7]} adds items (already shortlisted ones are skipped)
+    """
     
     def get(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        contacts = Contact.objects.all()
-        serializer = ContactSerializer(contacts, many=True)
-        return Response(serializer.data)
+        return Response(self.shortlist(request))
     
     def post(self, request):
-        # Anyone can create (contact form)
-        serializer = ContactSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        added = shortlist.add(request.user, {kind: parse_id_list(request.data.get(kind), kind) for kind in shortlist.KINDS})
+        return Response(dict(self.shortlist(request), added=added), status=status.HTTP_201_CREATED if any(added.values()) else status.HTTP_200_OK)
+    
+    def shortlist(self, request):
+        context = {'request': request}
+        return {
+            'projects': ShortlistedProjectSerializer(shortlist.shortlisted_projects(request.user), many=True, context=context).data,
+            'flats': ShortlistedFlatSerializer(shortlist.shortlisted_flats(request.user), many=True, context=context).data,
+        }
 
 
-class ContactDetailView(APIView):
-    """Retrieve, update or delete a contact instance (Admin only)"""
-    permission_classes = [IsCustomAdminUser]
-    
-    def get_object(self, pk):
-        try:
-            return Contact.objects.get(pk=pk)
-        except Contact.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        contact = self.get_object(pk)
-        serializer = ContactSerializer(contact)
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        contact = self.get_object(pk)
-        serializer = ContactSerializer(contact, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        contact = self.get_object(pk)
-        serializer = ContactSerializer(contact, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@query_budget(delete=2)
+class ShortlistItemView(ClientResourceView):
+    """DELETE: remove a project or flat (by its id) from the client's shortlist"""
+    kind = None
     
     def delete(self, request, pk):
-        contact = self.get_object(pk)
-        contact.delete()
+        if not shortlist.remove(request.user, self.kind, pk):
+            return Response({'error': 'Not on the shortlist'}, status=status.HTTP_404_NOT_FOUND)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class AchievementListCreateView(APIView):
-    """List all achievements or create a new achievement"""
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    
-    def get(self, request):
-        achievements = Achievement.objects.all()
-        serializer = AchievementSerializer(achievements, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = AchievementSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class AchievementDetailView(APIView):
-    """Retrieve, update or delete an achievement instance"""
+@query_budget(get=2)
+class TowerInventoryView(APIView):
+    """
+    Compact availability grid for a tower.
+    GET: Columnar flat inventory (one array per column, status as legend index,
+    -1 for a status outside the legend)
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
     
-    def get_object(self, pk):
-        try:
-            return Achievement.objects.get(pk=pk)
-        except Achievement.DoesNotExist:
-            raise Http404
+    COLUMNS = ['id', 'flat_number', 'flat_type', 'floor_number', 'carpet_area', 'price', 'status']
+    STATUS_LEGEND = [choice for choice, label in Flat.STATUS_CHOICES]
     
     def get(self, request, pk):
-        achievement = self.get_object(pk)
-        serializer = AchievementSerializer(achievement, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        achievement = self.get_object(pk)
-        serializer = AchievementSerializer(achievement, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        achievement = self.get_object(pk)
-        serializer = AchievementSerializer(achievement, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        achievement = self.get_object(pk)
-        achievement.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if not Tower.objects.filter(pk=pk).exists():
+            raise Http404
+        
+        queryset = Flat.objects.filter(tower_id=pk)
+        flat_type = request.query_params.get('flat_type', None)
+        status_param = request.query_params.get('status', None)
+        if flat_type:
+            queryset = queryset.filter(flat_type=flat_type)
+        if status_param:
+            queryset = queryset.filter(status=status_param)
+        
+        rows = queryset.order_by('floor_number', 'flat_number').values_list(*self.COLUMNS)
+        columns = list(zip(*rows)) or [()] * len(self.COLUMNS)
+        data = dict(zip(self.COLUMNS, (list(column) for column in columns)))
+        
+        # Decimals as JSON numbers and statuses as legend indexes keep the payload small
+        data['carpet_area'] = [float(value) for value in data['carpet_area']]
+        data['price'] = [float(value) if value is not None else None for value in data['price']]
+        status_index = {value: index for index, value in enumerate(self.STATUS_LEGEND)}
+        data['status'] = [status_index.get(value, -1) for value in data['status']]
+        
+        return Response({
+            'tower': pk,
+            'count': len(data['id']),
+            'status_legend': self.STATUS_LEGEND,
+            'flats': data,
+        })
 
 
-class CityListCreateView(APIView):
-    """List all cities or create a new city"""
-    permission_classes = [AllowAny]
-    authentication_classes = []
+@query_budget(post=13)
+class TowerFlatBulkImportView(ResourceView):
+    """
+    Bulk create/update the flats of a tower (Admin only).
+    POST: JSON array (or {"flats": [...]}), text/csv body, or multipart "file" upload.
+    on_conflict=error|update|skip (query param or JSON key) decides how existing
+    flat numbers are handled. All rows are written in one transaction or none are.
+    """
+    permission_classes = [IsAdmin]
+    parser_classes = [FastJSONParser, CSVParser, MultiPartParser]
     
-    def get_queryset(self):
-        is_admin = self.request.user and (
-            getattr(self.request.user, 'is_staff', False) or 
-            getattr(self.request.user, 'is_superuser', False)
-        )
-        if is_admin:
-            return City.objects.all()
-        return City.objects.filter(is_active=True)
+    CONFLICT_MODES = ('error', 'update', 'skip')
     
-    def get(self, request):
-        cities = self.get_queryset()
-        serializer = CitySerializer(cities, many=True)
-        return Response(serializer.data)
+    def get_rows(self, request):
+        data = request.data
+        if 'file' in request.FILES:
+            return read_csv_rows(request.FILES['file'].read().decode('utf-8-sig'))
+        if isinstance(data, dict):
+            return data.get('flats')
+        return data
     
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = CitySerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class CityDetailView(APIView):
-    """Retrieve, update or delete a city instance"""
-    permission_classes = [AllowAny]
-    authentication_classes = []
-    
-    def get_object(self, pk):
+    def post(self, request, pk):
         try:
-            return City.objects.get(pk=pk)
-        except City.DoesNotExist:
+            tower = Tower.objects.get(pk=pk)
+        except Tower.DoesNotExist:
             raise Http404
-    
-    def get(self, request, pk):
-        city = self.get_object(pk)
-        serializer = CitySerializer(city)
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        city = self.get_object(pk)
-        serializer = CitySerializer(city, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        city = self.get_object(pk)
-        serializer = CitySerializer(city, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        city = self.get_object(pk)
-        city.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class TowerListCreateView(APIView):
-    """List all towers or create a new tower"""
-    permission_classes = [AllowAny]
-    
-    def get_queryset(self):
-        is_admin = self.request.user and (
-            getattr(self.request.user, 'is_staff', False) or 
-            getattr(self.request.user, 'is_superuser', False)
-        )
-        if is_admin:
-            queryset = Tower.objects.all()
-        else:
-            queryset = Tower.objects.filter(is_active=True)
         
-        project_id = self.request.query_params.get('project', None)
-        if project_id:
-            queryset = queryset.filter(project_id=project_id)
+        on_conflict = request.query_params.get('on_conflict') or (
+            request.data.get('on_conflict') if isinstance(request.data, dict) else None
+        ) or 'error'
+        if on_conflict not in self.CONFLICT_MODES:
+            return Response({'error': f'on_conflict must be one of {", ".join(self.CONFLICT_MODES)}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return queryset
-    
-    def get(self, request):
-        towers = self.get_queryset()
-        serializer = TowerSerializer(towers, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = TowerSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class TowerDetailView(APIView):
-    """Retrieve, update or delete a tower instance"""
-    permission_classes = [AllowAny]
-    
-    def get_object(self, pk):
         try:
-            return Tower.objects.get(pk=pk)
-        except Tower.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        tower = self.get_object(pk)
-        serializer = TowerSerializer(tower, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        tower = self.get_object(pk)
-        serializer = TowerSerializer(tower, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        tower = self.get_object(pk)
-        serializer = TowerSerializer(tower, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        tower = self.get_object(pk)
-        tower.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class ProjectImageListCreateView(APIView):
-    """List all project images or create a new project image"""
-    permission_classes = [AllowAny]
-    
-    def get_queryset(self):
-        queryset = ProjectImage.objects.all()
-        project_id = self.request.query_params.get('project', None)
-        if project_id:
-            queryset = queryset.filter(project_id=project_id)
-        return queryset
-    
-    def get(self, request):
-        images = self.get_queryset()
-        serializer = ProjectImageSerializer(images, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = ProjectImageSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            rows = self.get_rows(request)
+        except UnicodeDecodeError:
+            return Response({'error': 'CSV file must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return Response({'error': 'Expected a non-empty list of flats'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        started = time.perf_counter()
+        summary, errors = bulk_import_flats(tower, rows, on_conflict=on_conflict)
+        if errors:
+            return Response({'error': 'Some rows are invalid; nothing was imported', 'rows': errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        elapsed = time.perf_counter() - started
+        summary['elapsed_ms'] = round(elapsed * 1000, 1)
+        summary['rows_per_second'] = round(len(rows) / elapsed) if elapsed else None
+        return Response(summary, status=status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK)
 
 
-class ProjectImageDetailView(APIView):
-    """Retrieve, update or delete a project image instance"""
-    permission_classes = [AllowAny]
+@query_budget(post=13)
+class TowerGenerateFlatsView(ResourceView):
+    """
+    Generate a tower's flats from a per-floor layout template (Admin only).
+    POST: FloorPlanTemplateSerializer payload; ?dry_run=true previews without writing.
+    Re-running the same template updates flats in place (status is kept).
+    """
+    permission_classes = [IsAdmin]
     
-    def get_object(self, pk):
+    def post(self, request, pk):
         try:
-            return ProjectImage.objects.get(pk=pk)
-        except ProjectImage.DoesNotExist:
+            tower = Tower.objects.get(pk=pk)
+        except Tower.DoesNotExist:
             raise Http404
-    
-    def get(self, request, pk):
-        image = self.get_object(pk)
-        serializer = ProjectImageSerializer(image, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        image = self.get_object(pk)
-        serializer = ProjectImageSerializer(image, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        image = self.get_object(pk)
-        serializer = ProjectImageSerializer(image, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        image = self.get_object(pk)
-        image.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class ProjectAmenityListCreateView(APIView):
-    """List all project amenities or create a new project amenity"""
-    permission_classes = [AllowAny]
-    
-    def get_queryset(self):
-        queryset = ProjectAmenity.objects.all()
-        project_id = self.request.query_params.get('project', None)
-        if project_id:
-            queryset = queryset.filter(project_id=project_id)
-        return queryset
-    
-    def get(self, request):
-        amenities = self.get_queryset()
-        serializer = ProjectAmenitySerializer(amenities, many=True)
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = ProjectAmenitySerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class ProjectAmenityDetailView(APIView):
-    """Retrieve, update or delete a project amenity instance"""
-    permission_classes = [AllowAny]
-    
-    def get_object(self, pk):
+        
+        serializer = FloorPlanTemplateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get('dry_run', '').lower() == 'true'
         try:
-            return ProjectAmenity.objects.get(pk=pk)
-        except ProjectAmenity.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        amenity = self.get_object(pk)
-        serializer = ProjectAmenitySerializer(amenity)
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        serializer = ProjectAmenitySerializer(amenity, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        serializer = ProjectAmenitySerializer(amenity, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        amenity.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+            summary = generate_flats(tower, serializer.validated_data, dry_run=dry_run)
+        except FloorPlanError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['created'] and not dry_run else status.HTTP_200_OK)
 
 
-class TowerAmenityListCreateView(APIView):
-    """List all tower amenities or create a new tower amenity"""
-    permission_classes = [AllowAny]
-    
-    def get_queryset(self):
-        queryset = TowerAmenity.objects.all()
-        tower_id = self.request.query_params.get('tower', None)
-        if tower_id:
-            queryset = queryset.filter(tower_id=tower_id)
-        return queryset
-    
-    def get(self, request):
-        amenities = self.get_queryset()
-        serializer = TowerAmenitySerializer(amenities, many=True)
-        return Response(serializer.data)
+@query_budget(post=15)
+class FlatStatusTransitionView(ResourceView):
+    """
+    Bulk flat status transitions with optimistic concurrency (Admin only).
+    POST: {"to": "reserved", "from": ["available"], "flats": [1, {"id": 2, "updated_at": "..."}]}
+    Flats changed by someone else since they were read (or since the given
+    updated_at) are reported in "conflicts" instead of being overwritten.
+    """
+    permission_classes = [IsAdmin]
     
     def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = TowerAmenitySerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class TowerAmenityDetailView(APIView):
-    """Retrieve, update or delete a tower amenity instance"""
-    permission_classes = [AllowAny]
-    
-    def get_object(self, pk):
-        try:
-            return TowerAmenity.objects.get(pk=pk)
-        except TowerAmenity.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        amenity = self.get_object(pk)
-        serializer = TowerAmenitySerializer(amenity)
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        serializer = TowerAmenitySerializer(amenity, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        serializer = TowerAmenitySerializer(amenity, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        amenity = self.get_object(pk)
-        amenity.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-class FlatListCreateView(APIView):
-    """List all flats or create a new flat"""
-    permission_classes = [AllowAny]
-    
-    def get_queryset(self):
-        queryset = Flat.objects.all()
-        tower_id = self.request.query_params.get('tower', None)
-        flat_type = self.request.query_params.get('flat_type', None)
-        status_param = self.request.query_params.get('status', None)
-        floor = self.request.query_params.get('floor', None)
-        search = self.request.query_params.get('search', None)
-        
-        if tower_id:
-            queryset = queryset.filter(tower_id=tower_id)
-        if flat_type:
-            queryset = queryset.filter(flat_type=flat_type)
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-        if floor:
-            queryset = queryset.filter(floor_number=floor)
-        if search:
-            queryset = queryset.filter(
-                Q(flat_number__icontains=search) |
-                Q(flat_type__icontains=search)
-            )
-        
-        # Ordering
-        ordering = self.request.query_params.get('ordering', 'floor_number,flat_number')
-        if ordering:
-            queryset = queryset.order_by(*ordering.split(','))
-        else:
-            queryset = queryset.order_by('floor_number', 'flat_number')
+        serializer = FlatStatusTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        return queryset
-    
-    def get(self, request):
-        flats = self.get_queryset()
-        serializer = FlatSerializer(flats, many=True, context={'request': request})
-        return Response(serializer.data)
-    
-    def post(self, request):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        serializer = FlatSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-class FlatDetailView(APIView):
-    """Retrieve, update or delete a flat instance"""
-    permission_classes = [AllowAny]
-    
-    def get_object(self, pk):
-        try:
-            return Flat.objects.get(pk=pk)
-        except Flat.DoesNotExist:
-            raise Http404
-    
-    def get(self, request, pk):
-        flat = self.get_object(pk)
-        serializer = FlatSerializer(flat, context={'request': request})
-        return Response(serializer.data)
-    
-    def put(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        flat = self.get_object(pk)
-        serializer = FlatSerializer(flat, data=request.data, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def patch(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        flat = self.get_object(pk)
-        serializer = FlatSerializer(flat, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def delete(self, request, pk):
-        if not IsCustomAdminUser().has_permission(request, self):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
-        flat = self.get_object(pk)
-        flat.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-
-
-
-
-
-
-
-
+        data = serializer.validated_data
+        updated, conflicts = transition_flat_statuses(data['flats'], data.get('to'), data.get('allowed_from'))
+        return Response({
+            'updated': updated,
+            'conflicts': conflicts,
+        }, status=status.HTTP_200_OK if updated or not conflicts else status.HTTP_409_CONFLICT)
@@ -42,11 +42,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.SQLStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'api.middleware.RequestLoggingMiddleware',
@@ -85,6 +87,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Facets and other per-project payloads are cached here and invalidated on
+# writes (api/cache.py). Use a shared backend (Redis/Memcached) when running
+# more than one worker process, otherwise invalidations stay per-process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'nationnine',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -125,6 +139,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media delivery (see api/media.py)
+# None streams files from Django with Range support. Set to 'x-accel-redirect'
+# (nginx) or 'x-sendfile' (Apache/lighttpd) to hand transfers to the web server.
+MEDIA_SERVE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # nginx internal location
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 30  # 30 days; uploads get unique names
+
+# SQL statistics (see api/sql_stats.py)
+# Query counts and latency histograms per SQL fingerprint and per view, kept
+# per process and flushed to the cache at most every SQL_STATS_FLUSH_SECONDS.
+# Queries slower than SQL_SLOW_QUERY_MS are logged with their EXPLAIN plan.
+# Off by default (it wraps every query); enable with SQL_STATS_ENABLED=1.
+SQL_STATS_ENABLED = os.environ.get('SQL_STATS_ENABLED', '').lower() in ('1', 'true', 'yes')
+SQL_SLOW_QUERY_MS = 200
+SQL_STATS_FLUSH_SECONDS = 30
+
+# On-demand profiling of staff requests with ?_profile=1 (see api/profiling.py)
+# 'auto' uses pyinstrument's sampling profiler when installed, else cProfile.
+PROFILER = 'auto'
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -142,8 +177,18 @@ CORS_ALLOW_ALL_ORIGINS = True  # For development only
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson-backed JSON (falls back to the stdlib encoder when orjson is missing)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StaffJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (